@@ -2,23 +2,175 @@ bl_info = {
     "name": "AI Texture Generator",
     "description": "Generate textures using AI models (Stable Diffusion XL and Flux Pro) directly within Blender, powered by the Replicate API.",
     "author": "Temporary Studio",
-    "blender": (1, 0, 0),
+    "blender": (4, 0, 0),
     "category": "Material",
     "module": "ai_texture_generator"
 }
 
 import bpy
+import bpy.utils.previews
+import base64
+import csv
+import hashlib
+import hmac
+import io
+import json
+import logging
+import numpy as np
 import os
+import random
+import re
 import requests
+from requests.adapters import HTTPAdapter
+import shutil
+import struct
 import time
+import types
 import uuid
+import zlib
+from datetime import datetime
 from bpy.props import StringProperty, EnumProperty, BoolProperty, FloatProperty, IntProperty
 from bpy.types import Operator, Panel, AddonPreferences, PropertyGroup
+from bpy_extras.io_utils import ExportHelper
 from threading import Thread, current_thread as threading_current_thread
 import threading
-from queue import Queue
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+from queue import Empty, Queue
 from enum import Enum
 
+logger = logging.getLogger("ai_texture_generator")
+if not logger.handlers:
+    _log_handler = logging.StreamHandler()
+    _log_handler.setFormatter(logging.Formatter("[AI Texture] %(levelname)s: %(message)s"))
+    logger.addHandler(_log_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+class Tracer:
+    """Timed spans of pipeline stages, exportable as Chrome trace events
+
+    Spans are tagged with the job active on the current thread, so stages that
+    run on worker threads and on the main thread add up to one job timeline.
+    Per-job stage totals are kept separately for the panel summary.
+    """
+
+    REMOTE_TID = 0
+
+    def __init__(self, max_events=20000, max_jobs=200):
+        self.max_jobs = max_jobs
+        self._events = deque(maxlen=max_events)
+        self._totals = {}
+        self._thread_names = {self.REMOTE_TID: "Replicate (server time)"}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._epoch = time.perf_counter()
+
+    @contextmanager
+    def job(self, job_id):
+        previous = getattr(self._local, "job", None)
+        self._local.job = job_id
+        try:
+            yield
+        finally:
+            self._local.job = previous
+
+    @contextmanager
+    def span(self, name, **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter() - start, **args)
+
+    def traced(self, name):
+        """Decorator that records every call of a function as a span"""
+
+        def decorate(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def add(self, name, start, duration, job=None, remote=False, **args):
+        job = job or getattr(self._local, "job", None)
+        thread = threading.current_thread()
+        tid = self.REMOTE_TID if remote else thread.ident
+        event = {
+            "name": name,
+            "cat": "remote" if remote else "stage",
+            "ph": "X",
+            "ts": round((start - self._epoch) * 1e6),
+            "dur": round(duration * 1e6),
+            "pid": os.getpid(),
+            "tid": tid,
+            "args": dict(args, job=job) if job else args,
+        }
+        with self._lock:
+            self._events.append(event)
+            self._thread_names.setdefault(tid, thread.name)
+            if job:
+                totals = self._totals.setdefault(job, {})
+                totals[name] = totals.get(name, 0.0) + duration
+                while len(self._totals) > self.max_jobs:
+                    self._totals.pop(next(iter(self._totals)))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s %s took %.3fs", job or "-", name, duration)
+
+    def add_prediction(self, prediction, job=None):
+        """Add queue and inference spans from a finished prediction's server timestamps
+
+        Server clocks differ from ours, so the spans are placed to end now.
+        """
+
+        created = parse_timestamp(prediction.get('created_at'))
+        started = parse_timestamp(prediction.get('started_at'))
+        completed = parse_timestamp(prediction.get('completed_at'))
+        predict_time = (prediction.get('metrics') or {}).get('predict_time')
+        inference = float(predict_time) if predict_time is not None else \
+            (completed - started if completed and started else None)
+        queued = started - created if started and created else None
+        end = time.perf_counter()
+        if inference is not None:
+            self.add("inference", end - inference, inference, job=job, remote=True)
+            end -= inference
+        if queued is not None and queued >= 0:
+            self.add("queue", end - queued, queued, job=job, remote=True)
+
+    def summary(self, job_id):
+        with self._lock:
+            return dict(self._totals.get(job_id, {}))
+
+    def export(self, path):
+        with self._lock:
+            events = list(self._events)
+            names = dict(self._thread_names)
+        metadata = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+            for tid, name in names.items()]
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+            self._totals.clear()
+
+_tracer = Tracer()
+
+TRACE_STAGES = ("submit", "encode", "upload", "queue", "inference", "download", "load", "seamless",
+    "bake_maps", "nodes", "lod", "assign", "pack", "atlas", "apply")
+
+def format_stage_summary(summary):
+    def duration(seconds):
+        return f"{seconds * 1000:.0f}ms" if seconds < 1 else f"{seconds:.1f}s"
+    return "  ".join(f"{name} {duration(summary[name])}" for name in TRACE_STAGES if name in summary)
+
 def update_ui_status(context, status):
     context.scene.progress_status = status
     if threading.current_thread() is threading.main_thread():
@@ -27,195 +179,3529 @@ def update_ui_status(context, status):
                 area.tag_redraw()
 
 def debug_status(context):
-    print("\nDebug Status:")
-    print(f"Active Object: {context.active_object.name if context.active_object else 'None'}")
-    print(f"Has Materials: {bool(context.active_object and hasattr(context.active_object.data, 'materials'))}")
-    print(f"Current Status: {context.scene.progress_status}")
-    print(f"Current Prompt: {context.scene.ai_texture_generator_text_prompt}")
+    logger.debug("Debug Status:")
+    logger.debug("Active Object: %s", context.active_object.name if context.active_object else 'None')
+    logger.debug("Has Materials: %s", bool(context.active_object and hasattr(context.active_object.data, 'materials')))
+    logger.debug("Current Status: %s", context.scene.progress_status)
+    logger.debug("Current Prompt: %s", context.scene.ai_texture_generator_text_prompt)
 
-def download_image(image_url, download_path="/tmp", context=None):
-    try:
-        if context:
-            update_ui_status(context, "Downloading Image...")
-        response = requests.get(image_url)
+REPLICATE_API_URL = "https://api.replicate.com/v1"
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class ReplicateClient:
+    """Pooled HTTP session shared by every request the addon makes
+
+    Requests are written against REPLICATE_API_URL. A different base_url, such
+    as a local stand-in server, is substituted when the request is sent.
+    """
+
+    def __init__(self, api_key, timeout=60.0, connect_timeout=10.0, max_retries=3,
+                 backoff=0.5, max_backoff=30.0, pool_size=8, base_url=REPLICATE_API_URL):
+        self.api_key = api_key
+        self.base_url = (base_url or REPLICATE_API_URL).rstrip("/")
+        self.timeout = (connect_timeout, timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def resolve(self, url):
+        if url.startswith(REPLICATE_API_URL):
+            return self.base_url + url[len(REPLICATE_API_URL):]
+        return url
+
+    def _headers(self, url, headers):
+        merged = dict(headers or {})
+        if url.startswith(self.base_url):
+            merged["Authorization"] = f"Bearer {self.api_key}"
+        return merged
+
+    def _retry_delay(self, attempt, response=None):
+        if response is not None and response.headers.get("Retry-After"):
+            try:
+                return min(float(response.headers["Retry-After"]), self.max_backoff)
+            except ValueError:
+                pass
+        delay = self.backoff * (2 ** attempt)
+        return min(delay, self.max_backoff) * random.uniform(0.5, 1.5)
+
+    def request(self, method, url, idempotent=False, headers=None, retries=None, **kwargs):
+        """Send a request, retrying transient failures with jittered exponential backoff
+
+        Only idempotent requests are retried on connection errors and 5xx responses.
+        A 429 is always retried because the server rejected the request unprocessed.
+        retries overrides max_retries; with 0 the call never sleeps.
+        """
+
+        retries = self.max_retries if retries is None else retries
+        kwargs.setdefault("timeout", self.timeout)
+        url = self.resolve(url)
+        headers = self._headers(url, headers)
+        uploads = [f[1] for f in (kwargs.get("files") or {}).values() if hasattr(f[1], "seek")]
+        offsets = [f.tell() for f in uploads]
+        for attempt in range(retries + 1):
+            last_attempt = attempt == retries
+            for upload, offset in zip(uploads, offsets):
+                upload.seek(offset)
+            try:
+                response = self.session.request(method, url, headers=headers, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if not idempotent or last_attempt:
+                    raise
+                delay = self._retry_delay(attempt)
+                logger.warning("%s %s failed (%s), retrying in %.1fs", method, url, e, delay)
+            else:
+                retryable = response.status_code == 429 or \
+                    (idempotent and response.status_code in RETRY_STATUS_CODES)
+                if not retryable or last_attempt:
+                    return response
+                delay = self._retry_delay(attempt, response)
+                logger.warning("%s %s returned %s, retrying in %.1fs", method, url, response.status_code, delay)
+                response.close()
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, idempotent=True, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def create_prediction(self, url, data, wait=True):
+        """Submit a prediction; with wait the server may hold the response until it finishes
+
+        The hold is capped below the read timeout so a slow prediction comes back
+        as "starting" or "processing" instead of timing out the un-retried POST.
+        """
+
+        headers = {"Content-Type": "application/json"}
+        if wait:
+            headers["Prefer"] = f"wait={max(1, min(55, int(self.timeout[1]) - 5))}"
+        return self.post(url, json=data, headers=headers)
+
+    def get_prediction(self, prediction_id):
+        response = self.get(f"{REPLICATE_API_URL}/predictions/{prediction_id}")
         response.raise_for_status()
-        
-        os.makedirs(download_path, exist_ok=True)
-        
-        image_name = os.path.basename(image_url)
-        image_path = os.path.join(download_path, image_name)
-        
-        with open(image_path, 'wb') as image_file:
-            image_file.write(response.content)
-        
-        if context:
-            update_ui_status(context, "Image Downloaded")
-        return image_path
+        return response.json()
+
+    def poll_prediction(self, prediction_id, attempt=0):
+        """Fetch a prediction once, leaving any wait before a retry to the caller
+
+        Returns (prediction, None), or (None, delay) when a 429, or a transient
+        failure within max_retries attempts, means it should be fetched again
+        after delay seconds. Other failures raise.
+        """
+
+        try:
+            response = self.request("GET", f"{REPLICATE_API_URL}/predictions/{prediction_id}",
+                idempotent=True, retries=0)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= self.max_retries:
+                raise
+            return None, self._retry_delay(attempt)
+        if response.status_code == 429 or \
+                (response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries):
+            delay = self._retry_delay(attempt, response)
+            response.close()
+            return None, delay
+        response.raise_for_status()
+        return response.json(), None
+
+    def upload_file(self, filename, fileobj, content_type):
+        files = {'content': (filename, fileobj, content_type)}
+        return self.post(f"{REPLICATE_API_URL}/files", files=files)
+
+    def download(self, url, path, chunk_size=1024 * 1024):
+        """Stream a file to disk through a temporary file renamed into place once complete
+
+        Returns the SHA-256 hex digest of the content.
+        """
+
+        temp_path = f"{path}.part"
+        try:
+            with open(temp_path, 'wb') as f:
+                digest = self.download_to(url, f, chunk_size)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return digest
+
+    def download_to(self, url, f, chunk_size=1024 * 1024):
+        """Stream a download into a seekable file object, resuming with an HTTP Range request after a dropped connection
+
+        Chunks are hashed as they are written. Returns the SHA-256 hex digest of the content.
+        """
+
+        digest = hashlib.sha256()
+        received = 0
+        expected = None
+        for attempt in range(self.max_retries + 1):
+            headers = {"Accept-Encoding": "identity"}
+            if received:
+                headers["Range"] = f"bytes={received}-"
+            try:
+                with self.get(url, headers=headers, stream=True) as response:
+                    response.raise_for_status()
+                    if received and response.status_code != 206:
+                        logger.warning("Server ignored range request, restarting download")
+                        f.seek(0)
+                        f.truncate()
+                        digest = hashlib.sha256()
+                        received = 0
+                    if expected is None:
+                        content_range = response.headers.get("Content-Range", "")
+                        if "/" in content_range and not content_range.endswith("*"):
+                            expected = int(content_range.rsplit("/", 1)[1])
+                        elif response.headers.get("Content-Length"):
+                            expected = received + int(response.headers["Content-Length"])
+                    for chunk in response.iter_content(chunk_size):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        received += len(chunk)
+                if expected is not None and received < expected:
+                    raise requests.ConnectionError(
+                        f"Connection closed after {received} of {expected} bytes")
+                break
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt)
+                logger.warning("Download interrupted at %s bytes (%s), resuming in %.1fs", received, e, delay)
+                time.sleep(delay)
+        return digest.hexdigest()
+
+    def close(self):
+        self.session.close()
+
+_replicate_client = None
+
+def get_replicate_client(context):
+    """Return the shared client, rebuilding it when the connection preferences change"""
+
+    global _replicate_client
+    addon_prefs = context.preferences.addons["ai_texture_generator"].preferences
+    base_url = (addon_prefs.api_base_url or REPLICATE_API_URL).rstrip("/")
+    config = (addon_prefs.api_key, addon_prefs.request_timeout, addon_prefs.max_retries, base_url)
+    if _replicate_client is None or (_replicate_client.api_key, _replicate_client.timeout[1],
+            _replicate_client.max_retries, _replicate_client.base_url) != config:
+        if _replicate_client:
+            _replicate_client.close()
+        _replicate_client = ReplicateClient(
+            addon_prefs.api_key,
+            timeout=addon_prefs.request_timeout,
+            max_retries=addon_prefs.max_retries,
+            base_url=base_url
+        )
+    return _replicate_client
+
+ImageBytes = namedtuple("ImageBytes", ["filename", "data", "content_hash"])
+ImageFile = namedtuple("ImageFile", ["filename", "path", "content_hash"])
+
+def url_filename(url):
+    return os.path.basename(url.split("?", 1)[0]) or "image.png"
+
+def download_image_bytes(client, image_url):
+    """Download an image into memory as ImageBytes, or return None on failure"""
+
+    filename = url_filename(image_url)
+    buffer = io.BytesIO()
+    try:
+        content_hash = client.download_to(image_url, buffer)
     except requests.RequestException as e:
-        print(f"Error downloading image: {e}")
-        if context:
-            update_ui_status(context, "Download Failed")
+        logger.error("Error downloading image: %s", e)
+        return None
+    # getvalue() on an unshared buffer hands over its bytes object instead of copying it
+    data = buffer.getvalue()
+    buffer.close()
+    if not data:
+        return None
+    logger.debug("Downloaded %s into memory (sha256 %s)", filename, content_hash)
+    return ImageBytes(filename, data, content_hash)
+
+def download_image_file(client, image_url, directory):
+    """Stream an image straight to a uuid-named file in directory as ImageFile, or return None on failure"""
+
+    filename = url_filename(image_url)
+    path = os.path.join(directory, f"{uuid.uuid4()}_{filename}")
+    try:
+        content_hash = client.download(image_url, path)
+    except (requests.RequestException, OSError) as e:
+        logger.error("Error downloading image: %s", e)
+        return None
+    if not os.path.getsize(path):
+        os.remove(path)
         return None
+    logger.debug("Downloaded %s to %s (sha256 %s)", filename, path, content_hash)
+    return ImageFile(filename, path, content_hash)
+
+def read_image_bytes(image_path):
+    with open(image_path, 'rb') as f:
+        data = f.read()
+    return ImageBytes(os.path.basename(image_path), data, hashlib.sha256(data).hexdigest())
+
+def read_image_pixels(image):
+    """Read an image's pixels once into a (height, width, channels) float32 array"""
+
+    width, height = image.size
+    pixels = np.empty(width * height * image.channels, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    return pixels.reshape(height, width, image.channels)
+
+def compute_luminance(pixels):
+    if pixels.shape[2] < 3:
+        return pixels[..., 0].copy()
+    return pixels[..., 0] * 0.2126 + pixels[..., 1] * 0.7152 + pixels[..., 2] * 0.0722
+
+def box_blur(values, radius):
+    """Separable box blur that wraps around the edges like a tiling texture"""
+
+    for axis in (0, 1):
+        padded = np.concatenate([values.take(range(-radius - 1, 0), axis=axis), values,
+            values.take(range(radius), axis=axis)], axis=axis)
+        summed = np.cumsum(padded, axis=axis, dtype=np.float32)
+        size = values.shape[axis]
+        upper = summed.take(range(2 * radius + 1, 2 * radius + 1 + size), axis=axis)
+        lower = summed.take(range(size), axis=axis)
+        values = (upper - lower) / (2 * radius + 1)
+    return values
+
+def compute_height_map(luminance):
+    low, high = float(luminance.min()), float(luminance.max())
+    if high - low < 1e-6:
+        return np.full_like(luminance, 0.5)
+    return (luminance - low) / (high - low)
+
+def compute_normal_map(height, strength=1.0):
+    """Tangent-space normal map from a Sobel filter over the height field, encoded as RGB"""
+
+    def shift(dy, dx):
+        return np.roll(height, (dy, dx), axis=(0, 1))
+
+    dx = (shift(1, -1) + 2 * shift(0, -1) + shift(-1, -1)) - (shift(1, 1) + 2 * shift(0, 1) + shift(-1, 1))
+    dy = (shift(-1, 1) + 2 * shift(-1, 0) + shift(-1, -1)) - (shift(1, 1) + 2 * shift(1, 0) + shift(1, -1))
+    normal = np.stack([-dx * strength, -dy * strength, np.ones_like(height)], axis=-1)
+    normal /= np.linalg.norm(normal, axis=-1, keepdims=True)
+    return normal * 0.5 + 0.5
+
+def compute_roughness_map(luminance):
+    return np.clip((luminance - 0.2) / 0.6, 0.0, 1.0)
+
+def compute_ao_map(height, radius=8, strength=4.0):
+    """Cavity-style ambient occlusion: darken pixels that sit below their surroundings"""
+
+    cavity = box_blur(height, radius) - height
+    return np.clip(1.0 - cavity * strength, 0.0, 1.0)
+
+def seam_error(pixels):
+    """How visible the wrap-around seams are, relative to ordinary neighbouring pixels
+
+    1.0 means the seam rows and columns differ as much as any two adjacent pixels;
+    untileable images usually score well above that.
+    """
+
+    rgb = pixels[..., :3]
+    seam = (np.abs(rgb[:, 0] - rgb[:, -1]).mean() + np.abs(rgb[0] - rgb[-1]).mean()) / 2
+    interior = (np.abs(np.diff(rgb, axis=1)).mean() + np.abs(np.diff(rgb, axis=0)).mean()) / 2
+    return float(seam / interior) if interior > 0 else 0.0
+
+def make_seamless(pixels, blend_fraction=0.25):
+    """Offset-and-blend the pixel buffer so it tiles without visible seams
+
+    Each axis is blended with a copy rolled by half its size, weighted towards the
+    rolled copy near the edges where the original seam sits. The rolled copy's own
+    seam lands in the middle, where the original wins.
+    """
+
+    for axis in (1, 0):
+        size = pixels.shape[axis]
+        band = max(1.0, size * blend_fraction)
+        distance = np.minimum(np.arange(size), np.arange(size)[::-1]).astype(np.float32)
+        weight = np.clip(distance / band, 0.0, 1.0)
+        weight = weight.reshape((1, size, 1) if axis == 1 else (size, 1, 1))
+        rolled = np.roll(pixels, size // 2, axis=axis)
+        pixels = rolled + (pixels - rolled) * weight
+    return pixels
+
+@_tracer.traced("seamless")
+def make_image_seamless(image, blend_fraction=0.25, save_dir=None):
+    """Make a loaded image tileable in place and return its seam error before and after"""
 
-def create_normal_map(texture_node, nodes, links, location_offset):
-    """Create a normal map setup from the base texture"""
+    pixels = read_image_pixels(image)
+    before = seam_error(pixels)
+    pixels = make_seamless(pixels, blend_fraction)
+    after = seam_error(pixels)
+    image.pixels.foreach_set(pixels.ravel())
+    if save_dir:
+        image.save()
+    else:
+        image.pack()
+    if "ai_content_key" in image:
+        # The remembered hash is of the pixels before blending
+        del image["ai_content_key"]
+    logger.debug("Made %s seamless: seam error %.2f -> %.2f", image.name, before, after)
+    return before, after
+
+def write_map_image(name, values, save_dir=None):
+    """Write a 2D or RGB array into a Non-Color image, saved next to the blend file or packed"""
+
+    height, width = values.shape[:2]
+    image = bpy.data.images.get(name)
+    if image and tuple(image.size) != (width, height):
+        bpy.data.images.remove(image)
+        image = None
+    if not image:
+        image = bpy.data.images.new(name, width, height, alpha=False)
+    rgba = np.ones((height, width, 4), dtype=np.float32)
+    rgba[..., :3] = values[..., None] if values.ndim == 2 else values
+    image.pixels.foreach_set(rgba.ravel())
+    image.colorspace_settings.name = 'Non-Color'
+    store_image(image, save_dir)
+    return image
+
+def store_image(image, save_dir=None):
+    """Save a generated image as a PNG in save_dir, or pack it into the blend file"""
+
+    image["ai_managed"] = True
+    if save_dir:
+        image.filepath_raw = os.path.join(save_dir, f"{bpy.path.clean_name(image.name)}.png")
+        image.file_format = 'PNG'
+        image.save()
+        get_storage_manager().track(image.filepath_raw)
+    else:
+        image.pack()
+
+@_tracer.traced("bake_maps")
+def bake_pbr_maps(image, maps, normal_strength=1.0, save_dir=None):
+    """Derive the requested PBR maps from an image's pixels and write them out as images
+
+    The source pixels are read once; every map is computed as a vectorized NumPy
+    array. Returns a dict of map name to bpy image.
+    """
+
+    pixels = read_image_pixels(image)
+    luminance = compute_luminance(pixels)
+    height = compute_height_map(luminance)
+    computed = {
+        'normal': lambda: compute_normal_map(height, normal_strength),
+        'roughness': lambda: compute_roughness_map(luminance),
+        'height': lambda: height,
+        'ao': lambda: compute_ao_map(height),
+    }
+    return {name: write_map_image(f"{image.name}_{name}", computed[name](), save_dir) for name in maps}
+
+AI_NODE_GROUP_VERSION = 1
+AI_MAPPING_GROUP = "AI_Texture_Mapping"
+AI_SHADER_GROUP = "AI_Texture_Shader"
+
+# Map name -> (image node in the material, shader group input it feeds, shader group toggle)
+PBR_MAP_INPUTS = {
+    'normal': ("AI_Normal_Map", "Normal Map", "Use Normal Map"),
+    'roughness': ("AI_Roughness_Map", "Roughness Map", "Use Roughness Map"),
+    'height': ("AI_Height_Map", "Height Map", "Use Height Map"),
+    'ao': ("AI_AO_Map", "AO Map", "Use AO Map"),
+}
+
+AI_MAPPING_SOCKETS = (
+    ('INPUT', 'NodeSocketVector', "UV", None),
+    ('INPUT', 'NodeSocketFloat', "Tiling X", 1.0),
+    ('INPUT', 'NodeSocketFloat', "Tiling Y", 1.0),
+    ('OUTPUT', 'NodeSocketVector', "Vector", None),
+)
+
+AI_SHADER_SOCKETS = (
+    ('INPUT', 'NodeSocketColor', "Color", (0.8, 0.8, 0.8, 1.0)),
+    ('INPUT', 'NodeSocketColor', "Normal Map", (0.5, 0.5, 1.0, 1.0)),
+    ('INPUT', 'NodeSocketFloat', "Use Normal Map", 0.0),
+    ('INPUT', 'NodeSocketFloat', "Normal Strength", 1.0),
+    ('INPUT', 'NodeSocketFloat', "Roughness Map", 0.5),
+    ('INPUT', 'NodeSocketFloat', "Use Roughness Map", 0.0),
+    ('INPUT', 'NodeSocketFloat', "Height Map", 0.5),
+    ('INPUT', 'NodeSocketFloat', "Use Height Map", 0.0),
+    ('INPUT', 'NodeSocketFloat', "Displacement Scale", 0.05),
+    ('INPUT', 'NodeSocketFloat', "AO Map", 1.0),
+    ('INPUT', 'NodeSocketFloat', "Use AO Map", 0.0),
+    ('OUTPUT', 'NodeSocketShader', "BSDF", None),
+    ('OUTPUT', 'NodeSocketVector', "Displacement", None),
+)
+
+def build_mapping_group(group):
+    nodes, links = group.nodes, group.links
+    group_input = nodes.new('NodeGroupInput')
+    group_input.location = (-400, 0)
+    group_output = nodes.new('NodeGroupOutput')
+    group_output.location = (200, 0)
+    scale = nodes.new('ShaderNodeCombineXYZ')
+    scale.location = (-200, -100)
+    scale.inputs['Z'].default_value = 1.0
+    multiply = nodes.new('ShaderNodeVectorMath')
+    multiply.operation = 'MULTIPLY'
+    links.new(group_input.outputs["Tiling X"], scale.inputs['X'])
+    links.new(group_input.outputs["Tiling Y"], scale.inputs['Y'])
+    links.new(group_input.outputs["UV"], multiply.inputs[0])
+    links.new(scale.outputs['Vector'], multiply.inputs[1])
+    links.new(multiply.outputs['Vector'], group_output.inputs["Vector"])
+
+def build_shader_group(group):
+    """Principled BSDF fed by the base color and baked maps, each map faded in by its toggle"""
+
+    nodes, links = group.nodes, group.links
+    group_input = nodes.new('NodeGroupInput')
+    group_input.location = (-800, 0)
+    group_output = nodes.new('NodeGroupOutput')
+    group_output.location = (400, 0)
+    principled = nodes.new('ShaderNodeBsdfPrincipled')
+    principled.location = (100, 100)
+
+    def multiply(a, b, location):
+        node = nodes.new('ShaderNodeMath')
+        node.operation = 'MULTIPLY'
+        node.location = location
+        links.new(group_input.outputs[a], node.inputs[0])
+        links.new(group_input.outputs[b], node.inputs[1])
+        return node.outputs['Value']
+
+    ao_mix = nodes.new('ShaderNodeMix')
+    ao_mix.data_type = 'RGBA'
+    ao_mix.blend_type = 'MULTIPLY'
+    ao_mix.location = (-300, 300)
+    links.new(group_input.outputs["Use AO Map"], ao_mix.inputs[0])
+    links.new(group_input.outputs["Color"], ao_mix.inputs[6])
+    links.new(group_input.outputs["AO Map"], ao_mix.inputs[7])
+    links.new(ao_mix.outputs[2], principled.inputs['Base Color'])
+
+    roughness_mix = nodes.new('ShaderNodeMix')
+    roughness_mix.data_type = 'FLOAT'
+    roughness_mix.location = (-300, 50)
+    roughness_mix.inputs[2].default_value = 0.5
+    links.new(group_input.outputs["Use Roughness Map"], roughness_mix.inputs[0])
+    links.new(group_input.outputs["Roughness Map"], roughness_mix.inputs[3])
+    links.new(roughness_mix.outputs[0], principled.inputs['Roughness'])
 
     normal_map = nodes.new('ShaderNodeNormalMap')
-    normal_map.location = (location_offset[0] + 200, location_offset[1] - 300)
-    
-    bump = nodes.new('ShaderNodeBump')
-    bump.location = (location_offset[0] + 400, location_offset[1] - 300)
-    
-    rgb_to_bw = nodes.new('ShaderNodeRGBToBW')
-    rgb_to_bw.location = (location_offset[0], location_offset[1] - 300)
-    
-    links.new(texture_node.outputs['Color'], rgb_to_bw.inputs['Color'])
-    links.new(rgb_to_bw.outputs['Val'], normal_map.inputs['Strength'])
-    links.new(normal_map.outputs['Normal'], bump.inputs['Normal'])
-    
-    return bump
+    normal_map.location = (-300, -200)
+    links.new(multiply("Normal Strength", "Use Normal Map", (-500, -200)), normal_map.inputs['Strength'])
+    links.new(group_input.outputs["Normal Map"], normal_map.inputs['Color'])
+    links.new(normal_map.outputs['Normal'], principled.inputs['Normal'])
 
-def create_roughness_map(texture_node, nodes, links, location_offset):
-    """Create a roughness setup from the base texture"""
+    displacement = nodes.new('ShaderNodeDisplacement')
+    displacement.location = (100, -300)
+    links.new(group_input.outputs["Height Map"], displacement.inputs['Height'])
+    links.new(multiply("Displacement Scale", "Use Height Map", (-100, -400)), displacement.inputs['Scale'])
 
-    rgb_to_bw = nodes.new('ShaderNodeRGBToBW')
-    rgb_to_bw.location = (location_offset[0], location_offset[1] - 600)
-    
-    color_ramp = nodes.new('ShaderNodeValToRGB')
-    color_ramp.location = (location_offset[0] + 200, location_offset[1] - 600)
-    
-    color_ramp.color_ramp.elements[0].position = 0.2
-    color_ramp.color_ramp.elements[1].position = 0.8
-    
-    links.new(texture_node.outputs['Color'], rgb_to_bw.inputs['Color'])
-    links.new(rgb_to_bw.outputs['Val'], color_ramp.inputs[0])
-    
-    return color_ramp
+    links.new(principled.outputs['BSDF'], group_output.inputs["BSDF"])
+    links.new(displacement.outputs['Displacement'], group_output.inputs["Displacement"])
+
+AI_NODE_GROUPS = {
+    AI_MAPPING_GROUP: (AI_MAPPING_SOCKETS, build_mapping_group),
+    AI_SHADER_GROUP: (AI_SHADER_SOCKETS, build_shader_group),
+}
+
+def get_ai_node_group(name):
+    """Return a shared AI node group, creating it or rebuilding an older version in place
+
+    Sockets are only ever added, never removed, so materials keep their links and
+    input values when a newer addon version rebuilds the group's internals.
+    """
 
-def load_image_as_texture(image_path, text_prompt, image_uuid, context):
+    group = bpy.data.node_groups.get(name)
+    if group and group.get("ai_node_version") == AI_NODE_GROUP_VERSION:
+        return group
+    sockets, build = AI_NODE_GROUPS[name]
+    if not group:
+        group = bpy.data.node_groups.new(name, 'ShaderNodeTree')
+    existing = {(item.in_out, item.name) for item in group.interface.items_tree if item.item_type == 'SOCKET'}
+    for in_out, socket_type, socket_name, default in sockets:
+        if (in_out, socket_name) in existing:
+            continue
+        socket = group.interface.new_socket(socket_name, in_out=in_out, socket_type=socket_type)
+        if default is not None:
+            socket.default_value = default
+        if socket_name.startswith("Use "):
+            socket.min_value, socket.max_value = 0.0, 1.0
+    group.nodes.clear()
+    build(group)
+    group["ai_node_version"] = AI_NODE_GROUP_VERSION
+    logger.debug("Built node group %s version %s", name, AI_NODE_GROUP_VERSION)
+    return group
+
+def build_ai_material_nodes(material, image, texture_node_name, uv_map="", map_images=None):
+    """Replace a material's node tree with the thin wrapper around the shared AI node groups
+
+    The wrapper holds only what differs per material: the UV map, the image
+    texture nodes and the group inputs. Returns the base image texture node.
+    """
+
+    nodes = material.node_tree.nodes
+    links = material.node_tree.links
+    nodes.clear()
+
+    output = nodes.new('ShaderNodeOutputMaterial')
+    output.name = "AI_Output"
+    output.location = (600, 300)
+
+    shader = nodes.new('ShaderNodeGroup')
+    shader.name = "AI_Shader"
+    shader.node_tree = get_ai_node_group(AI_SHADER_GROUP)
+    shader.location = (300, 300)
+
+    uv_node = nodes.new('ShaderNodeUVMap')
+    uv_node.name = "AI_UV"
+    uv_node.uv_map = uv_map
+    uv_node.location = (-500, 300)
+
+    mapping = nodes.new('ShaderNodeGroup')
+    mapping.name = "AI_Mapping"
+    mapping.node_tree = get_ai_node_group(AI_MAPPING_GROUP)
+    mapping.location = (-300, 300)
+
+    texture = nodes.new('ShaderNodeTexImage')
+    texture.name = texture_node_name
+    texture.image = image
+    texture.location = (-100, 300)
+
+    links.new(uv_node.outputs['UV'], mapping.inputs["UV"])
+    links.new(mapping.outputs["Vector"], texture.inputs['Vector'])
+    links.new(texture.outputs['Color'], shader.inputs["Color"])
+    links.new(shader.outputs["BSDF"], output.inputs['Surface'])
+
+    for name, map_image in (map_images or {}).items():
+        add_map_image_node(material, name, map_image)
+    return texture
+
+def add_map_image_node(material, name, image, extension='REPEAT'):
+    """Add the image node for one baked map and wire it into the shader group"""
+
+    nodes = material.node_tree.nodes
+    node_name, input_name, toggle_name = PBR_MAP_INPUTS[name]
+    mapping, shader = nodes["AI_Mapping"], nodes["AI_Shader"]
+    map_node = nodes.new('ShaderNodeTexImage')
+    map_node.name = node_name
+    map_node.label = f"AI {name.title()} Map"
+    map_node.image = image
+    map_node.extension = extension
+    map_node.location = (-100, 300 - 300 * (list(PBR_MAP_INPUTS).index(name) + 1))
+    material.node_tree.links.new(mapping.outputs["Vector"], map_node.inputs['Vector'])
+    material.node_tree.links.new(map_node.outputs['Color'], shader.inputs[input_name])
+    shader.inputs[toggle_name].default_value = 1.0
+    if name == 'height':
+        link_ai_displacement(material, True)
+    return map_node
+
+def link_ai_displacement(material, enabled):
+    """Connect the shader group's Displacement to the material output only while a height map is used
+
+    An unlinked Displacement socket lets render engines skip evaluating it
+    entirely, which a zero displacement scale alone does not.
+    """
+
+    nodes, links = material.node_tree.nodes, material.node_tree.links
+    output = nodes.get("AI_Output") or next((n for n in nodes if n.type == 'OUTPUT_MATERIAL'), None)
+    if not output:
+        return
+    socket = output.inputs['Displacement']
+    for link in list(socket.links):
+        links.remove(link)
+    if enabled:
+        links.new(nodes["AI_Shader"].outputs["Displacement"], socket)
+
+def upgrade_ai_material(material):
+    """Rebuild an AI material made by an older addon version around the shared node groups
+
+    Keeps the base image, any baked map images found by node name and the
+    tiling of a legacy Mapping node. Returns False for materials the addon did
+    not make and when there is no base image.
+    """
+
+    if not is_ai_material(material):
+        return False
+    nodes = material.node_tree.nodes
+    if nodes.get("AI_Shader") and nodes.get("AI_Mapping"):
+        return True
+    texture_node = nodes.get(material.get("ai_texture_node", "")) or find_texture_node(material)
+    if not texture_node or not texture_node.image:
+        return False
+    image, texture_node_name = texture_node.image, texture_node.name
+    map_images = {name: nodes[node_name].image for name, (node_name, _, _) in PBR_MAP_INPUTS.items()
+        if nodes.get(node_name) and nodes[node_name].image}
+    legacy_mapping = next((n for n in nodes if n.type == 'MAPPING'), None)
+    tiling = tuple(legacy_mapping.inputs['Scale'].default_value[:2]) if legacy_mapping else (1.0, 1.0)
+    build_ai_material_nodes(material, image, texture_node_name, map_images=map_images)
+    mapping = nodes["AI_Mapping"]
+    mapping.inputs["Tiling X"].default_value, mapping.inputs["Tiling Y"].default_value = tiling
+    material["ai_texture_node"] = texture_node_name
+    logger.info("Upgraded %s to the shared AI node groups", material.name)
+    return True
+
+def update_ai_material(material, texture_props, save_dir=None):
+    """Match an AI material's group inputs and baked map nodes to texture_props
+
+    Settings are plain group input values; map images that are wanted but
+    missing are baked from the base image, and unwanted ones are removed.
+    """
+
+    nodes = material.node_tree.nodes
+    mapping, shader = nodes["AI_Mapping"], nodes["AI_Shader"]
+    texture_node = nodes.get(material.get("ai_texture_node", "")) or find_texture_node(material)
+    mapping.inputs["Tiling X"].default_value = texture_props.tiling_x
+    mapping.inputs["Tiling Y"].default_value = texture_props.tiling_y
+    shader.inputs["Normal Strength"].default_value = texture_props.normal_strength
+
+    wanted = {
+        'normal': texture_props.use_normal_map,
+        'roughness': texture_props.use_roughness,
+        'height': texture_props.use_height_map,
+        'ao': texture_props.use_ao_map,
+    }
+    for name, (node_name, _, toggle_name) in PBR_MAP_INPUTS.items():
+        node = nodes.get(node_name)
+        if node and not wanted[name]:
+            nodes.remove(node)
+        if not wanted[name]:
+            shader.inputs[toggle_name].default_value = 0.0
+
+    missing = [name for name, enabled in wanted.items() if enabled and not nodes.get(PBR_MAP_INPUTS[name][0])]
+    if missing and texture_node and texture_node.image:
+        images = bake_pbr_maps(full_resolution_image(material, texture_node), missing, 1.0, save_dir)
+        for name, image in images.items():
+            add_map_image_node(material, name, image, texture_node.extension)
+    link_ai_displacement(material, bool(nodes.get(PBR_MAP_INPUTS['height'][0])))
+
+def is_ai_material(material):
+    """Whether a material was made by the addon, as opposed to built by hand"""
+
+    return bool(material) and ("ai_texture_node" in material or material.name.startswith("AI_Material_"))
+
+def find_texture_node(material):
+    """Return the base image texture node of an AI material, skipping baked map nodes"""
+
+    if not material or not material.node_tree:
+        return None
+    texture_nodes = [n for n in material.node_tree.nodes if n.type == 'TEX_IMAGE']
+    return next((n for n in texture_nodes if n.name.startswith("AI_Texture_Node_")),
+        next((n for n in texture_nodes if not n.name.startswith("AI_")), None))
+
+def map_save_dir(context):
+    """Folder for baked maps in FOLDER save mode, or None to pack them into the blend file"""
 
     addon_prefs = context.preferences.addons["ai_texture_generator"].preferences
-    model_name = addon_prefs.active_model.lower()
+    if addon_prefs.save_location == 'FOLDER' and bpy.data.filepath:
+        return os.path.dirname(bpy.data.filepath)
+    return None
+
+LOD_SIZES = (512, 256)
+
+def full_resolution_image(material, texture_node):
+    """The full resolution base image of an AI material, whichever LOD its texture node shows"""
+
+    return material.get("ai_full_image") or texture_node.image
+
+@_tracer.traced("lod")
+def create_lod_images(image, save_dir=None):
+    """Make the missing LOD_SIZES variants of a base image
+
+    The base image holds its variants in ai_lod_<size> properties, so every
+    material showing the same image shares them and they live exactly as long
+    as the image. Each new level is box-filtered from the one above it, so the
+    full image is read at most once. Returns {size: image}.
+    """
+
+    width, height = image.size
+    pixels = None
+    variants = {}
+    for size in sorted(LOD_SIZES, reverse=True):
+        if max(width, height) <= size:
+            continue
+        lod = image.get(f"ai_lod_{size}")
+        if lod is not None:
+            variants[size] = lod
+            pixels = None
+            continue
+        if pixels is None:
+            pixels = read_image_pixels(image)
+        scale = size / max(width, height)
+        pixels = downsample_pixels(pixels, max(1, round(width * scale)), max(1, round(height * scale)))
+        lod = bpy.data.images.new(f"{image.name}_lod{size}", pixels.shape[1], pixels.shape[0], alpha=True)
+        lod.pixels.foreach_set(rgba_pixels(pixels).ravel())
+        lod.colorspace_settings.name = image.colorspace_settings.name
+        lod["ai_lod_source"] = image.name
+        store_image(lod, save_dir)
+        image[f"ai_lod_{size}"] = lod
+        variants[size] = lod
+    return variants
+
+def set_texture_lod(material, texture_node, lod, save_dir=None):
+    """Point an AI material's base texture node at its 'FULL' image or the LOD of that size
+
+    Missing variants of the base image are created first.
+    """
+
+    full = full_resolution_image(material, texture_node)
+    if not full:
+        return
+    target = full
+    if lod != 'FULL' and max(full.size) > int(lod):
+        target = full.get(f"ai_lod_{lod}") or create_lod_images(full, save_dir).get(int(lod), full)
+    material["ai_full_image"] = full
+    if texture_node.image != target:
+        texture_node.image = target
+
+def ai_texture_materials():
+    """Yield (material, base texture node) for every AI material in the file"""
+
+    for material in bpy.data.materials:
+        if not material.node_tree or not is_ai_material(material):
+            continue
+        texture_node = material.node_tree.nodes.get(material.get("ai_texture_node", "")) or find_texture_node(material)
+        if texture_node and texture_node.image:
+            yield material, texture_node
+
+def apply_texture_lods(lod, save_dir=None):
+    """Switch every AI material to the given LOD and return how many were switched"""
+
+    count = 0
+    for material, texture_node in ai_texture_materials():
+        set_texture_lod(material, texture_node, lod, save_dir)
+        count += 1
+    logger.debug("Switched %s AI materials to %s resolution", count, lod)
+    return count
+
+def render_swaps_lods(scene):
+    """Whether renders of this scene switch AI materials to full resolution and back
+
+    Render handlers run on the render thread during interactive renders, where
+    changing node trees is only safe while the interface is locked.
+    """
+
+    texture_props = scene.ai_texture_props
+    return texture_props.full_resolution_render and texture_props.viewport_resolution != 'FULL' \
+        and (bpy.app.background or scene.render.use_lock_interface)
+
+def render_needs_lock_interface(scene):
+    """Whether full resolution renders are wanted but interactive renders cannot swap textures"""
+
+    texture_props = scene.ai_texture_props
+    return texture_props.full_resolution_render and texture_props.viewport_resolution != 'FULL' \
+        and not scene.render.use_lock_interface
+
+@bpy.app.handlers.persistent
+def ai_texture_lod_render_init(scene, *args):
+    if render_swaps_lods(scene):
+        apply_texture_lods('FULL')
+    elif render_needs_lock_interface(scene) and not bpy.app.background:
+        logger.warning("Rendering %s with viewport resolution textures; enable Render > Lock Interface "
+            "for full resolution renders", scene.name)
+
+@bpy.app.handlers.persistent
+def ai_texture_lod_render_done(scene, *args):
+    if render_swaps_lods(scene):
+        apply_texture_lods(scene.ai_texture_props.viewport_resolution, map_save_dir(bpy.context))
+
+def find_material_slot(obj, material):
+    """Return the slot index holding material on obj, appending a slot if needed"""
+
+    for i, slot in enumerate(obj.material_slots):
+        if slot.material == material:
+            return i
+    obj.data.materials.append(material)
+    return len(obj.material_slots) - 1
+
+@_tracer.traced("assign")
+def assign_material_to_objects(objects, material, selected_only=False):
+    """Assign a material to the faces of many objects in one pass
+
+    Face material indices are read and written with foreach_get/foreach_set and
+    a NumPy selection mask instead of a Python loop over polygons. With
+    selected_only, only faces selected in edit mode are changed. Objects in edit
+    mode are flushed to object mode once for the whole set and then restored.
+    Returns the number of faces assigned.
+    """
+
+    objects = [obj for obj in objects if obj and hasattr(obj.data, "materials")]
+    edit_objects = [obj for obj in objects if obj.mode == 'EDIT']
+    if edit_objects:
+        bpy.ops.object.mode_set(mode='OBJECT')
+
+    assigned = 0
+    seen_meshes = set()
+    for obj in objects:
+        slot_index = find_material_slot(obj, material)
+        if not hasattr(obj.data, "polygons"):
+            slot = obj.material_slots[slot_index]
+            slot.link = 'OBJECT'
+            slot.material = material
+            continue
+
+        mesh = obj.data
+        if mesh.as_pointer() in seen_meshes:
+            continue
+        seen_meshes.add(mesh.as_pointer())
+
+        count = len(mesh.polygons)
+        if not count:
+            continue
+        indices = np.empty(count, dtype=np.int32)
+        if selected_only:
+            mask = np.empty(count, dtype=bool)
+            mesh.polygons.foreach_get("select", mask)
+            if not mask.any():
+                continue
+            mesh.polygons.foreach_get("material_index", indices)
+            indices[mask] = slot_index
+            assigned += int(np.count_nonzero(mask))
+        else:
+            indices.fill(slot_index)
+            assigned += count
+        mesh.polygons.foreach_set("material_index", indices)
+        mesh.update()
+
+    if edit_objects:
+        bpy.ops.object.mode_set(mode='EDIT')
+    return assigned
+
+class AIMaterialEntry:
+    """What the panel and operators need to know about one AI material"""
+
+    __slots__ = ("material_name", "texture_node_name", "model", "prompt", "upscale", "display_name")
+
+    def __init__(self, material_name, texture_node_name, model, prompt, upscale=1):
+        self.material_name = material_name
+        self.texture_node_name = texture_node_name
+        self.model = model
+        self.prompt = prompt
+        self.upscale = upscale
+        model_label = model.upper()
+        if upscale > 1:
+            model_label = f"{model_label} ↑{upscale}x"
+        self.display_name = f"{model_label}: {sanitize_name(prompt)[:10]}" if prompt else material_name[:10]
+
+    @property
+    def material(self):
+        return bpy.data.materials.get(self.material_name)
+
+    @property
+    def texture_node(self):
+        material = self.material
+        if not material or not material.node_tree:
+            return None
+        return material.node_tree.nodes.get(self.texture_node_name)
+
+    @property
+    def image(self):
+        texture_node = self.texture_node
+        return full_resolution_image(self.material, texture_node) if texture_node else None
+
+    @classmethod
+    def from_material(cls, material):
+        """Build an entry from the metadata stored on a material, parsing legacy names once"""
+
+        if "ai_texture_node" in material:
+            return cls(material.name, material["ai_texture_node"], material.get("ai_model", ""),
+                material.get("ai_prompt", ""), int(material.get("ai_upscale", 1)))
+
+        texture_node = find_texture_node(material)
+        parts = material.name.split('_')
+        model = parts[2] if len(parts) > 3 else ""
+        prompt = parts[3] if len(parts) > 3 else ""
+        upscale = 1
+        if texture_node and texture_node.image and texture_node.image.name.startswith("upscaled_"):
+            factor = texture_node.image.name.split('_')[1].rstrip('x')
+            upscale = int(factor) if factor.isdigit() else 2
+        return cls(material.name, texture_node.name if texture_node else "", model, prompt, upscale)
+
+class AIMaterialRegistry:
+    """Index of every AI-generated material in the open file
+
+    Built once from bpy.data.materials and kept in sync by the load, undo and
+    depsgraph handlers, so draw code and operators can look entries up by name
+    instead of scanning node trees and re-parsing material names.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._material_count = -1
+        self._dirty = True
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def _ensure(self):
+        if self._dirty or self._material_count != len(bpy.data.materials):
+            self._entries = {
+                material.name: AIMaterialEntry.from_material(material)
+                for material in bpy.data.materials if is_ai_material(material)
+            }
+            self._material_count = len(bpy.data.materials)
+            self._dirty = False
+
+    def get(self, material):
+        if not is_ai_material(material):
+            return None
+        self._ensure()
+        entry = self._entries.get(material.name)
+        if entry is None:
+            entry = self._entries[material.name] = AIMaterialEntry.from_material(material)
+        return entry
+
+    def entries(self):
+        self._ensure()
+        return list(self._entries.values())
+
+    def add(self, material):
+        self._ensure()
+        self._entries[material.name] = AIMaterialEntry.from_material(material)
+        self._material_count = len(bpy.data.materials)
+
+    def __contains__(self, material_name):
+        return material_name in self._entries
+
+    def remove(self, material_name):
+        self._entries.pop(material_name, None)
+        self._material_count = -1
+
+    def unique_material_name(self, base_name, suffix):
+        """First free 'base_suffix' / 'base_N_suffix' name, checked against the index"""
+
+        self._ensure()
+        material_name = f"{base_name}_{suffix}"
+        counter = 1
+        while material_name in self._entries:
+            material_name = f"{base_name}_{counter}_{suffix}"
+            counter += 1
+        return material_name
+
+_material_registry = None
+
+def get_material_registry():
+    global _material_registry
+    if _material_registry is None:
+        _material_registry = AIMaterialRegistry()
+    return _material_registry
+
+@bpy.app.handlers.persistent
+def ai_material_registry_reset(*args):
+    get_material_registry().mark_dirty()
+    _image_hash_index.reset()
+    _failed_thumbnails.clear()
+
+@bpy.app.handlers.persistent
+def ai_material_registry_sync(scene, depsgraph):
+    if not depsgraph.id_type_updated('MATERIAL'):
+        return
+    registry = get_material_registry()
+    for update in depsgraph.updates:
+        material = update.id.original if hasattr(update.id, "original") else update.id
+        if isinstance(material, bpy.types.Material) and is_ai_material(material) \
+                and material.name not in registry:
+            registry.mark_dirty()
+            return
+
+def load_image_as_texture(source, text_prompt, image_uuid, context, obj=None, settings=None, content_hash=None):
+
+    settings = settings or snapshot_job_settings(context, 'GENERATE', text_prompt)
+    model_name = settings.model.lower()
     
-    unique_name = f"{model_name}_{text_prompt[:20]}_{image_uuid}"
+    unique_name = f"{model_name}_{sanitize_name(text_prompt)[:20]}_{image_uuid}"
     
-    image = bpy.data.images.load(image_path, check_existing=False)
-    image.name = unique_name
+    texture_props = settings.texture
+    processing = f"seamless={texture_props.seamless_blend:.3f}" if texture_props.make_seamless else ""
+    image, reused = load_image_deduplicated(source, content_hash, processing)
     
-    material_name = f"AI_Material_{model_name}_{sanitize_name(text_prompt)}_{image_uuid}"
+    if not reused:
+        image.name = unique_name
+        if texture_props.make_seamless:
+            context.scene.progress_status = "Making Texture Seamless..."
+            make_image_seamless(image, texture_props.seamless_blend, settings.save_dir)
     
     context.scene.progress_status = "Updating Texture Node..."
     
-    obj = context.active_object
-    if not obj:
-        print("No active object found")
-        context.scene.progress_status = "Error: No active object"
-        return False
+    # A named material without a target object is built unassigned, as for texture libraries
+    if not obj and (settings.object_name or not settings.material_name):
+        obj = context.active_object
+        if not obj:
+            logger.warning("No active object found")
+            context.scene.progress_status = "Error: No active object"
+            return None
     
-    if not hasattr(obj.data, "materials"):
-        print(f"Object type {obj.type} cannot have materials")
+    if obj and not hasattr(obj.data, "materials"):
+        logger.warning("Object type %s cannot have materials", obj.type)
         context.scene.progress_status = "Error: Object cannot have materials"
-        return False
+        return None
         
-    counter = 1
-    while material_name in bpy.data.materials:
-        material_name = f"AI_Material_{model_name}_{sanitize_name(text_prompt)}_{counter}_{image_uuid}"
-        counter += 1
+    material_name = settings.material_name or get_material_registry().unique_material_name(
+        f"AI_Material_{model_name}_{sanitize_name(text_prompt)}", image_uuid)
     
-    material = bpy.data.materials.new(name=material_name)
+    # A named material that already exists is rebuilt in place, so re-running a manifest updates its library
+    material = bpy.data.materials.get(material_name) if settings.material_name else None
+    if material is None:
+        material = bpy.data.materials.new(name=material_name)
     material.use_nodes = True
     
-    obj.data.materials.append(material)
-    new_slot_index = len(obj.data.materials) - 1
-    obj.active_material_index = new_slot_index
-    
-    if obj.mode == 'EDIT':
-        bpy.ops.object.mode_set(mode='OBJECT')
-    
-    if hasattr(obj.data, "polygons"):
-        for face in obj.data.polygons:
-            face.material_index = new_slot_index
-    elif hasattr(obj.data, "materials"):
-        obj.material_slots[new_slot_index].link = 'OBJECT'
-        obj.active_material = material
+    if obj:
+        obj.active_material_index = find_material_slot(obj, material)
+        assign_material_to_objects([obj], material)
+    else:
+        material.use_fake_user = True
     
     try:
-        nodes = material.node_tree.nodes
-        links = material.node_tree.links
-        
-        nodes.clear()
-        
-        output = nodes.new('ShaderNodeOutputMaterial')
-        output.location = (600, 300)
+        with _tracer.span("nodes"):
+            texture = build_ai_material_nodes(material, image, f"AI_Texture_Node_{image_uuid}")
         
-        principled = nodes.new('ShaderNodeBsdfPrincipled')
-        principled.location = (300, 300)
-        
-        mapping = nodes.new('ShaderNodeMapping')
-        mapping.location = (-300, 300)
-        
-        texcoord = nodes.new('ShaderNodeTexCoord')
-        texcoord.location = (-500, 300)
-        
-        texture = nodes.new('ShaderNodeTexImage')
-        texture.location = (-100, 300)
-        texture.name = f"AI_Texture_Node_{image_uuid}"
-        texture.image = image
-        
-        links.new(texcoord.outputs['UV'], mapping.inputs['Vector'])
-        links.new(mapping.outputs['Vector'], texture.inputs['Vector'])
-        links.new(texture.outputs['Color'], principled.inputs['Base Color'])
-        links.new(principled.outputs['BSDF'], output.inputs['Surface'])
-        
-        if context.scene.ai_texture_props.use_normal_map:
-            bump = create_normal_map(texture, nodes, links, texture.location)
-            links.new(bump.outputs['Normal'], principled.inputs['Normal'])
-        
-        if context.scene.ai_texture_props.use_roughness:
-            roughness = create_roughness_map(texture, nodes, links, texture.location)
-            links.new(roughness.outputs['Color'], principled.inputs['Roughness'])
-        
-        mapping.inputs['Scale'].default_value[0] = context.scene.ai_texture_props.tiling_x
-        mapping.inputs['Scale'].default_value[1] = context.scene.ai_texture_props.tiling_y
+        material["ai_full_image"] = image
+        material["ai_model"] = model_name
+        material["ai_prompt"] = text_prompt
+        material["ai_texture_node"] = texture.name
+        update_ai_material(material, texture_props, settings.save_dir)
+        create_lod_images(image, settings.save_dir)
+        set_texture_lod(material, texture, context.scene.ai_texture_props.viewport_resolution, settings.save_dir)
+        material["ai_upscale"] = 1
+        get_material_registry().add(material)
         
         context.scene.progress_status = "Texture Node Updated"
-        print(f"Created and applied new material: {material.name}")
-        return True
+        logger.info("Created and applied new material: %s", material.name)
+        return material
         
     except Exception as e:
-        print(f"Error while setting up nodes: {str(e)}")
+        logger.error("Error while setting up nodes: %s", e)
         context.scene.progress_status = f"Error: {str(e)}"
-        return False
+        return None
+
+def apply_generated_image(context, image, text_prompt, report, obj=None, settings=None):
+    """Apply a finished ImageFile or ImageBytes as a new material
+
+    An ImageFile was streamed to its place next to the blend file during the
+    download. In FOLDER mode ImageBytes, such as a generation cache hit, are
+    written there once; in BLENDER mode they are packed straight from memory.
+    Returns the new material, or None when it could not be built.
+    """
+
+    settings = settings or snapshot_job_settings(context, 'GENERATE', text_prompt)
+    image_uuid = uuid.uuid4()
+    
+    if isinstance(image, ImageFile):
+        get_storage_manager().track(image.path)
+        source = image.path
+        report({'INFO'}, f"Image saved to {image.path}")
+    elif settings.save_location == 'FOLDER':
+        target_path = os.path.join(settings.save_dir, f"{image_uuid}_{image.filename}")
+        with open(target_path, 'wb') as f:
+            f.write(image.data)
+        get_storage_manager().track(target_path)
+        source = target_path
+        report({'INFO'}, f"Image saved to {target_path}")
+    else:
+        source = image
+        report({'INFO'}, "Image packed into blend file")
+    
+    material = None
+    try:
+        material = load_image_as_texture(source, text_prompt, image_uuid, context, obj=obj,
+            settings=settings, content_hash=image.content_hash)
+        if material:
+            report({'INFO'}, "Texture applied successfully")
+        else:
+            report({'WARNING'}, "Image saved but couldn't apply texture")
+    except Exception as e:
+        report({'ERROR'}, f"Error applying texture: {str(e)}")
+        logger.error("Error details: %s", e)
+    
+    if settings.save_location == 'FOLDER':
+        enforce_storage_budget(context)
+    return material
+
+def get_output_url(prediction):
+    """Return the first image URL of a finished prediction"""
+
+    output = prediction.get('output')
+    if isinstance(output, list):
+        output = output[0] if output else None
+    return output
+
+def parse_progress(prediction, label):
+    """Turn a prediction's status and tqdm logs into a short status line"""
+
+    status = prediction['status']
+    if status != 'processing':
+        return f"Status: {status.title()}"
+    logs = prediction.get('logs') or ''
+    progress_lines = [line for line in logs.split('\n') if '%|' in line]
+    if progress_lines:
+        percent = progress_lines[-1].split('%')[0].strip()
+        if percent.isdigit():
+            return f"{label}: {percent}%"
+    return f"{label}..."
+
+def parse_timestamp(value):
+    """Parse a Replicate ISO 8601 timestamp into a POSIX time, or None"""
+
+    if not value:
+        return None
+    value = value.replace('Z', '+00:00')
+    if '.' in value:
+        head, tail = value.split('.', 1)
+        digits = len(tail) - len(tail.lstrip('0123456789'))
+        value = f"{head}.{tail[:min(digits, 6)]}{tail[digits:]}"
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+def prediction_duration(prediction):
+    """Seconds from creation to completion of a finished prediction, or None"""
+
+    created = parse_timestamp(prediction.get('created_at'))
+    completed = parse_timestamp(prediction.get('completed_at'))
+    if created is not None and completed is not None and completed >= created:
+        return completed - created
+    predict_time = (prediction.get('metrics') or {}).get('predict_time')
+    return float(predict_time) if predict_time is not None else None
+
+class LatencyHistory:
+    """Recent end-to-end durations per model, used to predict when a job will finish"""
+
+    def __init__(self, path=None, samples=20):
+        self.path = path
+        self.samples = samples
+        self._lock = threading.Lock()
+        self._durations = None
+
+    def _load(self):
+        if self._durations is None:
+            self._durations = {}
+            if self.path:
+                try:
+                    with open(self.path, 'r') as f:
+                        self._durations = json.load(f)
+                except (OSError, ValueError):
+                    pass
+        return self._durations
+
+    def record(self, model_key, seconds):
+        if not model_key or seconds is None:
+            return
+        with self._lock:
+            durations = self._load().setdefault(model_key, [])
+            durations.append(round(seconds, 3))
+            del durations[:-self.samples]
+            if self.path:
+                try:
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    temp_path = f"{self.path}.tmp"
+                    with open(temp_path, 'w') as f:
+                        json.dump(self._durations, f)
+                    os.replace(temp_path, self.path)
+                except OSError as e:
+                    logger.warning("Could not save latency history: %s", e)
+
+    def expected(self, model_key):
+        """Median duration of recent jobs for a model, or None without history"""
+
+        with self._lock:
+            durations = sorted(self._load().get(model_key) or [])
+        if not durations:
+            return None
+        return durations[len(durations) // 2]
+
+def next_poll_delay(elapsed, expected=None, min_interval=0.25, max_interval=5.0):
+    """Seconds to wait before the next poll of a prediction that has run for elapsed seconds
+
+    With history for the model, most of the expected remaining time is skipped and
+    polling tightens around the predicted finish. Without history, or once a job
+    overruns its prediction, the interval grows with the time already spent.
+    """
+
+    if expected is not None and elapsed < expected:
+        remaining = expected - elapsed
+        return min(max(remaining * 0.8, min_interval), max_interval)
+    overrun = elapsed - expected if expected is not None else elapsed
+    return min(max(overrun * 0.25, min_interval), max_interval)
+
+class PredictionPoller:
+    """Background thread that owns prediction submission, polling and downloads
+
+    Callers hand over a queue and get back events of the form (tag, kind, payload):
+    ('status', text), ('submitted', prediction_id), ('succeeded', (image, prediction))
+    or ('failed', message). The main thread only drains that queue, so it never
+    waits on the network. The image is ImageBytes in memory, or an ImageFile when
+    a download_dir was given and the download was streamed straight to disk.
+
+    Predictions submitted with a webhook are "pushed": polling only runs every
+    fallback_interval in case an event never arrives, and deliver() polls a
+    prediction at once when an event says it finished. The result itself always
+    comes from the API, never from the event body, so a forged event cannot
+    choose what gets downloaded.
+    """
+
+    TERMINAL_STATES = ('succeeded', 'failed', 'canceled')
+
+    def __init__(self, history=None, min_interval=0.25, max_interval=5.0, max_workers=32,
+                 fallback_interval=30.0):
+        self.history = history or LatencyHistory()
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.fallback_interval = fallback_interval
+        self._watches = {}
+        self._early = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self._workers = ThreadPoolExecutor(max_workers=max_workers)
+
+    def submit(self, client, events, tag, create, label="Generating", model_key=None, pushed=False,
+               download_dir=None):
+        """Run create(client) on a worker thread and watch the prediction it returns
+
+        When the submit response already holds a finished prediction (Replicate's
+        "Prefer: wait" mode) the result is used directly without polling.
+        """
+
+        def run():
+            submitted_at = time.monotonic()
+            try:
+                with _tracer.job(tag), _tracer.span("submit"):
+                    prediction = create(client)
+                prediction_id = prediction.get('id')
+                if not prediction_id:
+                    raise RuntimeError("Prediction submission returned no prediction ID")
+            except Exception as e:
+                logger.error("Prediction submission failed: %s", e)
+                events.put((tag, 'failed', str(e)))
+                return
+            events.put((tag, 'submitted', prediction_id))
+            if prediction.get('status') in self.TERMINAL_STATES:
+                self._finish(client, prediction, events, tag, model_key, time.monotonic() - submitted_at,
+                    download_dir)
+            else:
+                self.watch(client, prediction_id, events, tag, label, model_key, submitted_at, pushed,
+                    download_dir)
+
+        events.put((tag, 'status', "Submitting prediction..."))
+        self._workers.submit(run)
+
+    def watch(self, client, prediction_id, events, tag=None, label="Generating", model_key=None,
+              submitted_at=None, pushed=False, download_dir=None):
+        submitted_at = submitted_at or time.monotonic()
+        expected = self.history.expected(model_key)
+        elapsed = time.monotonic() - submitted_at
+        with self._lock:
+            self._watches[prediction_id] = {
+                'client': client,
+                'events': events,
+                'tag': tag,
+                'label': label,
+                'status': None,
+                'model_key': model_key,
+                'expected': expected,
+                'submitted_at': submitted_at,
+                'polls': 0,
+                'retries': 0,
+                'pushed': pushed,
+                'download_dir': download_dir,
+                'next_poll': time.monotonic() + self._delay(elapsed, expected, pushed),
+            }
+            early = self._early.pop(prediction_id, None)
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped = False
+                self._thread = Thread(target=self._run, name="ai-texture-poller", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        if early:
+            self.deliver(early)
+
+    def unwatch(self, prediction_id):
+        with self._lock:
+            return self._watches.pop(prediction_id, None) is not None
+
+    def deliver(self, prediction):
+        """Update a watched prediction's status from a webhook event, polling it now if it finished
+
+        Events for predictions that are not watched yet are kept briefly, since a
+        fast webhook can arrive before the submit response has been processed.
+        """
+
+        prediction_id = prediction.get('id')
+        with self._lock:
+            watch = self._watches.get(prediction_id)
+            if not watch:
+                self._early[prediction_id] = prediction
+                while len(self._early) > 100:
+                    self._early.pop(next(iter(self._early)))
+                return False
+        status_text = parse_progress(prediction, watch['label'])
+        if status_text != watch['status']:
+            watch['status'] = status_text
+            watch['events'].put((watch['tag'], 'status', status_text))
+        if prediction.get('status') in self.TERMINAL_STATES:
+            logger.debug("Webhook reports prediction %s %s, fetching it", prediction_id, prediction['status'])
+            with self._lock:
+                watch['next_poll'] = time.monotonic()
+            self._wakeup.set()
+        return True
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+        self._workers.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self):
+        while not self._stopped:
+            now = time.monotonic()
+            with self._lock:
+                due = [(pid, w) for pid, w in self._watches.items() if w['next_poll'] <= now]
+            for prediction_id, watch in due:
+                self._poll(prediction_id, watch)
+            with self._lock:
+                next_poll = min((w['next_poll'] for w in self._watches.values()), default=None)
+            timeout = None if next_poll is None else max(0.0, next_poll - time.monotonic())
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def _poll(self, prediction_id, watch):
+        """Fetch one due prediction; rate limits and transient errors only reschedule it
+
+        Nothing here sleeps, so a backoff for one prediction never delays the
+        polls of the others.
+        """
+
+        events, tag = watch['events'], watch['tag']
+        try:
+            with _tracer.job(tag), _tracer.span("poll"):
+                prediction, retry_delay = watch['client'].poll_prediction(prediction_id, watch['retries'])
+        except Exception as e:
+            logger.error("Error polling prediction %s: %s", prediction_id, e)
+            self.unwatch(prediction_id)
+            events.put((tag, 'failed', str(e)))
+            return
+        if prediction is None:
+            watch['retries'] += 1
+            watch['next_poll'] = time.monotonic() + retry_delay
+            logger.warning("Polling prediction %s deferred, retrying in %.1fs", prediction_id, retry_delay)
+            return
+
+        watch['retries'] = 0
+        watch['polls'] += 1
+        logger.debug("Poll %s: %s", prediction_id, prediction['status'])
+        status_text = parse_progress(prediction, watch['label'])
+        if status_text != watch['status']:
+            watch['status'] = status_text
+            events.put((tag, 'status', status_text))
+
+        elapsed = time.monotonic() - watch['submitted_at']
+        if prediction['status'] in self.TERMINAL_STATES:
+            if self.unwatch(prediction_id):
+                logger.info("Prediction %s %s after %.1fs and %s polls",
+                    prediction_id, prediction['status'], elapsed, watch['polls'])
+                self._finish(watch['client'], prediction, events, tag, watch['model_key'], elapsed,
+                    watch['download_dir'])
+        else:
+            watch['next_poll'] = time.monotonic() + self._delay(elapsed, watch['expected'], watch['pushed'])
+
+    def _delay(self, elapsed, expected, pushed=False):
+        if pushed:
+            return self.fallback_interval
+        return next_poll_delay(elapsed, expected, self.min_interval, self.max_interval)
+
+    def _finish(self, client, prediction, events, tag, model_key, elapsed, download_dir=None):
+        _tracer.add_prediction(prediction, job=tag)
+        if prediction['status'] == 'succeeded':
+            duration = prediction_duration(prediction)
+            self.history.record(model_key, duration if duration is not None else elapsed)
+            self._workers.submit(self._download, client, prediction, events, tag, download_dir)
+        else:
+            events.put((tag, 'failed', prediction.get('error') or f"Prediction {prediction['status']}"))
+
+    def _download(self, client, prediction, events, tag, download_dir=None):
+        events.put((tag, 'downloading', None))
+        events.put((tag, 'status', "Downloading Image..."))
+        image_url = get_output_url(prediction)
+        with _tracer.job(tag), _tracer.span("download"):
+            if not image_url:
+                image = None
+            elif download_dir:
+                image = download_image_file(client, image_url, download_dir)
+            else:
+                image = download_image_bytes(client, image_url)
+        if image:
+            events.put((tag, 'succeeded', (image, prediction)))
+        else:
+            events.put((tag, 'failed', "Failed to download generated image"))
+
+_prediction_poller = None
+
+def get_prediction_poller():
+    global _prediction_poller
+    if _prediction_poller is None:
+        history_path = os.path.join(
+            bpy.utils.user_resource('DATAFILES', path="ai_texture_generator"), "latency.json")
+        _prediction_poller = PredictionPoller(LatencyHistory(history_path))
+    return _prediction_poller
+
+def create_prediction_request(url, data, wait=True, webhook=None):
+    """Return a submit callable for PredictionPoller.submit"""
+
+    if webhook:
+        data = dict(data, webhook=webhook, webhook_events_filter=["start", "completed"])
+
+    def create(client):
+        response = client.create_prediction(url, data, wait=wait)
+        if response.status_code != 201:
+            raise RuntimeError(f"Prediction submission failed: {response.text}")
+        return response.json()
+    return create
+
+WEBHOOK_PATH = "/replicate-webhook"
+
+def verify_webhook_signature(secret, headers, body, tolerance=300):
+    """Check a Replicate webhook signature (HMAC-SHA256 of "id.timestamp.body")"""
+
+    webhook_id = headers.get("webhook-id")
+    timestamp = headers.get("webhook-timestamp")
+    signatures = headers.get("webhook-signature")
+    if not (webhook_id and timestamp and signatures):
+        return False
+    try:
+        if abs(time.time() - int(timestamp)) > tolerance:
+            return False
+        key = base64.b64decode(secret.split("_", 1)[1] if secret.startswith("whsec_") else secret)
+    except ValueError:
+        return False
+    signed = f"{webhook_id}.{timestamp}.".encode() + body
+    expected = base64.b64encode(hmac.new(key, signed, hashlib.sha256).digest()).decode()
+    return any(hmac.compare_digest(expected, signature.split(",", 1)[-1])
+        for signature in signatures.split())
+
+class WebhookReceiver:
+    """Local HTTP listener that hands Replicate webhook events to the poller
+
+    Replicate has to reach it, so public_url is what gets registered with each
+    prediction, typically a tunnel or reverse proxy in front of host:port.
+    """
+
+    def __init__(self, poller, host="127.0.0.1", port=8765, public_url="", secret=""):
+        self.poller = poller
+        self.host = host
+        self.port = port
+        self.public_url = public_url.rstrip("/") or f"http://{host}:{port}"
+        self.secret = secret
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"{self.public_url}{WEBHOOK_PATH}"
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path.split("?", 1)[0] != WEBHOOK_PATH:
+                    self.send_error(404)
+                    return
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if receiver.secret and not verify_webhook_signature(
+                        receiver.secret, {k.lower(): v for k, v in self.headers.items()}, body):
+                    logger.warning("Rejected webhook with an invalid signature")
+                    self.send_error(401)
+                    return
+                try:
+                    prediction = json.loads(body)
+                except ValueError:
+                    self.send_error(400)
+                    return
+                receiver.poller.deliver(prediction)
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = Thread(target=self._server.serve_forever, name="ai-texture-webhooks", daemon=True)
+        self._thread.start()
+        logger.info("Listening for webhooks on %s:%s, registered as %s", self.host, self.port, self.url)
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+
+_webhook_receiver = None
+
+def get_webhook_url(context):
+    """Start, restart or stop the webhook receiver to match the preferences
+
+    Returns the URL to register with new predictions, or None to rely on polling.
+    Without a public URL Replicate cannot reach the listener, so no webhook is
+    used; registering a local address would only leave jobs waiting for the
+    slow fallback poll.
+    """
+
+    global _webhook_receiver
+    addon_prefs = context.preferences.addons["ai_texture_generator"].preferences
+    public_url = addon_prefs.webhook_public_url.strip().rstrip("/")
+    enabled = addon_prefs.use_webhook and bool(public_url)
+    config = (addon_prefs.webhook_host, addon_prefs.webhook_port, public_url, addon_prefs.webhook_secret)
+    if _webhook_receiver and (not enabled or config != (_webhook_receiver.host,
+            _webhook_receiver.port, _webhook_receiver.public_url, _webhook_receiver.secret)):
+        _webhook_receiver.stop()
+        _webhook_receiver = None
+    if not enabled:
+        return None
+    if _webhook_receiver is None:
+        receiver = WebhookReceiver(get_prediction_poller(), *config)
+        try:
+            receiver.start()
+        except OSError as e:
+            logger.warning("Could not start webhook receiver, falling back to polling: %s", e)
+            return None
+        _webhook_receiver = receiver
+    return _webhook_receiver.url
+
+def drain_events(events):
+    """Return every event currently waiting in a poller queue"""
+
+    drained = []
+    while True:
+        try:
+            drained.append(events.get_nowait())
+        except Empty:
+            return drained
+
+TextureSettings = namedtuple("TextureSettings", [
+    "make_seamless", "seamless_blend", "tiling_x", "tiling_y", "use_normal_map", "normal_strength",
+    "use_roughness", "use_height_map", "use_ao_map",
+])
+
+JobSettings = namedtuple("JobSettings", [
+    "kind", "prompt", "model", "object_name", "save_location", "save_dir", "texture",
+    "cache_key", "material_name", "texture_node_name", "upscale_factor",
+], defaults=(None, None, None, None, None))
+
+def snapshot_job_settings(context, kind, prompt="", **overrides):
+    """Capture everything a job needs from the scene and preferences on the main thread"""
+
+    addon_prefs = context.preferences.addons["ai_texture_generator"].preferences
+    texture_props = context.scene.ai_texture_props
+    save_dir = None
+    if addon_prefs.save_location == 'FOLDER' and bpy.data.filepath:
+        save_dir = os.path.dirname(bpy.data.filepath)
+    return JobSettings(
+        kind=kind,
+        prompt=prompt,
+        model=addon_prefs.active_model,
+        object_name=context.active_object.name if context.active_object else None,
+        save_location=addon_prefs.save_location,
+        save_dir=save_dir,
+        texture=TextureSettings(*(getattr(texture_props, name) for name in TextureSettings._fields)),
+    )._replace(**overrides)
+
+def job_download_dir(settings):
+    """Return the folder a job's image is streamed to, or None to download it into memory"""
+
+    if settings.kind == 'GENERATE' and settings.save_location == 'FOLDER' and settings.save_dir:
+        return settings.save_dir
+    return None
+
+class JobState(Enum):
+    QUEUED = "Queued"
+    SUBMITTING = "Submitting"
+    RUNNING = "Running"
+    DOWNLOADING = "Downloading"
+    APPLYING = "Applying"
+    SUCCEEDED = "Succeeded"
+    FAILED = "Failed"
+    CANCELLED = "Cancelled"
+
+JOB_TRANSITIONS = {
+    JobState.QUEUED: {JobState.SUBMITTING, JobState.APPLYING, JobState.CANCELLED},
+    JobState.SUBMITTING: {JobState.RUNNING, JobState.FAILED, JobState.CANCELLED},
+    JobState.RUNNING: {JobState.DOWNLOADING, JobState.FAILED, JobState.CANCELLED},
+    JobState.DOWNLOADING: {JobState.APPLYING, JobState.FAILED, JobState.CANCELLED},
+    JobState.APPLYING: {JobState.SUCCEEDED, JobState.FAILED},
+    JobState.SUCCEEDED: set(),
+    JobState.FAILED: set(),
+    JobState.CANCELLED: set(),
+}
+
+JOB_STATE_ICONS = {
+    JobState.QUEUED: 'SORTTIME',
+    JobState.SUBMITTING: 'EXPORT',
+    JobState.RUNNING: 'PLAY',
+    JobState.DOWNLOADING: 'IMPORT',
+    JobState.APPLYING: 'MATERIAL',
+    JobState.SUCCEEDED: 'CHECKMARK',
+    JobState.FAILED: 'ERROR',
+    JobState.CANCELLED: 'CANCEL',
+}
+
+class Job:
+    """One generation or upscale request and everything that happened to it
+
+    Settings are an immutable snapshot taken when the job was created, so the
+    worker threads never touch bpy data. Only the main thread changes state.
+    """
+
+    def __init__(self, settings, group=None):
+        self.id = uuid.uuid4().hex[:8]
+        self.settings = settings
+        self.group = group
+        self.state = JobState.QUEUED
+        self.status = JobState.QUEUED.value
+        self.prediction_id = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.submit_args = None
+        self.poll_label = "Generating"
+        self.model_key = None
+        self.output_material = None
+
+    @property
+    def label(self):
+        if self.settings.kind == 'UPSCALE':
+            return f"Upscale {self.settings.upscale_factor}x {self.settings.material_name}"
+        return self.settings.prompt
+
+    @property
+    def done(self):
+        return not JOB_TRANSITIONS[self.state]
+
+    @property
+    def timings(self):
+        """Seconds spent in each traced stage of this job"""
+
+        return _tracer.summary(self.id)
+
+    def transition(self, state):
+        if state not in JOB_TRANSITIONS[self.state]:
+            logger.debug("Job %s: ignoring transition %s -> %s", self.id, self.state.name, state.name)
+            return False
+        self.state = state
+        if self.done:
+            self.finished = time.time()
+        return True
+
+    def report(self, level, message):
+        """Operator-style report used by code shared with operators"""
+
+        log_level = logging.ERROR if 'ERROR' in level else logging.WARNING if 'WARNING' in level else logging.INFO
+        logger.log(log_level, "Job %s: %s", self.id, message)
+        if 'ERROR' in level:
+            self.error = message
+        self.status = message
+
+def job_settings_to_dict(settings):
+    data = settings._asdict()
+    data["texture"] = settings.texture._asdict() if settings.texture else None
+    return data
+
+def job_settings_from_dict(data):
+    texture = data.get("texture")
+    if texture is not None:
+        texture = TextureSettings(**{name: texture.get(name) for name in TextureSettings._fields})
+    return JobSettings(**dict({name: data.get(name) for name in JobSettings._fields}, texture=texture))
+
+class JobJournal:
+    """Record of submitted predictions that have not been applied yet
+
+    Entries are written to a Text datablock, so they travel with the .blend, and
+    to a sidecar JSON file next to it, so a crash before saving loses nothing.
+    """
+
+    TEXT_NAME = ".ai_texture_jobs.json"
+
+    def __init__(self):
+        self._written = None
+        self._wrote_untitled = False
+
+    def untitled_path(self):
+        return os.path.join(bpy.utils.user_resource('DATAFILES', path="ai_texture_generator"),
+            "untitled_jobs.json")
+
+    def sidecar_path(self):
+        if bpy.data.filepath:
+            return f"{bpy.data.filepath}.ai_jobs.json"
+        return self.untitled_path()
+
+    def load(self):
+        """Entries from the Text datablock and the sidecar, merged by prediction ID"""
+
+        entries = {}
+        text = bpy.data.texts.get(self.TEXT_NAME)
+        sources = [text.as_string()] if text else []
+        try:
+            with open(self.sidecar_path(), 'r') as f:
+                sources.append(f.read())
+        except OSError:
+            pass
+        for source in sources:
+            try:
+                for entry in json.loads(source or "[]"):
+                    entries[entry["prediction_id"]] = entry
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning("Could not read job journal: %s", e)
+        self._written = None
+        return list(entries.values())
+
+    def save(self, entries, force=False):
+        payload = json.dumps(entries, indent=1)
+        if payload == self._written and not force:
+            return
+        self._written = payload
+
+        text = bpy.data.texts.get(self.TEXT_NAME)
+        if entries and not text:
+            text = bpy.data.texts.new(self.TEXT_NAME)
+        if text:
+            text.clear()
+            text.write(payload)
+
+        path = self.sidecar_path()
+        try:
+            if entries:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = f"{path}.tmp"
+                with open(temp_path, 'w') as f:
+                    f.write(payload)
+                os.replace(temp_path, path)
+            elif os.path.exists(path):
+                os.remove(path)
+            if not bpy.data.filepath:
+                self._wrote_untitled = bool(entries)
+            elif self._wrote_untitled:
+                # The jobs have moved to the saved file's journal; left behind, the
+                # untitled one would be resumed in the next unrelated new file
+                self._wrote_untitled = False
+                untitled_path = self.untitled_path()
+                if os.path.exists(untitled_path):
+                    os.remove(untitled_path)
+        except OSError as e:
+            logger.warning("Could not write job journal: %s", e)
+
+class JobManager:
+    """Runs jobs concurrently through the prediction poller and applies their results
+
+    Poller events carry the job ID as their tag. A single main-thread timer drains
+    them, advances each job's state and applies finished results, so any number of
+    generations and upscales can be in flight at once without mixing up.
+    """
+
+    def __init__(self, poller, journal=None, interval=0.25, keep_finished=10):
+        self.poller = poller
+        self.journal = journal
+        self.interval = interval
+        self.keep_finished = keep_finished
+        self._jobs = {}
+        self._events = Queue()
+        self._group_limits = {}
+        # Timers are matched by identity, so register the same bound method every time
+        self._tick = self.process
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self):
+        return list(self._jobs.values())
+
+    def active_jobs(self):
+        return [job for job in self._jobs.values() if not job.done]
+
+    def submit(self, client, settings, create, label="Generating", model_key=None, group=None, limit=None,
+               pushed=False):
+        """Queue a job whose create(client) call submits its prediction"""
+
+        job = Job(settings, group)
+        job.submit_args = (client, create, label, model_key, pushed)
+        job.poll_label = label
+        job.model_key = model_key
+        if group and limit:
+            self._group_limits[group] = limit
+        self._jobs[job.id] = job
+        self._start_queued()
+        self._ensure_timer()
+        return job
+
+    def add_finished(self, settings, image, group=None):
+        """Queue a job whose ImageBytes are already at hand, such as a generation cache hit"""
+
+        job = Job(settings, group)
+        job.result = (image, None)
+        self._jobs[job.id] = job
+        self._events.put((job.id, 'succeeded', job.result))
+        self._ensure_timer()
+        return job
+
+    def cancel(self, job_id=None):
+        """Cancel one job, or every unfinished job when job_id is None"""
+
+        if job_id:
+            jobs = [self._jobs[job_id]] if job_id in self._jobs else []
+        else:
+            jobs = self.active_jobs()
+        for job in jobs:
+            if job.transition(JobState.CANCELLED):
+                job.status = JobState.CANCELLED.value
+                if job.prediction_id:
+                    self.poller.unwatch(job.prediction_id)
+        self.sync_journal()
+        return len(jobs)
+
+    def resume(self, client, entries):
+        """Watch predictions from the journal again and apply them when they finish"""
+
+        resumed = 0
+        known = {job.prediction_id for job in self._jobs.values()}
+        for entry in entries:
+            if entry["prediction_id"] in known:
+                continue
+            try:
+                settings = job_settings_from_dict(entry["settings"])
+            except (KeyError, TypeError) as e:
+                logger.warning("Skipping unreadable journal entry: %s", e)
+                continue
+            job = Job(settings)
+            job.id = entry.get("job_id") or job.id
+            job.prediction_id = entry["prediction_id"]
+            job.poll_label = entry.get("label") or job.poll_label
+            job.model_key = entry.get("model_key")
+            # The prediction was submitted in an earlier session, so it is already running
+            job.state = JobState.RUNNING
+            job.status = "Resuming..."
+            self._jobs[job.id] = job
+            self.poller.watch(client, job.prediction_id, self._events, job.id, job.poll_label, job.model_key,
+                download_dir=job_download_dir(settings))
+            resumed += 1
+        if resumed:
+            logger.info("Resumed %s unfinished job(s) from the journal", resumed)
+            self._ensure_timer()
+        return resumed
+
+    def reset(self):
+        """Forget every job without touching the journal, used when another file is loaded"""
+
+        for job in self._jobs.values():
+            if job.prediction_id and not job.done:
+                self.poller.unwatch(job.prediction_id)
+        self._jobs.clear()
+        if bpy.app.timers.is_registered(self._tick):
+            bpy.app.timers.unregister(self._tick)
+
+    def sync_journal(self, force=False):
+        if not self.journal:
+            return
+        self.journal.save([{
+            "job_id": job.id,
+            "prediction_id": job.prediction_id,
+            "label": job.poll_label,
+            "model_key": job.model_key,
+            "created": job.created,
+            "settings": job_settings_to_dict(job.settings),
+        } for job in self._jobs.values()
+            if job.prediction_id and job.state in {JobState.RUNNING, JobState.DOWNLOADING}], force)
+
+    def clear_finished(self):
+        for job in [job for job in self._jobs.values() if job.done]:
+            del self._jobs[job.id]
+
+    def stop(self):
+        """Stop driving jobs when the addon is disabled, leaving unfinished ones in the journal to resume"""
+
+        self.sync_journal(force=True)
+        self.reset()
+
+    def _ensure_timer(self):
+        if not bpy.app.timers.is_registered(self._tick):
+            bpy.app.timers.register(self._tick, first_interval=self.interval, persistent=True)
+
+    def _start_queued(self):
+        running = {}
+        for job in self._jobs.values():
+            if job.group and job.state in {JobState.SUBMITTING, JobState.RUNNING, JobState.DOWNLOADING}:
+                running[job.group] = running.get(job.group, 0) + 1
+        for job in list(self._jobs.values()):
+            if job.state != JobState.QUEUED or not job.submit_args:
+                continue
+            limit = self._group_limits.get(job.group)
+            if limit and running.get(job.group, 0) >= limit:
+                continue
+            client, create, label, model_key, pushed = job.submit_args
+            job.transition(JobState.SUBMITTING)
+            job.status = "Submitting..."
+            self.poller.submit(client, self._events, job.id, create, label=label, model_key=model_key,
+                pushed=pushed, download_dir=job_download_dir(job.settings))
+            if job.group:
+                running[job.group] = running.get(job.group, 0) + 1
+
+    def _prune(self):
+        finished = sorted((job for job in self._jobs.values() if job.done), key=lambda job: job.finished)
+        for job in finished[:-self.keep_finished] if self.keep_finished else finished:
+            del self._jobs[job.id]
+
+    def _apply(self, context, job):
+        job.transition(JobState.APPLYING)
+        job.status = "Applying..."
+        try:
+            with _tracer.job(job.id), _tracer.span("apply", kind=job.settings.kind):
+                applied = JOB_APPLIERS[job.settings.kind](context, job)
+        except Exception as e:
+            logger.error("Job %s: error applying result: %s", job.id, e)
+            applied = False
+            job.error = str(e)
+        if applied:
+            job.transition(JobState.SUCCEEDED)
+            job.status = "Done"
+        else:
+            job.transition(JobState.FAILED)
+            job.status = job.error or "Could not apply result"
+
+    def process(self):
+        """Timer callback: drain poller events, advance jobs and apply finished results"""
+
+        context = bpy.context
+        for job_id, kind, payload in drain_events(self._events):
+            job = self._jobs.get(job_id)
+            if not job or job.done:
+                if job and job.state == JobState.CANCELLED and kind == 'submitted':
+                    self.poller.unwatch(payload)
+                elif kind == 'succeeded' and isinstance(payload[0], ImageFile):
+                    # Nothing will use the file of a job cancelled during its download
+                    try:
+                        os.remove(payload[0].path)
+                    except OSError:
+                        pass
+                continue
+            if kind == 'status':
+                job.status = payload
+                context.scene.progress_status = f"{job.label[:24]}: {payload}"
+            elif kind == 'submitted':
+                job.prediction_id = payload
+                job.transition(JobState.RUNNING)
+                logger.debug("Job %s: got prediction ID %s", job.id, payload)
+            elif kind == 'downloading':
+                job.transition(JobState.DOWNLOADING)
+            elif kind == 'failed':
+                logger.error("Job %s failed: %s", job.id, payload)
+                job.error = str(payload)
+                job.status = f"Failed: {payload}"
+                job.transition(JobState.FAILED)
+            elif kind == 'succeeded':
+                job.result = payload
+                self._apply(context, job)
+
+        self._start_queued()
+        self._prune()
+        self.sync_journal()
+        for window in context.window_manager.windows:
+            for area in window.screen.areas:
+                if area.type == 'PROPERTIES':
+                    area.tag_redraw()
+        return self.interval if self.active_jobs() else None
+
+_job_manager = None
+
+def get_job_manager():
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager(get_prediction_poller(), JobJournal())
+    return _job_manager
+
+@bpy.app.handlers.persistent
+def ai_job_journal_resume(*args):
+    manager = get_job_manager()
+    manager.reset()
+    entries = manager.journal.load()
+    if not entries:
+        return
+    addon = bpy.context.preferences.addons.get("ai_texture_generator")
+    if not addon or not addon.preferences.api_key:
+        logger.warning("Not resuming %s journaled job(s): no API key set", len(entries))
+        return
+    manager.resume(get_replicate_client(bpy.context), entries)
+
+@bpy.app.handlers.persistent
+def ai_job_journal_save(*args):
+    get_job_manager().sync_journal(force=True)
+
+def apply_generation_job(context, job):
+    """Cache and apply the image of a finished generation job"""
+
+    settings = job.settings
+    image, prediction = job.result
+    if isinstance(image, ImageFile):
+        # Track the file before anything can fail so an unused one is reclaimed later
+        get_storage_manager().track(image.path)
+    if settings.cache_key and prediction is not None:
+        try:
+            get_generation_cache(context).put(settings.cache_key, image, {
+                "prompt": settings.prompt,
+                "model": settings.model,
+                "output": get_output_url(prediction),
+            })
+        except Exception as e:
+            logger.warning("Could not cache generated image: %s", e)
+    obj = None
+    if settings.object_name:
+        obj = bpy.data.objects.get(settings.object_name)
+        if not obj:
+            raise RuntimeError(f"Object {settings.object_name} no longer exists")
+    material = apply_generated_image(context, image, settings.prompt, job.report, obj=obj, settings=settings)
+    job.output_material = material.name if material else None
+    return material is not None
+
+def apply_upscale_job(context, job):
+    """Swap the upscaled image into the texture node the job was started from"""
+
+    settings = job.settings
+    image, _ = job.result
+    material = bpy.data.materials.get(settings.material_name)
+    texture_node = material.node_tree.nodes.get(settings.texture_node_name) if material and material.node_tree else None
+    if not texture_node or not texture_node.image:
+        raise RuntimeError("Could not find texture node")
+    
+    logger.debug("Packing %s (%s bytes)", image.filename, len(image.data))
+    with _tracer.span("pack"):
+        new_image, reused = load_image_deduplicated(image)
+    if not reused:
+        new_image.name = f"upscaled_{settings.upscale_factor}x_{full_resolution_image(material, texture_node).name}"
+    logger.debug("Loaded new image: %s", new_image.name)
+    
+    if not (new_image.size[0] > 0 and new_image.size[1] > 0 and new_image.channels > 0):
+        logger.error("Invalid image properties")
+        logger.debug("Size: %sx%s", new_image.size[0], new_image.size[1])
+        logger.debug("Channels: %s", new_image.channels)
+        raise RuntimeError("Invalid image properties")
+    
+    logger.debug("Image verified: %sx%s (%s channels)", new_image.size[0], new_image.size[1], new_image.channels)
+    
+    if not new_image.packed_file:
+        logger.debug("Packing image...")
+        with _tracer.span("pack"):
+            new_image.pack()
+        logger.debug("Image packed successfully")
+    
+    texture_node.image = new_image
+    material["ai_full_image"] = new_image
+    create_lod_images(new_image, settings.save_dir)
+    set_texture_lod(material, texture_node, context.scene.ai_texture_props.viewport_resolution, settings.save_dir)
+    
+    job.output_material = material.name
+    material["ai_upscale"] = int(material.get("ai_upscale", 1)) * settings.upscale_factor
+    material["ai_texture_node"] = texture_node.name
+    get_material_registry().add(material)
+    
+    material.update_tag()
+    material.node_tree.update_tag()
+    new_image.update_tag()
+    
+    job.report({'INFO'}, "Texture upscaled successfully")
+    return True
+
+JOB_APPLIERS = {
+    'GENERATE': apply_generation_job,
+    'UPSCALE': apply_upscale_job,
+}
+
+def sanitize_name(name):
+    """Convert prompt text to a valid material name"""
+
+    valid_name = "".join(c for c in name if c.isalnum() or c in (' ', '_', '-'))
+    valid_name = valid_name.strip().replace(' ', '_')
+    return valid_name[:32]
+
+def downsample_pixels(pixels, width, height):
+    """Box-filter a (rows, columns, channels) array down to height x width
+
+    Every output pixel is the mean of the source pixels that fall in its cell,
+    summed with np.add.reduceat so memory stays proportional to the output.
+    """
+
+    for axis, size in ((0, height), (1, width)):
+        source_size = pixels.shape[axis]
+        if size >= source_size:
+            continue
+        starts = (np.arange(size) * source_size) // size
+        counts = np.diff(np.append(starts, source_size)).astype(np.float32)
+        pixels = np.add.reduceat(pixels, starts, axis=axis)
+        pixels /= counts.reshape((size, 1, 1) if axis == 0 else (1, size, 1))
+    return pixels
+
+def rgba_pixels(pixels):
+    """Expand a (rows, columns, channels) array to the four channels bpy images store"""
+
+    if pixels.shape[2] == 4:
+        return pixels
+    rgba = np.ones(pixels.shape[:2] + (4,), dtype=np.float32)
+    rgba[..., :3] = pixels[..., :3] if pixels.shape[2] >= 3 else pixels[..., :1]
+    return rgba
+
+def pixels_to_bytes(pixels):
+    """Convert bottom-up float pixels to top-down 8-bit values for encoding"""
+
+    return np.clip(pixels[::-1] * 255.0 + 0.5, 0, 255).astype(np.uint8)
+
+def encode_png(pixels, compression=6):
+    """Encode a top-down (height, width, channels) uint8 array as PNG bytes"""
+
+    height, width, channels = pixels.shape
+    color_type = {1: 0, 2: 4, 3: 2, 4: 6}[channels]
+    scanlines = np.zeros((height, width * channels + 1), dtype=np.uint8)
+    scanlines[:, 1:] = pixels.reshape(height, width * channels)
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + \
+        chunk(b"IDAT", zlib.compress(scanlines.tobytes(), compression)) + chunk(b"IEND", b"")
+
+def hash_file(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def image_content_key(image):
+    """Cheap fingerprint of the content an image's hash was taken from, or None if it cannot be trusted
+
+    The packed file is replaced whenever an image is packed again, and a file
+    on disk changes its modification time when saved or painted over and
+    reloaded. Images with unsaved pixel changes have no fingerprint.
+    """
+
+    if image.is_dirty:
+        return None
+    if image.packed_file:
+        return f"packed:{image.packed_file.as_pointer()}:{image.packed_file.size}"
+    filepath = bpy.path.abspath(image.filepath) if image.filepath else ""
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return None
+    return f"file:{os.path.normcase(filepath)}:{stat.st_mtime_ns}:{stat.st_size}"
+
+def remember_content_hash(image, content_hash):
+    image["ai_content_hash"] = content_hash
+    content_key = image_content_key(image)
+    if content_key:
+        image["ai_content_key"] = content_key
+    elif "ai_content_key" in image:
+        del image["ai_content_key"]
+
+def image_content_hash(image, remember=True):
+    """SHA-256 of an image's content, remembered on the image until the content changes
+
+    Packed images hash their packed bytes and file images the file on disk, so
+    nothing is decoded. Only generated or modified images fall back to pixels.
+    The remembered hash is trusted only while image_content_key still matches;
+    with remember=False nothing is written to the image.
+    """
+
+    content_key = image_content_key(image)
+    content_hash = image.get("ai_content_hash")
+    if content_hash and content_key and image.get("ai_content_key") == content_key:
+        return content_hash
+    filepath = bpy.path.abspath(image.filepath) if image.filepath else ""
+    if image.packed_file and not image.is_dirty:
+        content_hash = hashlib.sha256(image.packed_file.data).hexdigest()
+    elif filepath and os.path.exists(filepath) and not image.is_dirty:
+        content_hash = hash_file(filepath)
+    else:
+        content_hash = hashlib.sha256(read_image_pixels(image).tobytes()).hexdigest()
+    if remember:
+        remember_content_hash(image, content_hash)
+    return content_hash
+
+class ImageHashIndex:
+    """Map of source key to image datablock name for images the addon loaded
+
+    The source key is the hash of the downloaded content plus the processing
+    applied after loading, so an image is only reused for a request that would
+    have produced the same pixels.
+    """
+
+    def __init__(self):
+        self._names = None
+
+    def reset(self):
+        self._names = None
+
+    def _ensure(self):
+        if self._names is None:
+            self._names = {image["ai_source_key"]: image.name
+                for image in bpy.data.images if "ai_source_key" in image}
+
+    def find(self, source_key):
+        self._ensure()
+        image = bpy.data.images.get(self._names.get(source_key, ""))
+        if image and image.get("ai_source_key") == source_key:
+            return image
+        self._names.pop(source_key, None)
+        return None
+
+    def add(self, image):
+        self._ensure()
+        self._names[image["ai_source_key"]] = image.name
+
+_image_hash_index = ImageHashIndex()
+
+def image_from_bytes(source):
+    """Create an image packed straight from encoded ImageBytes, without touching the disk"""
+
+    image = bpy.data.images.new(source.filename, 8, 8)
+    image.pack(data=source.data, data_len=len(source.data))
+    image.source = 'FILE'
+    image.filepath_raw = f"//textures/{source.filename}"
+    return image
+
+@_tracer.traced("load")
+def load_image_deduplicated(source, content_hash=None, processing=""):
+    """Load an image file or ImageBytes, reusing an existing datablock with identical content
+
+    ImageBytes are packed into the blend file directly. Returns (image, reused).
+    processing describes what the caller does to a new image after loading,
+    such as the seamless pass; only images loaded with the same description are
+    reused. A reused image keeps its name and that processing, so callers
+    should skip renaming and post-processing.
+    """
+
+    in_memory = isinstance(source, ImageBytes)
+    content_hash = content_hash or (source.content_hash if in_memory else hash_file(source))
+    source_key = f"{content_hash}:{processing}" if processing else content_hash
+    existing = _image_hash_index.find(source_key)
+    if existing:
+        logger.debug("Reusing image %s with identical content", existing.name)
+        return existing, True
+    image = image_from_bytes(source) if in_memory else bpy.data.images.load(source, check_existing=False)
+    remember_content_hash(image, content_hash)
+    image["ai_source_key"] = source_key
+    image["ai_managed"] = True
+    _image_hash_index.add(image)
+    return image, False
+
+def merge_duplicate_images():
+    """Merge addon image datablocks with identical content, remapping their users to one keeper
+
+    Only file or packed images the addon made are considered; generated images
+    such as blank bake targets and paint canvases are the user's and are never
+    merged, however alike their pixels. Returns (merged_count, freed_pixel_bytes).
+    """
+
+    groups = {}
+    for image in list(bpy.data.images):
+        if image.source != 'FILE' or image.type != 'IMAGE':
+            continue
+        if not (image.get("ai_managed") or "ai_content_hash" in image):
+            continue
+        filepath = bpy.path.abspath(image.filepath) if image.filepath else ""
+        if not image.packed_file and not os.path.exists(filepath):
+            continue
+        try:
+            content_hash = image_content_hash(image)
+        except Exception as e:
+            logger.warning("Could not hash %s: %s", image.name, e)
+            continue
+        groups.setdefault((content_hash, image.colorspace_settings.name), []).append(image)
+
+    merged = 0
+    freed = 0
+    for images in groups.values():
+        if len(images) < 2:
+            continue
+        keeper = max(images, key=lambda image: (bool(image.packed_file), image.users))
+        for duplicate in images:
+            if duplicate == keeper:
+                continue
+            freed += duplicate.size[0] * duplicate.size[1] * duplicate.channels * 4
+            logger.info("Merging duplicate image %s into %s", duplicate.name, keeper.name)
+            duplicate.user_remap(keeper)
+            bpy.data.images.remove(duplicate)
+            merged += 1
+    _image_hash_index.reset()
+    return merged, freed
+
+GENERATED_FILE_PATTERN = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}_.+\.(png|jpe?g|webp)$")
+
+def image_abspath(image):
+    return os.path.normcase(os.path.abspath(bpy.path.abspath(image.filepath))) if image.filepath else ""
+
+class StorageManager:
+    """Tracks the files the addon writes next to a blend file and reclaims the unused ones
+
+    The record is a <blend>.ai_files.json sidecar with paths relative to the
+    blend file's folder. Generation files written before tracking existed are
+    adopted only while an AI image of this file points at them; files that
+    merely look generated may belong to another blend file in the same folder
+    and are never touched. Only tracked files inside that folder are ever
+    deleted, and only when no image datablock points at them.
+    """
+
+    def __init__(self, blend_path):
+        self.blend_path = blend_path
+        self.directory = os.path.dirname(blend_path) if blend_path else None
+        self.files = {}
+        self.total = 0
+        self._load()
+
+    @property
+    def sidecar_path(self):
+        return f"{self.blend_path}.ai_files.json" if self.blend_path else None
+
+    def _load(self):
+        if not self.sidecar_path or not os.path.exists(self.sidecar_path):
+            return
+        try:
+            with open(self.sidecar_path, 'r') as f:
+                files = json.load(f).get("files", {})
+            self.files = {os.path.normcase(relative_path): entry for relative_path, entry in files.items()}
+        except (OSError, ValueError) as e:
+            logger.warning("Could not read storage record: %s", e)
+        self.total = sum(entry["size"] for entry in self.files.values())
+
+    def _save(self):
+        if not self.sidecar_path:
+            return
+        try:
+            temp_path = f"{self.sidecar_path}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump({"files": self.files}, f, indent=1)
+            os.replace(temp_path, self.sidecar_path)
+        except OSError as e:
+            logger.warning("Could not write storage record: %s", e)
+
+    def abspath(self, relative_path):
+        return os.path.normcase(os.path.join(self.directory, relative_path))
+
+    def track(self, path):
+        """Record a file the addon wrote; files outside the project folder are ignored"""
+
+        if not self.directory:
+            return
+        relative_path = self.relative_path(path)
+        if relative_path.startswith(os.pardir) or os.path.isabs(relative_path):
+            return
+        previous = self.files.get(relative_path, {}).get("size", 0)
+        size = os.path.getsize(path)
+        self.files[relative_path] = {"size": size, "created": time.time()}
+        self.total += size - previous
+        self._save()
+
+    def refresh(self):
+        """Re-measure tracked files, forget deleted ones and adopt generation files this file's images use"""
+
+        if not self.directory:
+            return
+        for relative_path in list(self.files):
+            try:
+                self.files[relative_path]["size"] = os.path.getsize(self.abspath(relative_path))
+            except OSError:
+                del self.files[relative_path]
+        for image in bpy.data.images:
+            path = image_abspath(image)
+            if not path or not (image.get("ai_managed") or GENERATED_FILE_PATTERN.match(os.path.basename(path))):
+                continue
+            relative_path = self.relative_path(path)
+            if relative_path and relative_path not in self.files and not relative_path.startswith(os.pardir) \
+                    and os.path.isfile(path):
+                self.files[relative_path] = {"size": os.path.getsize(path), "created": os.path.getmtime(path)}
+        self.total = sum(entry["size"] for entry in self.files.values())
+        self._save()
+
+    def _delete(self, relative_path, dry_run):
+        if not dry_run:
+            try:
+                os.remove(self.abspath(relative_path))
+            except OSError as e:
+                logger.warning("Could not delete %s: %s", relative_path, e)
+                return 0
+        size = self.files[relative_path]["size"]
+        if not dry_run:
+            del self.files[relative_path]
+            self.total -= size
+        return size
+
+    def reclaim(self, dry_run=True, budget=None):
+        """Remove unused AI images and files, or with a budget only until the files fit in it
+
+        Without a budget every image the addon made that has no users is removed,
+        then every tracked file no remaining image points at. With a budget in
+        bytes, unreferenced files go first, oldest first, followed by the LOD
+        variants of live materials, which are rebuilt when next needed. Returns
+        a report dict; with dry_run nothing is changed.
+        """
+
+        self.refresh()
+        report = {"images": [], "files": [], "lods": [], "total": self.total, "freed": 0}
+        remaining = self.total
+
+        orphan_images = [image for image in bpy.data.images if image.get("ai_managed") and image.users == 0]
+        orphan_pointers = {image.as_pointer() for image in orphan_images}
+        referenced = {image_abspath(image) for image in bpy.data.images
+            if image.as_pointer() not in orphan_pointers and image.filepath}
+        orphan_files = sorted((relative_path for relative_path in self.files
+            if self.abspath(relative_path) not in referenced), key=lambda p: self.files[p]["created"])
+
+        for relative_path in orphan_files:
+            if budget is not None and remaining <= budget:
+                break
+            freed = self._delete(relative_path, dry_run)
+            remaining -= freed
+            report["files"].append((relative_path, freed))
+
+        deleted = {self.abspath(relative_path) for relative_path, _ in report["files"]}
+        for image in orphan_images:
+            if budget is not None and image_abspath(image) not in deleted:
+                continue
+            report["images"].append((image.name, image.size[0] * image.size[1] * image.channels * 4))
+            if not dry_run:
+                bpy.data.images.remove(image)
+
+        if budget is not None and remaining > budget:
+            shown_by = {}
+            for material, texture_node in ai_texture_materials():
+                full = full_resolution_image(material, texture_node)
+                shown_by.setdefault(full.as_pointer(), (full, []))[1].append(texture_node)
+            candidates = []
+            for full, texture_nodes in shown_by.values():
+                for size in LOD_SIZES:
+                    lod = full.get(f"ai_lod_{size}")
+                    relative_path = lod and self.relative_path(image_abspath(lod))
+                    if relative_path in self.files:
+                        candidates.append((self.files[relative_path]["created"], full, texture_nodes, size, lod,
+                            relative_path))
+            for _, full, texture_nodes, size, lod, relative_path in sorted(candidates, key=lambda c: c[0]):
+                if remaining <= budget:
+                    break
+                image_name = full.name
+                if not dry_run:
+                    for texture_node in texture_nodes:
+                        if texture_node.image == lod:
+                            texture_node.image = full
+                    del full[f"ai_lod_{size}"]
+                    if lod.users == 0:
+                        bpy.data.images.remove(lod)
+                freed = self._delete(relative_path, dry_run)
+                remaining -= freed
+                report["lods"].append((image_name, size, freed))
+
+        if not dry_run:
+            self._save()
+        report["freed"] = report["total"] - remaining
+        report["remaining"] = remaining
+        report["over_budget"] = max(0, remaining - budget) if budget is not None else 0
+        verb = "Would free" if dry_run else "Freed"
+        logger.info("%s %.1f MB: %s files, %s images, %s LOD variants",
+            verb, report['freed'] / (1024 * 1024), len(report['files']), len(report['images']), len(report['lods']))
+        for name, size in report["images"]:
+            logger.info("%s image %s", 'Would remove' if dry_run else 'Removed', name)
+        for relative_path, size in report["files"]:
+            logger.info("%s %s (%.0f KB)", 'Would delete' if dry_run else 'Deleted', relative_path, size / 1024)
+        for image_name, size, freed in report["lods"]:
+            logger.info("%s the %s px variant of %s", 'Would drop' if dry_run else 'Dropped', size, image_name)
+        return report
+
+    def relative_path(self, path):
+        """Return path relative to the blend file's folder, case-normalised like the record's keys"""
+
+        if not self.directory or not path:
+            return None
+        return os.path.relpath(os.path.normcase(os.path.abspath(path)), os.path.normcase(self.directory))
+
+_storage_manager = None
+
+def get_storage_manager():
+    global _storage_manager
+    if _storage_manager is None or _storage_manager.blend_path != bpy.data.filepath:
+        _storage_manager = StorageManager(bpy.data.filepath)
+    return _storage_manager
+
+def enforce_storage_budget(context):
+    """Reclaim space when the project's tracked files exceed the scene's storage budget"""
+
+    budget_mb = context.scene.ai_texture_props.storage_budget
+    storage = get_storage_manager()
+    if budget_mb and storage.total > budget_mb * 1024 * 1024:
+        report = storage.reclaim(dry_run=False, budget=budget_mb * 1024 * 1024)
+        if report["over_budget"]:
+            logger.warning("Generated files are %.1f MB over the storage budget; the rest are in use",
+                report['over_budget'] / (1024 * 1024))
+
+class MaxRectsBin:
+    """Free-rectangle bookkeeping for one atlas page, using MaxRects best short side fit"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.used_height = 0
+        self.free = [(0, 0, width, height)]
+
+    def insert(self, width, height):
+        """Place a width x height rectangle and return its (x, y), or None if it does not fit"""
+
+        best = None
+        for fx, fy, fw, fh in self.free:
+            if width <= fw and height <= fh:
+                score = (min(fw - width, fh - height), max(fw - width, fh - height))
+                if best is None or score < best[0]:
+                    best = (score, fx, fy)
+        if best is None:
+            return None
+        x, y = best[1:]
+        self._split(x, y, width, height)
+        self.used_height = max(self.used_height, y + height)
+        return x, y
+
+    def _split(self, x, y, width, height):
+        free = []
+        for fx, fy, fw, fh in self.free:
+            if x >= fx + fw or x + width <= fx or y >= fy + fh or y + height <= fy:
+                free.append((fx, fy, fw, fh))
+                continue
+            if x > fx:
+                free.append((fx, fy, x - fx, fh))
+            if x + width < fx + fw:
+                free.append((x + width, fy, fx + fw - x - width, fh))
+            if y > fy:
+                free.append((fx, fy, fw, y - fy))
+            if y + height < fy + fh:
+                free.append((fx, y + height, fw, fy + fh - y - height))
+
+        def contained(i, a):
+            return any(j != i and (a != b or j < i) and a[0] >= b[0] and a[1] >= b[1]
+                and a[0] + a[2] <= b[0] + b[2] and a[1] + a[3] <= b[1] + b[3] for j, b in enumerate(free))
+
+        self.free = [a for i, a in enumerate(free) if not contained(i, a)]
+
+def pack_rectangles(sizes, page_size):
+    """Pack (width, height) sizes onto as few page_size pages as needed
+
+    Returns a (page, x, y) placement per size, in input order, and the pages.
+    """
+
+    placements = [None] * len(sizes)
+    pages = []
+    for i in sorted(range(len(sizes)), key=lambda i: (max(sizes[i]), min(sizes[i])), reverse=True):
+        width, height = sizes[i]
+        if width > page_size or height > page_size:
+            raise ValueError(f"A {width}x{height} tile does not fit a {page_size} atlas")
+        for page_index, page in enumerate(pages):
+            position = page.insert(width, height)
+            if position:
+                break
+        else:
+            page = MaxRectsBin(page_size, page_size)
+            pages.append(page)
+            page_index, position = len(pages) - 1, page.insert(width, height)
+        placements[i] = (page_index,) + position
+    return placements, pages
+
+ATLAS_UV_NAME = "AI_Atlas"
+
+def texture_uv_transform(texture_node):
+    """Scale and offset the mapping in front of texture_node applies to UVs, or None if rotated"""
+
+    links = texture_node.inputs['Vector'].links
+    mapping = links[0].from_node if links else None
+    if mapping and mapping.type == 'GROUP' and "Tiling X" in mapping.inputs:
+        return (mapping.inputs["Tiling X"].default_value, mapping.inputs["Tiling Y"].default_value), (0.0, 0.0)
+    if not mapping or mapping.type != 'MAPPING':
+        return (1.0, 1.0), (0.0, 0.0)
+    inputs = mapping.inputs
+    if mapping.vector_type != 'POINT' or any(abs(value) > 1e-6 for value in inputs['Rotation'].default_value):
+        return None
+    scale, location = inputs['Scale'].default_value, inputs['Location'].default_value
+    return (scale[0], scale[1]), (location[0], location[1])
+
+def read_mesh_uv_faces(mesh):
+    """Read a mesh's render UVs, per-loop polygon index and per-polygon material index at once
+
+    Returns (uv, loop_polygon, polygon_starts, polygon_order, material_index),
+    or None when the mesh has no UV map.
+    """
+
+    uv_layer = next((layer for layer in mesh.uv_layers if layer.active_render), None)
+    if not uv_layer or not mesh.polygons:
+        return None
+    uv = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+    uv_layer.data.foreach_get("uv", uv)
+    count = len(mesh.polygons)
+    starts = np.empty(count, dtype=np.int32)
+    totals = np.empty(count, dtype=np.int32)
+    material_index = np.empty(count, dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", starts)
+    mesh.polygons.foreach_get("loop_total", totals)
+    mesh.polygons.foreach_get("material_index", material_index)
+    order = np.argsort(starts, kind='stable')
+    loop_polygon = np.empty(len(mesh.loops), dtype=np.int32)
+    loop_polygon[:] = np.repeat(order, totals[order])
+    return uv.reshape(-1, 2), loop_polygon, starts[order], order, material_index
+
+def plan_atlas_uvs(mesh, transforms):
+    """Bring a mesh's UVs into texture space and drop each face's whole-tile offset
+
+    transforms maps slot index to the (scale, location) of its material's
+    Mapping node. A tiling texture repeats every unit, so shifting a face by
+    whole tiles does not change what it shows; faces that still leave the unit
+    square afterwards span several tiles and cannot be atlased. Returns
+    (face_uv, loop_slot, unfit_slots) or None when the mesh has no UVs.
+    """
+
+    faces = read_mesh_uv_faces(mesh)
+    if faces is None:
+        return None
+    uv, loop_polygon, sorted_starts, order, material_index = faces
+    loop_slot = material_index[loop_polygon]
+    slot_count = max(len(mesh.materials), int(material_index.max()) + 1)
+    scale = np.ones((slot_count, 2), dtype=np.float32)
+    location = np.zeros((slot_count, 2), dtype=np.float32)
+    for slot, (slot_scale, slot_location) in transforms.items():
+        scale[slot] = slot_scale
+        location[slot] = slot_location
+    face_uv = uv * scale[loop_slot] + location[loop_slot]
+    face_min = np.empty((len(order), 2), dtype=np.float32)
+    face_min[order] = np.minimum.reduceat(face_uv, sorted_starts, axis=0)
+    face_uv -= np.floor(face_min)[loop_polygon]
+    unfit = (face_uv > 1.0 + 1e-4).any(axis=1)
+    return face_uv, loop_slot, set(np.unique(loop_slot[unfit]).tolist())
+
+def atlas_tile_size(image, max_tile_size):
+    width, height = image.size
+    scale = min(1.0, max_tile_size / max(width, height))
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+def atlas_tile_pixels(image, max_tile_size, padding):
+    """An image's RGBA pixels, box-filtered down to max_tile_size, with edge pixels bled into the padding"""
+
+    pixels = rgba_pixels(downsample_pixels(read_image_pixels(image), *atlas_tile_size(image, max_tile_size)))
+    return np.pad(pixels, ((padding, padding), (padding, padding), (0, 0)), mode='edge')
+
+def build_atlas_material(context, image, source_names, maps):
+    """Create a registered AI material that shows image through the atlas UV map"""
+
+    atlas_uuid = uuid.uuid4().hex[:8]
+    material = bpy.data.materials.new(get_material_registry().unique_material_name("AI_Material_atlas", atlas_uuid))
+    material.use_nodes = True
+    texture = build_ai_material_nodes(material, image, f"AI_Texture_Node_{atlas_uuid}", uv_map=ATLAS_UV_NAME)
+    texture.extension = 'EXTEND'
+
+    material["ai_model"] = "atlas"
+    material["ai_prompt"] = f"Atlas of {len(source_names)} textures"
+    material["ai_texture_node"] = texture.name
+    texture_props = context.scene.ai_texture_props
+    update_ai_material(material, TextureSettings(
+        make_seamless=False, seamless_blend=0.0, tiling_x=1.0, tiling_y=1.0,
+        use_normal_map='normal' in maps, normal_strength=texture_props.normal_strength,
+        use_roughness='roughness' in maps, use_height_map='height' in maps, use_ao_map='ao' in maps,
+    ), map_save_dir(context))
+    material["ai_upscale"] = 1
+    material["ai_atlas_sources"] = sorted(source_names)
+    get_material_registry().add(material)
+    return material
+
+@_tracer.traced("atlas")
+def pack_texture_atlases(context, objects, atlas_size=4096, max_tile_size=1024, padding=8):
+    """Pack the AI textures used by objects' meshes into shared atlas materials
+
+    Every AI material whose faces fit inside one texture tile gets a tile on an
+    atlas page; its faces are remapped into the tile on the AI_Atlas UV map and
+    their slots switched to the page's material, so the meshes end up with one
+    material per page. Returns (atlased_count, atlas_materials, skipped_names).
+    """
+
+    registry = get_material_registry()
+    meshes = {}
+    for obj in objects:
+        if obj.type == 'MESH':
+            meshes.setdefault(obj.data.as_pointer(), obj.data)
+
+    sources = {}
+    skipped = {}
+    for mesh in meshes.values():
+        for material in mesh.materials:
+            if not material or material.name in sources or material.name in skipped or "ai_atlas_sources" in material:
+                continue
+            entry = registry.get(material)
+            texture_node = entry.texture_node if entry else (material.node_tree.nodes.get(material["ai_texture_node"])
+                if "ai_texture_node" in material and material.node_tree else None)
+            image = full_resolution_image(material, texture_node) if texture_node else None
+            if not image or not any(image.size):
+                continue
+            transform = texture_uv_transform(texture_node)
+            if transform is None:
+                skipped[material.name] = "its texture mapping is rotated"
+                continue
+            sources[material.name] = (image, transform)
+
+    plans = {}
+    for key, mesh in meshes.items():
+        if len(mesh.uv_layers) >= 8 and ATLAS_UV_NAME not in mesh.uv_layers:
+            skipped.update((m.name, f"{mesh.name} has no free UV map") for m in mesh.materials
+                if m and m.name in sources)
+            continue
+        transforms = {slot: sources[m.name][1] for slot, m in enumerate(mesh.materials) if m and m.name in sources}
+        plan = plan_atlas_uvs(mesh, transforms) if transforms else None
+        if plan is None:
+            skipped.update((m.name, f"{mesh.name} has no UV map") for m in mesh.materials if m and m.name in sources)
+            continue
+        plans[key] = plan
+        for slot in plan[2]:
+            if slot in transforms:
+                skipped[mesh.materials[slot].name] = "its faces span more than one texture tile"
+
+    for name, reason in skipped.items():
+        sources.pop(name, None)
+        logger.info("Not atlasing %s: %s", name, reason)
+    if not sources:
+        return 0, [], sorted(skipped)
+
+    images = list({image.name: image for image, _ in sources.values()}.values())
+    tile_limit = min(max_tile_size, atlas_size - 2 * padding)
+    sizes = [atlas_tile_size(image, tile_limit) for image in images]
+    placements, pages = pack_rectangles([(width + 2 * padding, height + 2 * padding) for width, height in sizes],
+        atlas_size)
+
+    # Trim each page to the power of two that holds its tiles; rects are (u scale, v scale, u offset, v offset)
+    page_heights = [min(atlas_size, 1 << max(0, int(np.ceil(np.log2(page.used_height))))) for page in pages]
+    tile_rects = {}
+    for image, (width, height), (page_index, x, y) in zip(images, sizes, placements):
+        page_height = page_heights[page_index]
+        tile_rects[image.name] = (page_index, width / atlas_size, height / page_height,
+            (x + padding) / atlas_size, (y + padding) / page_height)
+
+    save_dir = map_save_dir(context)
+    atlas_materials = []
+    for page_index, page_height in enumerate(page_heights):
+        pixels = np.zeros((page_height, atlas_size, 4), dtype=np.float32)
+        for image, (tile_page, x, y) in zip(images, placements):
+            if tile_page == page_index:
+                tile = atlas_tile_pixels(image, tile_limit, padding)
+                pixels[y:y + tile.shape[0], x:x + tile.shape[1]] = tile
+        name = f"AI_Atlas_{uuid.uuid4().hex[:8]}"
+        image = bpy.data.images.new(name, atlas_size, page_height, alpha=True)
+        image.pixels.foreach_set(pixels.ravel())
+        del pixels
+        store_image(image, save_dir)
+        page_sources = [material_name for material_name, (source_image, _) in sources.items()
+            if tile_rects[source_image.name][0] == page_index]
+        maps = {map_name for material_name in page_sources for map_name, node_names in PBR_MAP_INPUTS.items()
+            if bpy.data.materials[material_name].node_tree.nodes.get(node_names[0])}
+        atlas_materials.append(build_atlas_material(context, image, page_sources, maps))
+
+    for key, (face_uv, loop_slot, _) in plans.items():
+        mesh = meshes[key]
+        slot_rects = np.zeros((max(len(mesh.materials), int(loop_slot.max()) + 1), 4), dtype=np.float32)
+        slot_atlased = np.zeros(len(slot_rects), dtype=bool)
+        slot_materials = list(mesh.materials)
+        for slot, material in enumerate(mesh.materials):
+            if material and material.name in sources:
+                page_index, *rect = tile_rects[sources[material.name][0].name]
+                slot_rects[slot] = rect
+                slot_atlased[slot] = True
+                slot_materials[slot] = atlas_materials[page_index]
+        if not slot_atlased.any():
+            continue
+
+        if ATLAS_UV_NAME not in mesh.uv_layers:
+            base = read_mesh_uv_faces(mesh)[0]
+            mesh.uv_layers.new(name=ATLAS_UV_NAME, do_init=False).data.foreach_set("uv", base.ravel())
+        atlas_uv = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+        mesh.uv_layers[ATLAS_UV_NAME].data.foreach_get("uv", atlas_uv)
+        atlas_uv = atlas_uv.reshape(-1, 2)
+        remap = slot_atlased[loop_slot]
+        rects = slot_rects[loop_slot[remap]]
+        atlas_uv[remap] = face_uv[remap] * rects[:, 0:2] + rects[:, 2:4]
+        mesh.uv_layers[ATLAS_UV_NAME].data.foreach_set("uv", atlas_uv.ravel())
+
+        unique_materials = list(dict.fromkeys(slot_materials))
+        slot_remap = np.array([unique_materials.index(material) for material in slot_materials], dtype=np.int32)
+        material_index = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("material_index", material_index)
+        np.clip(material_index, 0, len(slot_remap) - 1, out=material_index)
+        mesh.materials.clear()
+        for material in unique_materials:
+            mesh.materials.append(material)
+        mesh.polygons.foreach_set("material_index", slot_remap[material_index])
+        mesh.update()
+
+    logger.info("Packed %s textures from %s materials into %s atlases", len(images), len(sources), len(pages))
+    return len(sources), atlas_materials, sorted(skipped)
+
+UPLOAD_CONTENT_TYPES = {'PNG': 'image/png', 'JPEG': 'image/jpeg', 'WEBP': 'image/webp'}
+DATA_URI_LIMIT = 256 * 1024
+
+class ImageUpload:
+    """Image content captured on the main thread for upload from a worker
+
+    Unmodified images are sent as their packed bytes or the file on disk as-is.
+    Anything else is read as pixels here and PNG-encoded in memory by the worker.
+    """
+
+    def __init__(self, image):
+        self.filename = sanitize_name(os.path.splitext(image.name)[0]) or "texture"
+        self.content_type = UPLOAD_CONTENT_TYPES.get(image.file_format)
+        self.data = None
+        self.path = None
+        self.pixels = None
+        self._content_hash = None
+        filepath = bpy.path.abspath(image.filepath) if image.filepath else ""
+        if self.content_type and image.packed_file and not image.is_dirty:
+            self.data = bytes(image.packed_file.data)
+        elif self.content_type and filepath and os.path.exists(filepath) and not image.is_dirty:
+            self.path = filepath
+        else:
+            self.content_type = 'image/png'
+            self.pixels = pixels_to_bytes(read_image_pixels(image))
+        self.filename += {'image/png': ".png", 'image/jpeg': ".jpg", 'image/webp': ".webp"}[self.content_type]
+
+    def read(self):
+        if self.data is None:
+            if self.path:
+                with open(self.path, 'rb') as f:
+                    self.data = f.read()
+            else:
+                with _tracer.span("encode"):
+                    self.data = encode_png(self.pixels)
+                self.pixels = None
+        return self.data
+
+    def content_hash(self):
+        """SHA-256 identifying the upload, computed without encoding pixels"""
+
+        if self._content_hash is None:
+            if self.pixels is not None:
+                self._content_hash = hashlib.sha256(self.pixels.tobytes()).hexdigest()
+            elif self.data is None and self.path:
+                self._content_hash = hash_file(self.path)
+            else:
+                self._content_hash = hashlib.sha256(self.data).hexdigest()
+        return self._content_hash
+
+    def size(self):
+        if self.data is None and self.path:
+            return os.path.getsize(self.path)
+        return len(self.read())
+
+    def data_uri(self):
+        return f"data:{self.content_type};base64,{base64.b64encode(self.read()).decode('ascii')}"
+
+def upload_cache_key(client, content_hash):
+    """Upload cache key for content sent through client
+
+    Uploaded files are only readable with the API key and server they were
+    uploaded to, so both are part of the key, the API key only as a hash.
+    """
+
+    account = hashlib.sha256(f"{client.base_url}\n{client.api_key}".encode('utf-8')).hexdigest()[:16]
+    return f"{account}:{content_hash}"
+
+class UploadCache:
+    """Persistent map of upload cache key to the Replicate file URL and its expiry"""
+
+    def __init__(self, path=None, default_ttl=23 * 3600, margin=600):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = {}
+            if self.path:
+                try:
+                    with open(self.path, 'r') as f:
+                        self._entries = json.load(f)
+                except (OSError, ValueError):
+                    pass
+        return self._entries
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(self._entries, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not save upload cache: %s", e)
+
+    def get(self, key):
+        """URL of a previous upload that stays valid for at least the safety margin"""
+
+        with self._lock:
+            entry = self._load().get(key)
+            if not entry:
+                return None
+            if entry["expires"] - self.margin > time.time():
+                return entry["url"]
+            now = time.time()
+            self._entries = {key: value for key, value in self._entries.items()
+                if value["expires"] - self.margin > now}
+            self._save()
+        return None
+
+    def put(self, key, url, expires=None):
+        with self._lock:
+            self._load()[key] = {
+                "url": url,
+                "expires": expires or time.time() + self.default_ttl,
+            }
+            self._save()
+
+_upload_cache = None
+
+def get_upload_cache():
+    global _upload_cache
+    if _upload_cache is None:
+        cache_path = os.path.join(
+            bpy.utils.user_resource('DATAFILES', path="ai_texture_generator"), "uploads.json")
+        _upload_cache = UploadCache(cache_path)
+    return _upload_cache
+
+def upload_image(client, upload, cache=None, data_uri_limit=DATA_URI_LIMIT):
+    """Return a URL for an ImageUpload, inlining small images as a data URI
+
+    Larger images reuse a still-valid URL from the upload cache when the same
+    content was uploaded before, and are only sent to /files otherwise.
+    """
+
+    cache_key = upload_cache_key(client, upload.content_hash()) if cache else None
+    if cache_key:
+        cached_url = cache.get(cache_key)
+        if cached_url:
+            logger.debug("Reusing uploaded file for %s: %s", upload.filename, cached_url)
+            return cached_url
+    if upload.size() <= data_uri_limit:
+        logger.debug("Sending %s inline (%s bytes)", upload.filename, upload.size())
+        return upload.data_uri()
+    logger.debug("Uploading file to Replicate...")
+    with _tracer.span("upload", bytes=upload.size()):
+        if upload.path and upload.data is None:
+            with open(upload.path, 'rb') as f:
+                response = client.upload_file(upload.filename, f, upload.content_type)
+        else:
+            response = client.upload_file(upload.filename, io.BytesIO(upload.read()), upload.content_type)
+    if response.status_code != 201:
+        raise RuntimeError(f"Upload failed with status {response.status_code}: {response.text}")
+    uploaded = response.json()
+    url = uploaded['urls']['get']
+    if cache_key:
+        cache.put(cache_key, url, parse_timestamp(uploaded.get('expires_at')))
+    return url
+
+def thumbnail_directory():
+    return bpy.utils.user_resource('DATAFILES', path="ai_texture_generator/thumbnails", create=True)
+
+def create_preview_thumbnail(image, size=128):
+    """Write a small PNG thumbnail of the image into the thumbnail cache and return its path"""
+
+    if not image or not image.size[0] or not image.size[1]:
+        return None
+
+    thumb_path = os.path.join(thumbnail_directory(), f"{image_content_hash(image)}.png")
+    if os.path.exists(thumb_path):
+        return thumb_path
+
+    width, height = image.size
+    scale = size / max(width, height)
+    thumb = downsample_pixels(read_image_pixels(image),
+        max(1, round(width * scale)), max(1, round(height * scale)))
+    temp_path = f"{thumb_path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(encode_png(pixels_to_bytes(thumb)))
+    os.replace(temp_path, thumb_path)
+    return thumb_path
+
+_thumbnail_previews = None
+_pending_thumbnails = []
+# (image name, content hash) of images no thumbnail could be made for, so draw() stops queueing them
+_failed_thumbnails = set()
+
+def get_thumbnail_icon(image):
+    """Icon id of an image's cached thumbnail, or 0 while it is still being generated
+
+    Safe to call from draw(): missing thumbnails are queued and built one per
+    timer tick instead of asking Blender to preview the full-resolution image.
+    Images that failed are not queued again until their content hash changes.
+    """
+
+    content_hash = image.get("ai_content_hash")
+    if content_hash and _thumbnail_previews is not None:
+        preview = _thumbnail_previews.get(content_hash)
+        if preview:
+            return preview.icon_id
+        thumb_path = os.path.join(thumbnail_directory(), f"{content_hash}.png")
+        if os.path.exists(thumb_path):
+            return _thumbnail_previews.load(content_hash, thumb_path, 'IMAGE').icon_id
+
+    if image.name not in _pending_thumbnails and (image.name, content_hash) not in _failed_thumbnails:
+        _pending_thumbnails.append(image.name)
+        if not bpy.app.timers.is_registered(process_pending_thumbnails):
+            bpy.app.timers.register(process_pending_thumbnails, first_interval=0.1)
+    return 0
+
+def process_pending_thumbnails():
+    while _pending_thumbnails:
+        image = bpy.data.images.get(_pending_thumbnails.pop(0))
+        if not image:
+            continue
+        failure_key = (image.name, image.get("ai_content_hash"))
+        try:
+            thumb_path = create_preview_thumbnail(image)
+        except Exception as e:
+            logger.warning("Could not create thumbnail for %s: %s", image.name, e)
+            thumb_path = None
+        if not thumb_path:
+            _failed_thumbnails.add(failure_key)
+            continue
+        for window in bpy.context.window_manager.windows:
+            for area in window.screen.areas:
+                if area.type == 'PROPERTIES':
+                    area.tag_redraw()
+        return 0.05 if _pending_thumbnails else None
+    return None
+
+class AIModelType(Enum):
+    SDXL = "7762fd07cf82c948538e41f63f77d685e02b063e37e496e96eefd46c929f9bdc"
+    FLUX = "2a65f3e9-6ef7-4ba1-9673-78e4d01ac20c"
+
+UPSCALE_MODEL_VERSION = "f121d640bd286e1fdc67f9799164c1d5be36ff74576ee11c803ae5b665dd46aa"
+
+def normalize_prompt(prompt):
+    """Collapse whitespace so equivalent prompts share a cache entry"""
+
+    return " ".join(prompt.split())
+
+# Model settings each model's request actually sends; the others only apply to the panel
+MODEL_REQUEST_SETTINGS = {
+    'SDXL': ("width", "height", "refine", "num_inference_steps", "apply_watermark"),
+    'FLUX': ("width", "height"),
+}
+
+def build_prediction_request(prompt, active_model, model_settings):
+    """Build the Replicate endpoint and payload for a generation request"""
+
+    prompt = normalize_prompt(prompt)
+    if active_model == 'SDXL':
+        url = f"{REPLICATE_API_URL}/predictions"
+        data = {
+            "version": AIModelType[active_model].value,
+            "input": {
+                "prompt": prompt,
+                "width": model_settings.width,
+                "height": model_settings.height,
+                "refine": model_settings.refine,
+                "num_inference_steps": int(model_settings.num_inference_steps),
+                "apply_watermark": bool(model_settings.apply_watermark)
+            }
+        }
+    else:
+        url = f"{REPLICATE_API_URL}/models/black-forest-labs/flux-pro/predictions"
+        data = {
+            "input": {
+                "prompt": prompt,
+                "width": model_settings.width,
+                "height": model_settings.height
+            }
+        }
+    return url, data
+
+def generation_cache_key(active_model, url, data):
+    """Hash the model version, endpoint and every input field of a request"""
+
+    canonical = json.dumps({
+        "model": AIModelType[active_model].value,
+        "url": url,
+        "version": data.get("version"),
+        "input": data["input"],
+    }, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class GenerationCache:
+    """On-disk LRU cache of generated images keyed by request hash"""
+
+    INDEX_NAME = "index.json"
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = None
+
+    def _load_index(self):
+        if self._index is None:
+            index_path = os.path.join(self.directory, self.INDEX_NAME)
+            try:
+                with open(index_path, 'r') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        index_path = os.path.join(self.directory, self.INDEX_NAME)
+        temp_path = f"{index_path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self._index, f)
+        os.replace(temp_path, index_path)
+
+    def get(self, key):
+        """Return (image_path, metadata) for a cached request, or None"""
+
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(key)
+            if not entry:
+                return None
+            image_path = os.path.join(self.directory, entry['file'])
+            if not os.path.exists(image_path):
+                del index[key]
+                self._save_index()
+                return None
+            entry['last_access'] = time.time()
+            self._save_index()
+            return image_path, entry.get('metadata', {})
+
+    def put(self, key, image, metadata=None):
+        """Write a downloaded ImageBytes or ImageFile into the cache and evict old entries"""
+
+        with self._lock:
+            index = self._load_index()
+            os.makedirs(self.directory, exist_ok=True)
+            extension = os.path.splitext(image.filename)[1]
+            filename = f"{key}{extension}"
+            path = os.path.join(self.directory, filename)
+            if isinstance(image, ImageFile):
+                shutil.copyfile(image.path, path)
+            else:
+                with open(path, 'wb') as f:
+                    f.write(image.data)
+            now = time.time()
+            index[key] = {
+                'file': filename,
+                'size': os.path.getsize(path),
+                'created': now,
+                'last_access': now,
+                'metadata': metadata or {},
+            }
+            self._evict()
+            self._save_index()
+
+    def _evict(self):
+        index = self._index
+        total = sum(entry['size'] for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k]['last_access']):
+            if total <= self.max_bytes:
+                break
+            entry = index.pop(key)
+            total -= entry['size']
+            try:
+                os.remove(os.path.join(self.directory, entry['file']))
+            except OSError as e:
+                logger.warning("Could not remove cached image: %s", e)
+
+    def clear(self):
+        with self._lock:
+            index = self._load_index()
+            for entry in index.values():
+                try:
+                    os.remove(os.path.join(self.directory, entry['file']))
+                except OSError:
+                    pass
+            index.clear()
+            self._save_index()
+
+_generation_cache = None
+
+def get_generation_cache(context):
+    """Return the shared generation cache configured from the addon preferences"""
+
+    global _generation_cache
+    addon_prefs = context.preferences.addons["ai_texture_generator"].preferences
+    directory = bpy.path.abspath(addon_prefs.cache_directory) if addon_prefs.cache_directory else \
+        bpy.utils.user_resource('DATAFILES', path="ai_texture_generator/cache")
+    max_bytes = addon_prefs.cache_size_limit * 1024 * 1024
+    if _generation_cache is None or _generation_cache.directory != directory:
+        _generation_cache = GenerationCache(directory, max_bytes)
+    _generation_cache.max_bytes = max_bytes
+    return _generation_cache
+
+def submit_generation_job(context, prompt, model=None, model_settings=None, group=None, limit=None,
+                          **overrides):
+    """Queue a generation job, or a finished one when the generation cache has the image
+
+    Shared by the operators and the headless manifest runner. Extra keyword
+    arguments override fields of the job's settings snapshot.
+    """
+
+    addon_prefs = context.preferences.addons["ai_texture_generator"].preferences
+    model = model or addon_prefs.active_model
+    url, data = build_prediction_request(prompt, model, model_settings or context.scene.ai_model_settings)
+    cache_key = generation_cache_key(model, url, data) if addon_prefs.use_generation_cache else None
+    settings = snapshot_job_settings(context, 'GENERATE', prompt, model=model, cache_key=cache_key, **overrides)
+    
+    manager = get_job_manager()
+    cached = get_generation_cache(context).get(cache_key) if cache_key else None
+    if cached:
+        logger.info("Using cached generation: %s", cached[0])
+        return manager.add_finished(settings, read_image_bytes(cached[0]), group=group)
+    
+    webhook = get_webhook_url(context)
+    return manager.submit(get_replicate_client(context), settings,
+        create_prediction_request(url, data, webhook=webhook), model_key=data.get("version", url),
+        group=group, limit=limit, pushed=bool(webhook))
+
+def submit_upscale_job(context, material, texture_node, upscale_factor, face_enhance=False, group=None,
+                       limit=None):
+    """Queue an upscale job that replaces the image of texture_node when it finishes"""
+
+    settings = snapshot_job_settings(context, 'UPSCALE',
+        material_name=material.name,
+        texture_node_name=texture_node.name,
+        upscale_factor=int(upscale_factor))
+    
+    upload = ImageUpload(full_resolution_image(material, texture_node))
+    upload_cache = get_upload_cache()
+    upscale_input = {
+        "scale": float(upscale_factor),
+        "face_enhance": bool(face_enhance)
+    }
+    webhook = get_webhook_url(context)
+    
+    def submit_upscale(client):
+        image_url = upload_image(client, upload, upload_cache)
+        if not image_url.startswith("data:"):
+            logger.debug("File uploaded, got URL: %s", image_url)
+        
+        data = {
+            "version": UPSCALE_MODEL_VERSION,
+            "input": dict(upscale_input, image=image_url)
+        }
+        return create_prediction_request(f"{REPLICATE_API_URL}/predictions", data, webhook=webhook)(client)
+    
+    return get_job_manager().submit(get_replicate_client(context), settings, submit_upscale,
+        label="Upscaling", model_key=UPSCALE_MODEL_VERSION, group=group, limit=limit, pushed=bool(webhook))
+
+MANIFEST_FIELDS = ("prompt", "model", "settings", "object", "material", "upscale", "face_enhance")
+
+def parse_manifest_value(value):
+    """Convert a CSV cell to the bool, int or float it spells, or leave it as text"""
+
+    lowered = value.strip().lower()
+    if lowered in ("true", "yes"):
+        return True
+    if lowered in ("false", "no"):
+        return False
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return value
+
+def read_manifest(path):
+    """Read a JSONL or CSV manifest into (line_number, row) pairs
+
+    JSONL rows are objects with the MANIFEST_FIELDS keys, settings being an
+    object of model settings. In CSV files any column that is not one of the
+    other fields is taken as a model setting. A JSONL line that is not valid
+    JSON becomes a ValueError in place of its row, so it can be reported and
+    skipped with the rest of the manifest still run.
+    """
+
+    rows = []
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.lower().endswith(".csv"):
+            for line_number, record in enumerate(csv.DictReader(f), start=2):
+                row = {"settings": {}}
+                for key, value in record.items():
+                    if key is None or value is None or value.strip() == "":
+                        continue
+                    key = key.strip()
+                    if key in MANIFEST_FIELDS:
+                        row[key] = value.strip() if key in ("prompt", "model", "object", "material") \
+                            else parse_manifest_value(value)
+                    else:
+                        row["settings"][key] = parse_manifest_value(value)
+                rows.append((line_number, row))
+        else:
+            for line_number, line in enumerate(f, start=1):
+                if line.strip() and not line.lstrip().startswith("#"):
+                    try:
+                        rows.append((line_number, json.loads(line)))
+                    except ValueError as e:
+                        rows.append((line_number, ValueError(f"Invalid JSON: {e}")))
+    return rows
+
+def validate_manifest_row(row):
+    """Check a manifest row's fields and return it with settings and upscale normalised
+
+    Raises ValueError naming the first problem, so the row can be reported and
+    skipped before anything is submitted for it.
+    """
+
+    if isinstance(row, ValueError):
+        raise row
+    if not isinstance(row, dict):
+        raise ValueError("Row is not an object")
+    unknown = set(row) - set(MANIFEST_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    for key in ("prompt", "model", "object", "material"):
+        if row.get(key) is not None and not isinstance(row[key], str):
+            raise ValueError(f"{key} must be text")
+    if not (row.get("prompt") or "").strip():
+        raise ValueError("Missing prompt")
+    settings = row.get("settings") or {}
+    if not isinstance(settings, dict):
+        raise ValueError("settings must be an object")
+    upscale = row.get("upscale") or 1
+    try:
+        if isinstance(upscale, bool):
+            raise ValueError
+        upscale_value = float(upscale)
+    except (TypeError, ValueError):
+        raise ValueError(f"upscale must be a number, not {upscale!r}") from None
+    if upscale_value != int(upscale_value) or not 1 <= upscale_value <= 10:
+        raise ValueError(f"upscale must be a whole number from 1 to 10, not {upscale!r}")
+    if not isinstance(row.get("face_enhance", False), bool):
+        raise ValueError("face_enhance must be true or false")
+    return dict(row, settings=settings, upscale=int(upscale_value))
+
+def manifest_model_settings(scene_settings, overrides):
+    """Scene model settings with a manifest row's overrides applied, as a plain namespace"""
+
+    names = [prop.identifier for prop in scene_settings.bl_rna.properties if prop.identifier != "rna_type"]
+    unknown = set(overrides) - set(names)
+    if unknown:
+        raise ValueError(f"Unknown model settings: {', '.join(sorted(unknown))}")
+    values = {name: getattr(scene_settings, name) for name in names}
+    values.update(overrides)
+    return types.SimpleNamespace(**values)
+
+def job_report(job):
+    if job is None:
+        return None
+    return {
+        "job": job.id,
+        "state": job.state.name,
+        "error": job.error,
+        "prediction_id": job.prediction_id,
+        "material": job.output_material,
+        "seconds": round(job.finished - job.created, 3) if job.finished else None,
+        "stages": {name: round(seconds, 3) for name, seconds in job.timings.items()},
+    }
+
+def run_manifest(path, concurrency=4, report_path=None, timeout=None, context=None):
+    """Generate, and optionally upscale, every texture in a manifest without operators
+
+    Jobs go through the same job manager, submission, download and material code
+    as the panel. The manager's timer callback is driven here because timers do
+    not run while a background script executes. Returns the report rows.
+    """
 
-def sanitize_name(name):
-    """Convert prompt text to a valid material name"""
+    context = context or bpy.context
+    addon_prefs = context.preferences.addons["ai_texture_generator"].preferences
+    if not addon_prefs.api_key:
+        raise RuntimeError("No Replicate API key set")
+    if addon_prefs.save_location == 'FOLDER' and not bpy.data.filepath:
+        raise RuntimeError("Save the blend file first, or use the Blender File save location")
 
-    valid_name = "".join(c for c in name if c.isalnum() or c in (' ', '_', '-'))
-    valid_name = valid_name.strip().replace(' ', '_')
-    return valid_name[:32]
+    manager = get_job_manager()
+    group = uuid.uuid4().hex
+    records = []
+    for line_number, row in read_manifest(path):
+        record = {"line": line_number, "row": row if isinstance(row, dict) else {}, "job": None,
+            "upscale_job": None, "error": None}
+        records.append(record)
+        try:
+            row = record["row"] = validate_manifest_row(row)
+            prompt = row["prompt"].strip()
+            model = (row.get("model") or addon_prefs.active_model).upper()
+            if model not in AIModelType.__members__:
+                raise ValueError(f"Unknown model {model}")
+            unused = set(row["settings"]) - set(MODEL_REQUEST_SETTINGS[model])
+            if unused:
+                raise ValueError(f"Settings not used by {model}: {', '.join(sorted(unused))}")
+            object_name = row.get("object") or None
+            if object_name:
+                obj = bpy.data.objects.get(object_name)
+                if not obj or not hasattr(obj.data, "materials"):
+                    raise ValueError(f"Object {object_name} not found or cannot have materials")
+            material_name = row.get("material") or (None if object_name else f"AI_{sanitize_name(prompt)}")
+            model_settings = manifest_model_settings(context.scene.ai_model_settings, row["settings"])
+            record["job"] = submit_generation_job(context, prompt, model, model_settings, group=group,
+                limit=concurrency, object_name=object_name, material_name=material_name)
+        except (ValueError, TypeError, AttributeError) as e:
+            record["error"] = str(e)
+            logger.error("Manifest line %s: %s", line_number, e)
 
-def create_preview_thumbnail(image, size=128):
-    """Create a thumbnail version of the image"""
-    if not image:
-        return None
-        
-    thumb_name = f"thumb_{image.name}"
-    
-    if thumb_name in bpy.data.images:
-        return bpy.data.images[thumb_name]
-    
-    def create_thumb():
-        thumb = image.copy()
-        thumb.name = thumb_name
-        thumb.scale(size, size)
-        return thumb
-    
-    bpy.app.timers.register(create_thumb, first_interval=0.1)
-    return image
+    deadline = time.monotonic() + timeout if timeout else None
+    while True:
+        for record in records:
+            job, upscale = record["job"], record["row"].get("upscale", 1)
+            if not job or job.state != JobState.SUCCEEDED or upscale <= 1 or record["upscale_job"]:
+                continue
+            material = bpy.data.materials.get(job.output_material or "")
+            texture_node = find_texture_node(material)
+            if not texture_node or not texture_node.image:
+                record["error"] = "Generated material has no texture to upscale"
+                record["upscale_job"] = False
+                continue
+            record["upscale_job"] = submit_upscale_job(context, material, texture_node, upscale,
+                record["row"].get("face_enhance", False), group=group, limit=concurrency)
 
-class AIModelType(Enum):
-    SDXL = "7762fd07cf82c948538e41f63f77d685e02b063e37e496e96eefd46c929f9bdc"
-    FLUX = "2a65f3e9-6ef7-4ba1-9673-78e4d01ac20c"
+        jobs = [job for record in records for job in (record["job"], record["upscale_job"]) if job]
+        pending_upscales = any(record["job"] and record["job"].state == JobState.SUCCEEDED
+            and record["row"].get("upscale", 1) > 1 and record["upscale_job"] is None
+            for record in records)
+        if all(job.done for job in jobs) and not pending_upscales:
+            break
+        if deadline and time.monotonic() > deadline:
+            logger.error("Manifest run timed out, cancelling unfinished jobs")
+            for job in jobs:
+                if not job.done:
+                    manager.cancel(job.id)
+            break
+        time.sleep(manager.interval)
+        manager.process()
+
+    report = [{
+        "line": record["line"],
+        "prompt": record["row"].get("prompt"),
+        "object": record["row"].get("object"),
+        "material": record["row"].get("material"),
+        "error": record["error"],
+        "generate": job_report(record["job"]),
+        "upscale": job_report(record["upscale_job"] or None),
+    } for record in records]
+    succeeded = sum(1 for record in records if record["job"] and record["job"].state == JobState.SUCCEEDED
+        and (not record["upscale_job"] or record["upscale_job"].state == JobState.SUCCEEDED)
+        and not record["error"])
+    logger.info("Manifest finished: %s of %s rows succeeded", succeeded, len(records))
+
+    if report_path:
+        with open(report_path, 'w') as f:
+            json.dump({"manifest": path, "succeeded": succeeded, "rows": report}, f, indent=2)
+    return report
 
 class AIModelSettings(PropertyGroup):
     width: IntProperty(
@@ -386,15 +3872,136 @@ class AITextureGeneratorPreferences(AddonPreferences):
         default='SDXL'
     )
 
+    request_timeout: FloatProperty(
+        name="Request Timeout (s)",
+        description="How long to wait for a response from Replicate before giving up",
+        default=60.0,
+        min=1.0,
+        max=600.0
+    )
+
+    max_retries: IntProperty(
+        name="Max Retries",
+        description="How many times transient network failures are retried",
+        default=3,
+        min=0,
+        max=10
+    )
+
+    use_generation_cache: BoolProperty(
+        name="Cache Generations",
+        description="Reuse previously generated images when the prompt, model and settings are identical",
+        default=True
+    )
+
+    cache_size_limit: IntProperty(
+        name="Cache Size (MB)",
+        description="Maximum disk space used by the generation cache, least recently used images are evicted first",
+        default=1024,
+        min=16
+    )
+
+    cache_directory: StringProperty(
+        name="Cache Folder",
+        description="Folder for cached generations, leave empty for the Blender user data folder",
+        default="",
+        subtype='DIR_PATH'
+    )
+
+    log_level: EnumProperty(
+        name="Log Level",
+        description="How much the addon writes to the system console",
+        items=[
+            ('DEBUG', "Debug", "Every request, poll and pipeline stage"),
+            ('INFO', "Info", "Job milestones"),
+            ('WARNING', "Warning", "Only problems"),
+            ('ERROR', "Error", "Only failures"),
+        ],
+        default='INFO',
+        update=lambda self, context: logger.setLevel(self.log_level)
+    )
+
+    api_base_url: StringProperty(
+        name="API Base URL",
+        description="Replicate API endpoint, change only to point the addon at a local stand-in server",
+        default=REPLICATE_API_URL
+    )
+
+    use_webhook: BoolProperty(
+        name="Use Webhooks",
+        description="Receive completion events from Replicate on a local listener instead of polling, "
+            "polling continues slowly as a fallback",
+        default=False
+    )
+
+    webhook_host: StringProperty(
+        name="Listen Host",
+        description="Interface the webhook listener binds to",
+        default="127.0.0.1"
+    )
+
+    webhook_port: IntProperty(
+        name="Listen Port",
+        description="Port the webhook listener binds to",
+        default=8765,
+        min=1,
+        max=65535
+    )
+
+    webhook_public_url: StringProperty(
+        name="Public URL",
+        description="Address Replicate should post events to, such as a tunnel or reverse proxy "
+            "forwarding to the listener. Webhooks are only used when this is set",
+        default=""
+    )
+
+    webhook_secret: StringProperty(
+        name="Signing Secret",
+        description="Replicate webhook signing secret, events with a bad signature are rejected. "
+            "Leave empty to skip verification",
+        default="",
+        subtype='PASSWORD'
+    )
+
     def draw(self, context):
         layout = self.layout
-        
+
         box = layout.box()
         box.label(text="General Settings:")
         box.prop(self, "api_key")
         box.prop(self, "save_location")
         box.prop(self, "active_model")
-        
+
+        box = layout.box()
+        box.label(text="Network:")
+        row = box.row()
+        row.prop(self, "request_timeout")
+        row.prop(self, "max_retries")
+        box.prop(self, "api_base_url")
+        box.prop(self, "use_webhook")
+        col = box.column()
+        col.enabled = self.use_webhook
+        row = col.row()
+        row.prop(self, "webhook_host")
+        row.prop(self, "webhook_port")
+        col.prop(self, "webhook_public_url")
+        col.prop(self, "webhook_secret")
+
+        box = layout.box()
+        box.label(text="Diagnostics:")
+        row = box.row()
+        row.prop(self, "log_level")
+        row.operator("material.ai_texture_export_trace", icon='EXPORT')
+
+        box = layout.box()
+        box.label(text="Generation Cache:")
+        box.prop(self, "use_generation_cache")
+        col = box.column()
+        col.enabled = self.use_generation_cache
+        col.prop(self, "cache_size_limit")
+        col.prop(self, "cache_directory")
+        col.operator("material.ai_texture_clear_cache")
+
         box = layout.box()
         box.label(text="Model Settings:")
         model_settings = context.scene.ai_model_settings
@@ -422,151 +4029,13 @@ class AITextureGeneratorPreferences(AddonPreferences):
             if model_settings.output_format != 'png':
                 col.prop(model_settings, "output_quality")
 
-class StatusQueue:
-    def __init__(self):
-        self._queue = Queue()
-        self._lock = threading.Lock()
-    
-    def put(self, status):
-        with self._lock:
-            self._queue.put(status)
-    
-    def get(self):
-        with self._lock:
-            return self._queue.get() if not self._queue.empty() else None
-
 class AITextureGenerator(Operator):
     bl_idname = "material.ai_texture_generator"
     bl_label = "Generate Texture"
-    
-    _timer = None
-    _thread = None
-    _queue = Queue()
-    _status_queue = StatusQueue()
-    _prediction_id = None
-    
-    def modal(self, context, event):
-        if event.type == 'TIMER':
-            status = self._status_queue.get()
-            if status:
-                context.scene.progress_status = status
-                for area in context.screen.areas:
-                    if area.type == 'PROPERTIES':
-                        area.tag_redraw()
-            
-            if not self._prediction_id:
-                if not self._queue.empty():
-                    self._prediction_id = self._queue.get()
-                    if self._prediction_id is None:
-                        self.cancel(context)
-                        return {'CANCELLED'}
-                    print(f"Got prediction ID: {self._prediction_id}")
-            else:
-                try:
-                    addon_prefs = context.preferences.addons["ai_texture_generator"].preferences
-                    api_key = addon_prefs.api_key
-                    headers = {"Authorization": f"Bearer {api_key}"}
-                    
-                    poll_url = f"https://api.replicate.com/v1/predictions/{self._prediction_id}"
-                    print(f"Polling: {poll_url}")
-                    
-                    poll_response = requests.get(poll_url, headers=headers)
-                    response_data = poll_response.json()
-                    print(f"Poll response: {response_data}")
-                    
-                    status = response_data['status']
-                    if status == 'processing':
-                        logs = response_data.get('logs', '')
-                        if logs:
-                            progress_lines = [line for line in logs.split('\n') if '%|' in line]
-                            if progress_lines:
-                                last_progress = progress_lines[-1]
-                                try:
-                                    percent = last_progress.split('%')[0].strip()
-                                    update_ui_status(context, f"Generating: {percent}%")
-                                except:
-                                    update_ui_status(context, "Generating...")
-                        else:
-                            update_ui_status(context, "Generating...")
-                    else:
-                        update_ui_status(context, f"Status: {status.title()}")
-                    
-                    if status == 'succeeded':
-                        addon_prefs = context.preferences.addons["ai_texture_generator"].preferences
-                        if addon_prefs.active_model == 'SDXL':
-                            image_url = response_data['output'][0]
-                        else:
-                            image_url = response_data['output']
-                            
-                        print(f"Got output URL: {image_url}")
-                        
-                        image_path = download_image(image_url)
-                        print(f"Downloaded to: {image_path}")
-                        
-                        if not image_path or not os.path.exists(image_path):
-                            self.report({'ERROR'}, "Failed to download generated image")
-                            self.cancel(context)
-                            return {'CANCELLED'}
-                        
-                        file_size = os.path.getsize(image_path)
-                        if file_size == 0:
-                            print(f"Error: Downloaded file is empty: {image_path}")
-                            self.report({'ERROR'}, "Downloaded file is empty")
-                            self.cancel(context)
-                            return {'CANCELLED'}
-                        
-                        print(f"Downloaded file size: {file_size} bytes")
-                        
-                        image_uuid = uuid.uuid4()
-                        
-                        if addon_prefs.save_location == 'FOLDER':
-                            blend_file_directory = os.path.dirname(bpy.data.filepath)
-                            target_path = os.path.join(blend_file_directory, 
-                                f"{image_uuid}_{os.path.basename(image_path)}")
-                            os.rename(image_path, target_path)
-                            self.report({'INFO'}, f"Image saved to {target_path}")
-                        else:
-                            target_path = image_path
-                            self.report({'INFO'}, "Image saved in blend file")
-                        
-                        try:
-                            if load_image_as_texture(target_path, 
-                                context.scene.ai_texture_generator_text_prompt, 
-                                image_uuid,
-                                context):
-                                self.report({'INFO'}, "Texture applied successfully")
-                            else:
-                                self.report({'WARNING'}, "Image saved but couldn't apply texture")
-                        except Exception as e:
-                            self.report({'ERROR'}, f"Error applying texture: {str(e)}")
-                            print(f"Error details: {str(e)}")
-                        
-                        if addon_prefs.save_location == 'BLENDER' and os.path.exists(target_path):
-                            try:
-                                os.remove(target_path)
-                            except Exception as e:
-                                print(f"Warning: Could not remove temporary file: {e}")
-                        
-                        self.cancel(context)
-                        return {'FINISHED'}
-                        
-                    elif status == 'failed':
-                        error_msg = response_data.get('error', 'Unknown error')
-                        print(f"Generation failed: {error_msg}")
-                        self.report({'ERROR'}, f"Generation failed: {error_msg}")
-                        self.cancel(context)
-                        return {'CANCELLED'}
-                        
-                except Exception as e:
-                    print(f"Error during generation: {str(e)}")
-                    self.report({'ERROR'}, f"Error during generation: {str(e)}")
-                    self.cancel(context)
-                    return {'CANCELLED'}
-        
-        return {'PASS_THROUGH'}
+    bl_description = "Start a texture generation job for the active object"
     
     def execute(self, context):
-        print("Starting texture generation...")
+        logger.debug("Starting texture generation...")
         debug_status(context)
         
         if not context.active_object:
@@ -600,79 +4069,154 @@ class AITextureGenerator(Operator):
             self.report({'ERROR'}, "Please save your blend file first")
             return {'CANCELLED'}
         
-        context.scene.progress_status = "Submitting prediction..."
-        
-        def submit_prediction():
-            try:
-                self._status_queue.put("Preparing submission...")
-                print("Starting generation submission...")
-                
-                addon_prefs = context.preferences.addons["ai_texture_generator"].preferences
-                api_key = addon_prefs.api_key
-                headers = {
-                    "Authorization": f"Bearer {api_key}", 
-                    "Content-Type": "application/json",
-                    "Prefer": "wait"
-                }
-                model_settings = context.scene.ai_model_settings
-                
-                if addon_prefs.active_model == 'SDXL':
-                    url = "https://api.replicate.com/v1/predictions"
-                    data = {
-                        "version": AIModelType[addon_prefs.active_model].value,
-                        "input": {
-                            "prompt": context.scene.ai_texture_generator_text_prompt,
-                            "width": model_settings.width,
-                            "height": model_settings.height,
-                            "refine": model_settings.refine,
-                            "num_inference_steps": int(model_settings.num_inference_steps),
-                            "apply_watermark": bool(model_settings.apply_watermark)
-                        }
-                    }
-                else:
-                    url = f"https://api.replicate.com/v1/models/black-forest-labs/flux-pro/predictions"
-                    data = {
-                        "input": {
-                            "prompt": context.scene.ai_texture_generator_text_prompt,
-                            "width": model_settings.width,
-                            "height": model_settings.height
-                        }
-                    }
-                
-                print(f"Submitting prediction with data: {data}")
-                response = requests.post(
-                    url,
-                    json=data,
-                    headers=headers
-                )
-                
-                if response.status_code == 201:
-                    prediction_id = response.json()['id']
-                    self._status_queue.put("Submission accepted, starting generation...")
-                    print(f"Prediction submitted, ID: {prediction_id}")
-                    self._queue.put(prediction_id)
-                else:
-                    self._status_queue.put("Submission failed")
-                    print(f"Prediction submission failed: {response.text}")
-                    self._queue.put(None)
-                    
-            except Exception as e:
-                print(f"Error in submit_prediction: {str(e)}")
-                self._queue.put(None)
+        job = submit_generation_job(context, prompt)
         
-        self._thread = Thread(target=submit_prediction)
-        self._thread.start()
-        
-        wm = context.window_manager
-        self._timer = wm.event_timer_add(0.5, window=context.window)
-        wm.modal_handler_add(self)
-        
-        return {'RUNNING_MODAL'}
+        update_ui_status(context, f"Started job {job.id}")
+        self.report({'INFO'}, f"Started generation job {job.id}")
+        return {'FINISHED'}
+
+def read_batch_prompts(batch_props):
+    """Return the non-empty, non-comment lines of the batch prompt source"""
+
+    if batch_props.batch_source == 'FILE':
+        with open(bpy.path.abspath(batch_props.batch_file), 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    elif batch_props.batch_text:
+        lines = [line.body for line in batch_props.batch_text.lines]
+    else:
+        lines = []
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+
+class AITextureBatchGenerate(Operator):
+    bl_idname = "material.ai_texture_batch_generate"
+    bl_label = "Generate Batch"
+    bl_description = "Generate one texture per prompt with a bounded number of predictions in flight"
+
+    def execute(self, context):
+        obj = context.active_object
+        if not obj or not hasattr(obj.data, "materials"):
+            self.report({'ERROR'}, "Select an object that can receive materials")
+            return {'CANCELLED'}
+
+        addon_prefs = context.preferences.addons["ai_texture_generator"].preferences
+        if not addon_prefs.api_key:
+            self.report({'ERROR'}, "Please enter your API key in the addon preferences")
+            return {'CANCELLED'}
+
+        if addon_prefs.save_location == 'FOLDER' and not bpy.data.filepath:
+            self.report({'ERROR'}, "Please save your blend file first")
+            return {'CANCELLED'}
+
+        batch_props = context.scene.ai_texture_props
+        try:
+            prompts = read_batch_prompts(batch_props)
+        except OSError as e:
+            self.report({'ERROR'}, f"Could not read prompt file: {e}")
+            return {'CANCELLED'}
+
+        if not prompts:
+            self.report({'ERROR'}, "No prompts found in the batch source")
+            return {'CANCELLED'}
+
+        batch_id = uuid.uuid4().hex
+        jobs = [submit_generation_job(context, prompt, group=batch_id, limit=batch_props.batch_max_in_flight)
+            for prompt in prompts]
+        cached_count = sum(1 for job in jobs if not job.submit_args)
+
+        logger.info("Batch started: %s to generate, %s cached", len(prompts) - cached_count, cached_count)
+        self.report({'INFO'}, f"Queued {len(prompts)} generation jobs")
+        return {'FINISHED'}
+
+class AITextureClearCache(Operator):
+    bl_idname = "material.ai_texture_clear_cache"
+    bl_label = "Clear Generation Cache"
+    
+    def execute(self, context):
+        get_generation_cache(context).clear()
+        self.report({'INFO'}, "Generation cache cleared")
+        return {'FINISHED'}
+
+class AITextureMergeDuplicates(Operator):
+    bl_idname = "material.ai_texture_merge_duplicates"
+    bl_label = "Merge Duplicate Images"
+    bl_description = "Find images with identical content and merge them into one datablock"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    def execute(self, context):
+        merged, freed = merge_duplicate_images()
+        self.report({'INFO'}, f"Merged {merged} duplicate images, freeing about {freed / (1024 * 1024):.1f} MB")
+        return {'FINISHED'}
+
+class AITextureCollectGarbage(Operator):
+    bl_idname = "material.ai_texture_collect_garbage"
+    bl_label = "Clean Up Generated Files"
+    bl_description = "Remove AI images no material uses and delete generated files no image points at"
+    
+    dry_run: BoolProperty(
+        name="Dry Run",
+        description="Only report what would be removed",
+        default=True
+    )
     
-    def cancel(self, context):
-        if self._timer:
-            context.window_manager.event_timer_remove(self._timer)
-            self._timer = None
+    def execute(self, context):
+        report = get_storage_manager().reclaim(dry_run=self.dry_run)
+        verb = "Would free" if self.dry_run else "Freed"
+        self.report({'INFO'}, f"{verb} {report['freed'] / (1024 * 1024):.1f} MB: {len(report['files'])} files, "
+            f"{len(report['images'])} images (details in the console)")
+        return {'FINISHED'}
+
+class AITexturePackAtlas(Operator):
+    bl_idname = "material.ai_texture_pack_atlas"
+    bl_label = "Pack Texture Atlas"
+    bl_description = "Pack the AI textures of the selected objects into shared atlas materials and remap their UVs"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    atlas_size: EnumProperty(
+        name="Atlas Size",
+        items=[
+            ('1024', "1024", "1024 x 1024 pages"),
+            ('2048', "2048", "2048 x 2048 pages"),
+            ('4096', "4096", "4096 x 4096 pages"),
+            ('8192', "8192", "8192 x 8192 pages"),
+        ],
+        default='4096'
+    )
+    max_tile_size: IntProperty(
+        name="Max Tile Size",
+        description="Textures larger than this are scaled down to fit their atlas tile",
+        default=1024,
+        min=16,
+        max=8192
+    )
+    padding: IntProperty(
+        name="Padding",
+        description="Pixels of edge bleed around each tile, to keep mipmaps from mixing neighbours",
+        default=8,
+        min=0,
+        max=64
+    )
+    
+    def execute(self, context):
+        objects = list(context.selected_objects)
+        if context.active_object and context.active_object not in objects:
+            objects.append(context.active_object)
+        if context.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        
+        try:
+            atlased, atlas_materials, skipped = pack_texture_atlases(context, objects, int(self.atlas_size),
+                self.max_tile_size, self.padding)
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        if not atlased:
+            self.report({'WARNING'}, "No AI textures on the selected objects could be atlased")
+            return {'CANCELLED'}
+        message = f"Packed {atlased} materials into {len(atlas_materials)} atlases"
+        if skipped:
+            message += f", skipped {len(skipped)} (see console)"
+        self.report({'INFO'}, message)
+        return {'FINISHED'}
 
 class AITextureGeneratorPanel(Panel):
     bl_label = "AI Texture Generator"
@@ -702,43 +4246,89 @@ class AITextureGeneratorPanel(Panel):
         size_row.prop(context.scene.ai_model_settings, "width", text="Width")
         size_row.prop(context.scene.ai_model_settings, "height", text="Height")
         
+        seamless_row = box.row(align=True)
+        seamless_row.prop(context.scene.ai_texture_props, "make_seamless")
+        if context.scene.ai_texture_props.make_seamless:
+            seamless_row.prop(context.scene.ai_texture_props, "seamless_blend")
+        
         box.operator("material.ai_texture_generator")
         
+        batch_props = context.scene.ai_texture_props
+        batch_box = layout.box()
+        batch_box.label(text="Batch Generate", icon='DOCUMENTS')
+        batch_box.prop(batch_props, "batch_source", expand=True)
+        if batch_props.batch_source == 'TEXT':
+            batch_box.prop(batch_props, "batch_text", text="")
+        else:
+            batch_box.prop(batch_props, "batch_file", text="")
+        batch_box.prop(batch_props, "batch_max_in_flight")
+        batch_box.operator("material.ai_texture_batch_generate")
+        
+        jobs = get_job_manager().jobs()
+        if jobs:
+            jobs_box = layout.box()
+            row = jobs_box.row()
+            active_count = sum(1 for job in jobs if not job.done)
+            row.label(text=f"Jobs ({active_count} active)", icon='SORTTIME')
+            if active_count:
+                row.operator("material.ai_texture_cancel_job", text="", icon='CANCEL').job_id = ""
+            row.operator("material.ai_texture_export_trace", text="", icon='EXPORT')
+            row.operator("material.ai_texture_clear_jobs", text="", icon='TRASH')
+            for job in reversed(jobs):
+                row = jobs_box.row(align=True)
+                row.label(text=job.label[:32], icon=JOB_STATE_ICONS[job.state])
+                row.label(text=job.status)
+                if not job.done:
+                    row.operator("material.ai_texture_cancel_job", text="", icon='X').job_id = job.id
+                elif job.timings:
+                    summary_row = jobs_box.row()
+                    summary_row.scale_y = 0.7
+                    summary_row.label(text=format_stage_summary(job.timings), icon='TIME')
+        
+        storage_box = layout.box()
+        row = storage_box.row()
+        storage = get_storage_manager()
+        row.label(text=f"Storage: {storage.total / (1024 * 1024):.0f} MB in {len(storage.files)} files",
+            icon='DISK_DRIVE')
+        row.prop(context.scene.ai_texture_props, "storage_budget", text="Budget")
+        row = storage_box.row(align=True)
+        row.operator("material.ai_texture_collect_garbage", text="Preview Cleanup", icon='VIEWZOOM').dry_run = True
+        row.operator("material.ai_texture_collect_garbage", text="Clean Up", icon='TRASH').dry_run = False
+        
         if not obj or not obj.material_slots:
             return
             
+        registry = get_material_registry()
         active_mat = obj.active_material
-        if active_mat and active_mat.name.startswith("AI_Material_"):
+        active_entry = registry.get(active_mat)
+        if active_entry:
             box = layout.box()
             box.label(text="Active Texture Settings", icon='MATERIAL')
             
             row = box.row()
-            if '_' in active_mat.name:
-                display_name = active_mat.name.split('_')[2]
-            else:
-                display_name = active_mat.name
-            row.label(text=display_name)
+            row.label(text=active_entry.display_name)
             row.operator("material.ai_texture_delete", text="", icon='X').material_name = active_mat.name
             
             split = box.split(factor=0.3)
             
             preview_col = split.column()
-            texture_node = next((n for n in active_mat.node_tree.nodes 
-                if n.type == 'TEX_IMAGE'), None)
-            if texture_node and texture_node.image:
-                preview_col.template_ID_preview(
-                    texture_node, 
-                    "image",
-                    hide_buttons=True,
-                    rows=3,
-                    cols=1
-                )
+            image = active_entry.image
+            if image:
+                icon_id = get_thumbnail_icon(image)
+                if icon_id:
+                    preview_col.template_icon(icon_value=icon_id, scale=5)
+                else:
+                    preview_col.label(text="", icon='IMAGE_DATA')
             
             settings_col = split.column()
             settings_col.prop(context.scene.ai_texture_props, "tiling_x")
             settings_col.prop(context.scene.ai_texture_props, "tiling_y")
             settings_col.prop(context.scene.ai_texture_props, "use_normal_map")
+            if context.scene.ai_texture_props.use_normal_map:
+                settings_col.prop(context.scene.ai_texture_props, "normal_strength")
             settings_col.prop(context.scene.ai_texture_props, "use_roughness")
+            settings_col.prop(context.scene.ai_texture_props, "use_height_map")
+            settings_col.prop(context.scene.ai_texture_props, "use_ao_map")
             settings_col.operator("material.ai_texture_update", text="Apply Settings")
             settings_col.separator()
             settings_col.label(text="Upscale Settings:")
@@ -749,46 +4339,37 @@ class AITextureGeneratorPanel(Panel):
         box = layout.box()
         row = box.row()
         row.label(text="Generated Textures", icon='MATERIAL_DATA')
+        row.operator("material.ai_texture_pack_atlas", text="", icon='UV')
+        row.operator("material.ai_texture_merge_duplicates", text="", icon='AUTOMERGE_OFF')
+        row = box.row(align=True)
+        row.prop(context.scene.ai_texture_props, "viewport_resolution", text="Viewport")
+        row.prop(context.scene.ai_texture_props, "full_resolution_render", text="", icon='RENDER_STILL')
+        if render_needs_lock_interface(context.scene):
+            row = box.row()
+            row.label(text="Renders use viewport textures unless", icon='ERROR')
+            row.prop(context.scene.render, "use_lock_interface", text="Lock Interface")
         
         grid_flow = box.grid_flow(row_major=True, columns=4, even_columns=True, even_rows=True)
         
         for slot in obj.material_slots:
-            if slot.material and slot.material.name.startswith("AI_Material_"):
+            entry = registry.get(slot.material)
+            if entry:
                 mat = slot.material
                 cell = grid_flow.box()
                 
                 row = cell.row(align=True)
                 
-                texture_node = next((n for n in mat.node_tree.nodes 
-                    if n.type == 'TEX_IMAGE'), None)
-                if texture_node and texture_node.image:
-                    row.template_icon(
-                        icon_value=texture_node.image.preview.icon_id,
-                        scale=2
-                    )
+                image = entry.image
+                if image:
+                    icon_id = get_thumbnail_icon(image)
+                    if icon_id:
+                        row.template_icon(icon_value=icon_id, scale=2)
+                    else:
+                        row.label(text="", icon='IMAGE_DATA')
                 
                 is_active = (mat == active_mat)
                 name_col = row.column()
-                if '_' in mat.name:
-                    parts = mat.name.split('_')
-                    if len(parts) > 3:
-                        model_name = parts[2].upper()
-                        if "upscaled" in mat.name.lower():
-                            texture_node = next((n for n in mat.node_tree.nodes 
-                                if n.type == 'TEX_IMAGE'), None)
-                            if texture_node and texture_node.image:
-                                img_parts = texture_node.image.name.split('_')
-                                upscale_info = next((p for p in img_parts if 'x_' in p), '')
-                                if upscale_info:
-                                    model_name = f"{model_name} ↑{upscale_info.split('_')[0]}"
-                                else:
-                                    model_name = f"{model_name} ↑"
-                        display_name = f"{model_name}: {parts[3][:10]}"
-                    else:
-                        display_name = mat.name[:10]
-                else:
-                    display_name = mat.name[:10]
-                name_col.label(text=display_name)
+                name_col.label(text=entry.display_name)
                 
                 button_row = cell.row(align=True)
                 button_row.scale_y = 0.8
@@ -805,6 +4386,9 @@ class AITextureGeneratorPanel(Panel):
                 button_row.operator("material.ai_texture_delete", 
                     text="", icon='X').material_name = mat.name
 
+def update_viewport_resolution(self, context):
+    apply_texture_lods(self.viewport_resolution, map_save_dir(context))
+
 class AITextureProperties(PropertyGroup):
     tiling_x: FloatProperty(
         name="Tiling X",
@@ -818,6 +4402,18 @@ class AITextureProperties(PropertyGroup):
         default=1.0,
         min=0.1,
     )
+    make_seamless: BoolProperty(
+        name="Make Seamless",
+        description="Blend the edges of newly generated textures so they tile without visible seams",
+        default=True,
+    )
+    seamless_blend: FloatProperty(
+        name="Seam Blend",
+        description="Fraction of the image width and height blended across the seams",
+        default=0.25,
+        min=0.05,
+        max=0.45,
+    )
     use_normal_map: BoolProperty(
         name="Generate Normal Map",
         description="Generate a normal map from the texture",
@@ -828,6 +4424,23 @@ class AITextureProperties(PropertyGroup):
         description="Generate a roughness map from the texture",
         default=False,
     )
+    use_height_map: BoolProperty(
+        name="Generate Height Map",
+        description="Generate a height map from the texture and use it for displacement",
+        default=False,
+    )
+    use_ao_map: BoolProperty(
+        name="Generate AO Map",
+        description="Generate an ambient occlusion map from the texture and multiply it into the base color",
+        default=False,
+    )
+    normal_strength: FloatProperty(
+        name="Normal Strength",
+        description="Steepness of the generated normal map",
+        default=1.0,
+        min=0.0,
+        max=10.0,
+    )
     upscale_factor: FloatProperty(
         name="Upscale Factor",
         description="Factor to scale image by",
@@ -840,6 +4453,57 @@ class AITextureProperties(PropertyGroup):
         description="Run GFPGAN face enhancement along with upscaling",
         default=False,
     )
+    viewport_resolution: EnumProperty(
+        name="Viewport Resolution",
+        description="Resolution of the base texture every AI material shows, to save GPU memory in heavy scenes",
+        items=[
+            ('FULL', "Full", "Full resolution textures"),
+            ('512', "512", "Downsampled 512 px variants"),
+            ('256', "256", "Downsampled 256 px variants"),
+        ],
+        default='FULL',
+        update=update_viewport_resolution,
+    )
+    storage_budget: IntProperty(
+        name="Storage Budget (MB)",
+        description="Disk space generated files next to this blend file may use; unused files and LOD variants "
+            "are removed beyond it. 0 for no limit",
+        default=0,
+        min=0,
+    )
+    full_resolution_render: BoolProperty(
+        name="Full Resolution Renders",
+        description="Switch to full resolution textures while rendering and back afterwards. "
+                    "Interactive renders only switch while Lock Interface is enabled",
+        default=True,
+    )
+    batch_source: EnumProperty(
+        name="Prompt Source",
+        description="Where to read batch prompts from, one prompt per line",
+        items=[
+            ('TEXT', "Text Block", "Read prompts from a text block in this file"),
+            ('FILE', "File", "Read prompts from a text file on disk"),
+        ],
+        default='TEXT',
+    )
+    batch_text: bpy.props.PointerProperty(
+        name="Prompts",
+        description="Text block with one prompt per line",
+        type=bpy.types.Text,
+    )
+    batch_file: StringProperty(
+        name="Prompt File",
+        description="Text file with one prompt per line",
+        default="",
+        subtype='FILE_PATH',
+    )
+    batch_max_in_flight: IntProperty(
+        name="Max In Flight",
+        description="Maximum number of predictions running at the same time",
+        default=4,
+        min=1,
+        max=32,
+    )
 
 class AITextureDelete(Operator):
     bl_idname = "material.ai_texture_delete"
@@ -851,7 +4515,15 @@ class AITextureDelete(Operator):
     def execute(self, context):
         mat = bpy.data.materials.get(self.material_name)
         if mat:
+            images = [node.image for node in mat.node_tree.nodes if node.type == 'TEX_IMAGE' and node.image] \
+                if mat.node_tree else []
+            images += [value for value in mat.values() if isinstance(value, bpy.types.Image)]
             bpy.data.materials.remove(mat)
+            get_material_registry().remove(self.material_name)
+            # Files stay until a storage cleanup, so undoing the delete keeps its textures
+            for image in {image.name: image for image in images}.values():
+                if image.get("ai_managed") and image.users == 0:
+                    bpy.data.images.remove(image)
         return {'FINISHED'}
 
 class AITextureUpdate(Operator):
@@ -859,68 +4531,25 @@ class AITextureUpdate(Operator):
     bl_label = "Update Texture Settings"
     bl_options = {'REGISTER', 'UNDO'}
     
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj is not None and is_ai_material(obj.active_material)
+    
     def execute(self, context):
         obj = context.active_object
-        if not obj or not obj.active_material:
+        if not obj or not is_ai_material(obj.active_material):
             return {'CANCELLED'}
             
         material = obj.active_material
         if not material.use_nodes:
             return {'CANCELLED'}
             
-        nodes = material.node_tree.nodes
-        links = material.node_tree.links
-        
-        texture_node = next((n for n in nodes if n.type == 'TEX_IMAGE'), None)
-        principled = next((n for n in nodes if n.type == 'BSDF_PRINCIPLED'), None)
-        
-        if not texture_node or not principled:
+        if not upgrade_ai_material(material):
             return {'CANCELLED'}
-            
-        mapping_node = next((n for n in nodes if n.type == 'MAPPING'), None)
-        texcoord_node = next((n for n in nodes if n.type == 'TEX_COORD'), None)
-        
-        if not mapping_node:
-            mapping_node = nodes.new('ShaderNodeMapping')
-            mapping_node.location = (texture_node.location.x - 200, texture_node.location.y)
-        
-        if not texcoord_node:
-            texcoord_node = nodes.new('ShaderNodeTexCoord')
-            texcoord_node.location = (mapping_node.location.x - 200, mapping_node.location.y)
-        
-        links.new(texcoord_node.outputs['UV'], mapping_node.inputs['Vector'])
-        links.new(mapping_node.outputs['Vector'], texture_node.inputs['Vector'])
-        links.new(texture_node.outputs['Color'], principled.inputs['Base Color'])
-        
-        mapping_node.inputs['Scale'].default_value[0] = context.scene.ai_texture_props.tiling_x
-        mapping_node.inputs['Scale'].default_value[1] = context.scene.ai_texture_props.tiling_y
-        
-        normal_nodes = [n for n in nodes if n.type in {'NORMAL_MAP', 'BUMP'}]
-        if context.scene.ai_texture_props.use_normal_map:
-            if not normal_nodes:
-                bump = create_normal_map(texture_node, nodes, links, texture_node.location)
-                links.new(bump.outputs['Normal'], principled.inputs['Normal'])
-        else:
-            for node in normal_nodes:
-                nodes.remove(node)
-            rgb_to_bw = next((n for n in nodes if n.type == 'RGBTOBW' 
-                and n.location[1] < texture_node.location[1]), None)
-            if rgb_to_bw:
-                nodes.remove(rgb_to_bw)
         
-        roughness_nodes = [n for n in nodes if n.type == 'VALTORGB' 
-            and n.location[1] < texture_node.location[1]]
-        if context.scene.ai_texture_props.use_roughness:
-            if not roughness_nodes:
-                roughness = create_roughness_map(texture_node, nodes, links, texture_node.location)
-                links.new(roughness.outputs['Color'], principled.inputs['Roughness'])
-        else:
-            for node in roughness_nodes:
-                nodes.remove(node)
-            rgb_to_bw = next((n for n in nodes if n.type == 'RGBTOBW' 
-                and n.location[1] < texture_node.location[1] - 300), None)
-            if rgb_to_bw:
-                nodes.remove(rgb_to_bw)
+        update_ai_material(material, context.scene.ai_texture_props, map_save_dir(context))
+        get_material_registry().add(material)
         
         return {'FINISHED'}
 
@@ -951,205 +4580,41 @@ class AITextureAssign(Operator):
     material_name: StringProperty()
     
     def execute(self, context):
-        obj = context.active_object
-        if not obj:
-            return {'CANCELLED'}
-            
         mat = bpy.data.materials.get(self.material_name)
         if not mat:
             return {'CANCELLED'}
-            
-        if obj.mode == 'EDIT' and hasattr(obj.data, "polygons"):
-            mat_idx = -1
-            for i, slot in enumerate(obj.material_slots):
-                if slot.material == mat:
-                    mat_idx = i
-                    break
-            
-            if mat_idx >= 0:
-                original_active_index = obj.active_material_index
-                
-                obj.active_material_index = mat_idx
-                
-                bpy.context.tool_settings.mesh_select_mode = (False, False, True)
-                bpy.ops.object.material_slot_assign()
-                
-                obj.active_material_index = original_active_index
+        
+        if context.mode == 'EDIT_MESH':
+            objects = list(context.objects_in_mode)
+            selected_only = True
         else:
-            found = False
-            for i, slot in enumerate(obj.material_slots):
-                if slot.material == mat:
-                    found = True
-                    break
-            
-            if not found:
-                obj.data.materials.append(mat)
-            
+            objects = list(context.selected_objects)
+            if context.active_object and context.active_object not in objects:
+                objects.append(context.active_object)
+            selected_only = False
+        
+        if not objects:
+            return {'CANCELLED'}
+        
+        assigned = assign_material_to_objects(objects, mat, selected_only=selected_only)
+        self.report({'INFO'}, f"Assigned {mat.name} to {assigned} faces on {len(objects)} objects")
         return {'FINISHED'}
 
 class AITextureUpscale(Operator):
     bl_idname = "material.ai_texture_upscale"
     bl_label = "Upscale Texture"
-    bl_options = {'REGISTER', 'UNDO'}
-    
-    _timer = None
-    _thread = None
-    _queue = Queue()
-    _status_queue = StatusQueue()
-    _prediction_id = None
-    
-    def modal(self, context, event):
-        if event.type == 'TIMER':
-            status = self._status_queue.get()
-            if status:
-                context.scene.progress_status = status
-                for area in context.screen.areas:
-                    if area.type == 'PROPERTIES':
-                        area.tag_redraw()
-            
-            if not self._prediction_id:
-                if not self._queue.empty():
-                    self._prediction_id = self._queue.get()
-                    if self._prediction_id is None:
-                        self.cancel(context)
-                        return {'CANCELLED'}
-                    print(f"Got prediction ID: {self._prediction_id}")
-            else:
-                try:
-                    addon_prefs = context.preferences.addons["ai_texture_generator"].preferences
-                    api_key = addon_prefs.api_key
-                    headers = {"Authorization": f"Bearer {api_key}"}
-                    
-                    poll_url = f"https://api.replicate.com/v1/predictions/{self._prediction_id}"
-                    print(f"Polling: {poll_url}")
-                    
-                    poll_response = requests.get(poll_url, headers=headers)
-                    response_data = poll_response.json()
-                    print(f"Poll response: {response_data}")
-                    
-                    status = response_data['status']
-                    update_ui_status(context, f"Upscaling Status: {status}")
-                    
-                    if status == 'succeeded':
-                        image_url = response_data['output']
-                        print(f"Got output URL: {image_url}")
-                        
-                        addon_prefs = context.preferences.addons["ai_texture_generator"].preferences
-                        if addon_prefs.save_location == 'FOLDER':
-                            if not bpy.data.filepath:
-                                self.report({'ERROR'}, "Please save your blend file first")
-                                self.cancel(context)
-                                return {'CANCELLED'}
-                            save_dir = os.path.dirname(bpy.data.filepath)
-                        else:
-                            save_dir = "/tmp"
-                        
-                        image_uuid = uuid.uuid4()
-                        filename = f"upscaled_{self._prediction_id}_{image_uuid}.png"
-                        image_path = os.path.join(save_dir, filename)
-                        
-                        image_path = download_image(image_url, download_path=save_dir, context=context)
-                        if image_path:
-                            new_path = os.path.join(os.path.dirname(image_path), filename)
-                            os.rename(image_path, new_path)
-                            image_path = new_path
-                        
-                        print(f"Downloaded to: {image_path}")
-                        
-                        material = context.active_object.active_material
-                        texture_node = next((n for n in material.node_tree.nodes 
-                            if n.type == 'TEX_IMAGE'), None)
-                        
-                        if texture_node and texture_node.image:
-                            try:
-                                print(f"Loading image from: {image_path}")
-                                new_image = bpy.data.images.load(image_path, check_existing=False)
-                                
-                                upscale_factor = int(context.scene.ai_texture_props.upscale_factor)
-                                new_image.name = f"upscaled_{upscale_factor}x_{texture_node.image.name}"
-                                print(f"Loaded new image: {new_image.name}")
-                                
-                                new_image.reload()
-                                
-                                if new_image.size[0] > 0 and new_image.size[1] > 0 and new_image.channels > 0:
-                                    print(f"Image verified: {new_image.size[0]}x{new_image.size[1]} ({new_image.channels} channels)")
-                                    
-                                    if not new_image.packed_file:
-                                        try:
-                                            print("Packing image...")
-                                            new_image.pack()
-                                            print("Image packed successfully")
-                                        except Exception as e:
-                                            print(f"Error packing image: {str(e)}")
-                                            self.report({'ERROR'}, "Failed to pack image")
-                                            self.cancel(context)
-                                            return {'CANCELLED'}
-                                    
-                                    old_image = texture_node.image
-                                    texture_node.image = new_image
-                                    
-                                    material = context.active_object.active_material
-                                    material.update_tag()
-                                    material.node_tree.update_tag()
-                                    new_image.update_tag()
-                                    
-                                    for area in context.screen.areas:
-                                        if area.type in ['VIEW_3D', 'IMAGE_EDITOR', 'NODE_EDITOR']:
-                                            area.tag_redraw()
-                                    
-                                    if os.path.exists(image_path):
-                                        try:
-                                            os.remove(image_path)
-                                        except Exception as e:
-                                            print(f"Warning: Could not remove temporary file: {e}")
-                                    
-                                    self.report({'INFO'}, "Texture upscaled successfully")
-                                    print("Texture upscale complete")
-                                    
-                                else:
-                                    print(f"Error: Invalid image properties")
-                                    print(f"Size: {new_image.size[0]}x{new_image.size[1]}")
-                                    print(f"Channels: {new_image.channels}")
-                                    self.report({'ERROR'}, "Invalid image properties")
-                                    self.cancel(context)
-                                    return {'CANCELLED'}
-                                    
-                            except Exception as e:
-                                print(f"Error loading/applying image: {str(e)}")
-                                self.report({'ERROR'}, f"Error applying image: {str(e)}")
-                                self.cancel(context)
-                                return {'CANCELLED'}
-                        else:
-                            self.report({'ERROR'}, "Could not find texture node")
-                        
-                        self.cancel(context)
-                        return {'FINISHED'}
-                        
-                    elif status == 'failed':
-                        error_msg = response_data.get('error', 'Unknown error')
-                        print(f"Upscaling failed: {error_msg}")
-                        self.report({'ERROR'}, f"Upscaling failed: {error_msg}")
-                        self.cancel(context)
-                        return {'CANCELLED'}
-                        
-                except Exception as e:
-                    print(f"Error during upscaling: {str(e)}")
-                    self.report({'ERROR'}, f"Error during upscaling: {str(e)}")
-                    self.cancel(context)
-                    return {'CANCELLED'}
-        
-        return {'PASS_THROUGH'}
+    bl_description = "Start an upscale job for the texture of the active material"
     
     def execute(self, context):
-        print("Starting upscale operation...")
+        logger.debug("Starting upscale operation...")
         
         material = context.active_object.active_material
         if not material or not material.use_nodes:
             self.report({'ERROR'}, "No active material with nodes")
             return {'CANCELLED'}
         
-        texture_node = next((n for n in material.node_tree.nodes 
-            if n.type == 'TEX_IMAGE'), None)
+        entry = get_material_registry().get(material)
+        texture_node = entry.texture_node if entry else find_texture_node(material)
         
         if not texture_node or not texture_node.image:
             self.report({'ERROR'}, "No texture found in material")
@@ -1160,84 +4625,49 @@ class AITextureUpscale(Operator):
             self.report({'ERROR'}, "Please enter your API key in preferences")
             return {'CANCELLED'}
         
-        def submit_upscale():
-            try:
-                print("Starting upscale submission...")
-                image = texture_node.image
-                temp_path = os.path.join(bpy.app.tempdir, f"temp_{image.name}")
-                print(f"Saving temp file to: {temp_path}")
-                
-                image.save_render(temp_path)
-                
-                if not os.path.exists(temp_path):
-                    print(f"Failed to save temporary file: {temp_path}")
-                    self._queue.put(None)
-                    return
-                
-                headers = {"Authorization": f"Bearer {addon_prefs.api_key}"}
-                with open(temp_path, 'rb') as f:
-                    files = {'content': (os.path.basename(temp_path), f, 'image/png')}
-                    print("Uploading file to Replicate...")
-                    upload_response = requests.post(
-                        "https://api.replicate.com/v1/files",
-                        headers=headers,
-                        files=files
-                    )
-                
-                if upload_response.status_code != 201:
-                    print(f"Upload failed with status {upload_response.status_code}: {upload_response.text}")
-                    self._queue.put(None)
-                    return
-                
-                image_url = upload_response.json()['urls']['get']
-                print(f"File uploaded, got URL: {image_url}")
-                
-                data = {
-                    "version": "f121d640bd286e1fdc67f9799164c1d5be36ff74576ee11c803ae5b665dd46aa",
-                    "input": {
-                        "image": image_url,
-                        "scale": float(context.scene.ai_texture_props.upscale_factor),
-                        "face_enhance": bool(context.scene.ai_texture_props.face_enhance)
-                    }
-                }
-                
-                print(f"Submitting prediction with data: {data}")
-                response = requests.post(
-                    "https://api.replicate.com/v1/predictions",
-                    json=data,
-                    headers=headers
-                )
-                
-                if response.status_code == 201:
-                    prediction_id = response.json()['id']
-                    print(f"Prediction submitted, ID: {prediction_id}")
-                    self._queue.put(prediction_id)
-                else:
-                    print(f"Prediction submission failed: {response.text}")
-                    self._queue.put(None)
-                
-                try:
-                    os.remove(temp_path)
-                except Exception as e:
-                    print(f"Warning: Could not remove temp file: {e}")
-                
-            except Exception as e:
-                print(f"Error in submit_upscale: {str(e)}")
-                self._queue.put(None)
-        
-        self._thread = Thread(target=submit_upscale)
-        self._thread.start()
-        
-        wm = context.window_manager
-        self._timer = wm.event_timer_add(0.5, window=context.window)
-        wm.modal_handler_add(self)
+        texture_props = context.scene.ai_texture_props
+        job = submit_upscale_job(context, material, texture_node, int(texture_props.upscale_factor),
+            texture_props.face_enhance)
         
-        return {'RUNNING_MODAL'}
+        self.report({'INFO'}, f"Started upscale job {job.id}")
+        return {'FINISHED'}
+
+class AITextureCancelJob(Operator):
+    bl_idname = "material.ai_texture_cancel_job"
+    bl_label = "Cancel Job"
+    bl_description = "Cancel a running job, or every running job when no job is given"
+    
+    job_id: StringProperty()
+    
+    def execute(self, context):
+        cancelled = get_job_manager().cancel(self.job_id or None)
+        self.report({'INFO'}, f"Cancelled {cancelled} job(s)")
+        return {'FINISHED'}
+
+class AITextureExportTrace(Operator, ExportHelper):
+    bl_idname = "material.ai_texture_export_trace"
+    bl_label = "Export Trace"
+    bl_description = "Save timings of recent pipeline stages as Chrome trace JSON (open in chrome://tracing or Perfetto)"
+    
+    filename_ext = ".json"
+    filter_glob: StringProperty(default="*.json", options={'HIDDEN'})
+    
+    def execute(self, context):
+        try:
+            count = _tracer.export(self.filepath)
+        except OSError as e:
+            self.report({'ERROR'}, f"Could not write trace: {e}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Exported {count} spans to {self.filepath}")
+        return {'FINISHED'}
+
+class AITextureClearJobs(Operator):
+    bl_idname = "material.ai_texture_clear_jobs"
+    bl_label = "Clear Finished Jobs"
     
-    def cancel(self, context):
-        if self._timer:
-            context.window_manager.event_timer_remove(self._timer)
-            self._timer = None
+    def execute(self, context):
+        get_job_manager().clear_finished()
+        return {'FINISHED'}
 
 def register():
     bpy.utils.register_class(AIModelSettings)
@@ -1250,6 +4680,31 @@ def register():
     bpy.utils.register_class(AITextureSelect)
     bpy.utils.register_class(AITextureAssign)
     bpy.utils.register_class(AITextureUpscale)
+    bpy.utils.register_class(AITextureClearCache)
+    bpy.utils.register_class(AITextureBatchGenerate)
+    bpy.utils.register_class(AITextureMergeDuplicates)
+    bpy.utils.register_class(AITexturePackAtlas)
+    bpy.utils.register_class(AITextureCollectGarbage)
+    bpy.utils.register_class(AITextureCancelJob)
+    bpy.utils.register_class(AITextureClearJobs)
+    bpy.utils.register_class(AITextureExportTrace)
+    
+    addon = bpy.context.preferences.addons.get("ai_texture_generator")
+    if addon and addon.preferences:
+        logger.setLevel(addon.preferences.log_level)
+    
+    global _thumbnail_previews
+    _thumbnail_previews = bpy.utils.previews.new()
+    
+    bpy.app.handlers.load_post.append(ai_material_registry_reset)
+    bpy.app.handlers.undo_post.append(ai_material_registry_reset)
+    bpy.app.handlers.redo_post.append(ai_material_registry_reset)
+    bpy.app.handlers.depsgraph_update_post.append(ai_material_registry_sync)
+    bpy.app.handlers.load_post.append(ai_job_journal_resume)
+    bpy.app.handlers.save_post.append(ai_job_journal_save)
+    bpy.app.handlers.render_init.append(ai_texture_lod_render_init)
+    bpy.app.handlers.render_complete.append(ai_texture_lod_render_done)
+    bpy.app.handlers.render_cancel.append(ai_texture_lod_render_done)
     
     bpy.types.Scene.ai_texture_generator_text_prompt = StringProperty(
         name="Text Prompt",
@@ -1267,6 +4722,37 @@ def register():
     bpy.types.Scene.ai_model_settings = bpy.props.PointerProperty(type=AIModelSettings)
 
 def unregister():
+    global _replicate_client, _prediction_poller, _thumbnail_previews, _job_manager, _webhook_receiver
+    if _thumbnail_previews is not None:
+        bpy.utils.previews.remove(_thumbnail_previews)
+        _thumbnail_previews = None
+    if bpy.app.timers.is_registered(process_pending_thumbnails):
+        bpy.app.timers.unregister(process_pending_thumbnails)
+    
+    for handlers, handler in ((bpy.app.handlers.load_post, ai_material_registry_reset),
+                              (bpy.app.handlers.undo_post, ai_material_registry_reset),
+                              (bpy.app.handlers.redo_post, ai_material_registry_reset),
+                              (bpy.app.handlers.depsgraph_update_post, ai_material_registry_sync),
+                              (bpy.app.handlers.load_post, ai_job_journal_resume),
+                              (bpy.app.handlers.save_post, ai_job_journal_save),
+                              (bpy.app.handlers.render_init, ai_texture_lod_render_init),
+                              (bpy.app.handlers.render_complete, ai_texture_lod_render_done),
+                              (bpy.app.handlers.render_cancel, ai_texture_lod_render_done)):
+        if handler in handlers:
+            handlers.remove(handler)
+    if _job_manager:
+        _job_manager.stop()
+        _job_manager = None
+    if _webhook_receiver:
+        _webhook_receiver.stop()
+        _webhook_receiver = None
+    if _prediction_poller:
+        _prediction_poller.stop()
+        _prediction_poller = None
+    if _replicate_client:
+        _replicate_client.close()
+        _replicate_client = None
+    
     bpy.utils.unregister_class(AIModelSettings)
     bpy.utils.unregister_class(AITextureProperties)
     bpy.utils.unregister_class(AITextureGeneratorPreferences)
@@ -1277,6 +4763,14 @@ def unregister():
     bpy.utils.unregister_class(AITextureSelect)
     bpy.utils.unregister_class(AITextureAssign)
     bpy.utils.unregister_class(AITextureUpscale)
+    bpy.utils.unregister_class(AITextureClearCache)
+    bpy.utils.unregister_class(AITextureBatchGenerate)
+    bpy.utils.unregister_class(AITextureMergeDuplicates)
+    bpy.utils.unregister_class(AITexturePackAtlas)
+    bpy.utils.unregister_class(AITextureCollectGarbage)
+    bpy.utils.unregister_class(AITextureCancelJob)
+    bpy.utils.unregister_class(AITextureClearJobs)
+    bpy.utils.unregister_class(AITextureExportTrace)
     
     del bpy.types.Scene.ai_texture_generator_text_prompt
     del bpy.types.Scene.progress_status
@@ -0,0 +1,71 @@
+"""Pytest setup for the pure helper tests
+
+The addon is imported as the ai_texture_generator package. Outside Blender a
+minimal bpy stand-in is installed first, just enough for the module to import;
+tests here only exercise helpers that never touch Blender data. The tests that
+need Blender run inside it instead:
+
+    blender -b --factory-startup --python tests/test_storage.py
+"""
+
+import importlib.util
+import os
+import sys
+import tempfile
+import types
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADDON_NAME = "ai_texture_generator"
+
+collect_ignore = ["test_lod.py", "test_storage.py"]
+
+class _Anything:
+    """Absorbs any attribute access or call, for bpy data the helpers never use"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, *args, **kwargs):
+        return _Anything()
+
+    def __getattr__(self, name):
+        return _Anything()
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    sys.modules[name] = module
+    return module
+
+def install_bpy_stand_in():
+    bpy_types = _module("bpy.types")
+    bpy_types.__getattr__ = lambda name: setattr(bpy_types, name, type(name, (), {})) or getattr(bpy_types, name)
+    bpy_props = _module("bpy.props")
+    for name in ("StringProperty", "EnumProperty", "BoolProperty", "FloatProperty", "IntProperty",
+                 "PointerProperty", "CollectionProperty", "FloatVectorProperty"):
+        setattr(bpy_props, name, lambda *args, **kwargs: None)
+    previews = _module("bpy.utils.previews")
+    utils = _module("bpy.utils", previews=previews, __path__=[],
+        user_resource=lambda *args, **kwargs: tempfile.gettempdir())
+    handlers = types.SimpleNamespace(persistent=lambda function: function)
+    app = types.SimpleNamespace(handlers=handlers, timers=_Anything(), background=True, version=(4, 0, 0))
+    _module("bpy", __path__=[], types=bpy_types, props=bpy_props, utils=utils, app=app,
+        data=_Anything(), context=_Anything(), path=_Anything(), ops=_Anything())
+    io_utils = _module("bpy_extras.io_utils", ExportHelper=type("ExportHelper", (), {}),
+        ImportHelper=type("ImportHelper", (), {}))
+    _module("bpy_extras", __path__=[], io_utils=io_utils)
+
+def import_addon():
+    try:
+        import bpy  # noqa: F401
+    except ImportError:
+        install_bpy_stand_in()
+    spec = importlib.util.spec_from_file_location(ADDON_NAME, os.path.join(ADDON_DIR, "__init__.py"),
+        submodule_search_locations=[ADDON_DIR])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[ADDON_NAME] = module
+    spec.loader.exec_module(module)
+    return module
+
+if ADDON_NAME not in sys.modules:
+    import_addon()
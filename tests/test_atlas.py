@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import ai_texture_generator as addon
+
+def overlaps(a, b):
+    (ax, ay, aw, ah), (bx, by, bw, bh) = a, b
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+
+def test_bin_places_rectangles_without_overlap():
+    page = addon.MaxRectsBin(256, 256)
+    sizes = [(128, 128), (128, 64), (64, 64), (64, 64), (128, 64), (64, 128), (64, 128)]
+    rectangles = [page.insert(w, h) + (w, h) for w, h in sizes]
+    for i, a in enumerate(rectangles):
+        assert a[0] >= 0 and a[1] >= 0 and a[0] + a[2] <= 256 and a[1] + a[3] <= 256
+        assert not any(overlaps(a, b) for b in rectangles[i + 1:])
+
+def test_bin_rejects_what_no_longer_fits():
+    page = addon.MaxRectsBin(128, 128)
+    assert page.insert(128, 96) == (0, 0)
+    assert page.insert(64, 64) is None
+    assert page.insert(128, 32) == (0, 96)
+    assert page.used_height == 128
+
+def test_pack_fills_a_page_exactly():
+    placements, pages = addon.pack_rectangles([(64, 64)] * 16, 256)
+    assert len(pages) == 1
+    assert sorted((x, y) for _, x, y in placements) == [(x, y) for x in range(0, 256, 64) for y in range(0, 256, 64)]
+
+def test_pack_spills_onto_new_pages_and_keeps_input_order():
+    placements, pages = addon.pack_rectangles([(32, 32), (256, 256), (256, 256)], 256)
+    assert len(pages) == 3
+    assert placements[1][1:] == (0, 0) and placements[2][1:] == (0, 0)
+    assert placements[1][0] != placements[2][0]
+    assert placements[0][0] == 2
+
+def test_pack_rejects_tiles_larger_than_a_page():
+    with pytest.raises(ValueError):
+        addon.pack_rectangles([(512, 64)], 256)
+
+def socket(value=None, links=()):
+    return SimpleNamespace(default_value=value, links=list(links))
+
+def texture_node_from(mapping):
+    return SimpleNamespace(inputs={'Vector': socket(links=[SimpleNamespace(from_node=mapping)] if mapping else [])})
+
+def test_uv_transform_without_mapping_is_identity():
+    assert addon.texture_uv_transform(texture_node_from(None)) == ((1.0, 1.0), (0.0, 0.0))
+
+def test_uv_transform_reads_mapping_scale_and_location():
+    mapping = SimpleNamespace(type='MAPPING', vector_type='POINT', inputs={
+        'Rotation': socket((0.0, 0.0, 0.0)), 'Scale': socket((2.0, 3.0, 1.0)), 'Location': socket((0.5, 0.25, 0.0))})
+    assert addon.texture_uv_transform(texture_node_from(mapping)) == ((2.0, 3.0), (0.5, 0.25))
+
+def test_uv_transform_gives_up_on_rotation():
+    mapping = SimpleNamespace(type='MAPPING', vector_type='POINT', inputs={
+        'Rotation': socket((0.0, 0.0, 0.5)), 'Scale': socket((1.0, 1.0, 1.0)), 'Location': socket((0.0, 0.0, 0.0))})
+    assert addon.texture_uv_transform(texture_node_from(mapping)) is None
+
+def test_uv_transform_reads_the_shader_group_tiling():
+    group = SimpleNamespace(type='GROUP', inputs={"Tiling X": socket(4.0), "Tiling Y": socket(2.0)})
+    assert addon.texture_uv_transform(texture_node_from(group)) == ((4.0, 2.0), (0.0, 0.0))
+
+class Collection(list):
+    def __init__(self, items, **arrays):
+        super().__init__(items)
+        self.arrays = arrays
+
+    def foreach_get(self, name, array):
+        array[:] = np.asarray(self.arrays[name]).ravel()
+
+def quad_mesh(face_uvs, material_index):
+    """A mesh of separate quads, one list of four UVs per face"""
+
+    uv = [coordinate for face in face_uvs for coordinate in face]
+    uv_layer = SimpleNamespace(active_render=True, data=Collection(uv, uv=uv))
+    polygons = Collection(face_uvs, loop_start=[4 * i for i in range(len(face_uvs))],
+        loop_total=[4] * len(face_uvs), material_index=material_index)
+    return SimpleNamespace(uv_layers=[uv_layer], loops=[None] * len(uv), polygons=polygons,
+        materials=[None] * (max(material_index) + 1))
+
+def unit_quad(dx=0.0, dy=0.0, size=1.0):
+    return [(dx, dy), (dx + size, dy), (dx + size, dy + size), (dx, dy + size)]
+
+def test_plan_drops_whole_tile_offsets():
+    face_uv, loop_slot, unfit = addon.plan_atlas_uvs(quad_mesh([unit_quad(3, -2)], [0]), {})
+    assert np.allclose(face_uv, unit_quad())
+    assert loop_slot.tolist() == [0, 0, 0, 0]
+    assert unfit == set()
+
+def test_plan_applies_each_slot_transform():
+    mesh = quad_mesh([unit_quad(size=0.5), unit_quad(size=0.5)], [0, 1])
+    face_uv, _, unfit = addon.plan_atlas_uvs(mesh, {1: ((2.0, 2.0), (0.25, 0.25))})
+    assert np.allclose(face_uv[:4], unit_quad(size=0.5))
+    assert np.allclose(face_uv[4:], unit_quad(0.25, 0.25))
+    assert unfit == {1}
+
+def test_plan_needs_uvs():
+    mesh = quad_mesh([unit_quad()], [0])
+    mesh.uv_layers = []
+    assert addon.plan_atlas_uvs(mesh, {}) is None
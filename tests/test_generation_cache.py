@@ -0,0 +1,63 @@
+import os
+import time
+
+import ai_texture_generator as addon
+
+URL = "https://api.replicate.com/v1/predictions"
+
+def request(**fields):
+    return {"version": "abc", "input": dict({"prompt": "brick", "width": 1024}, **fields)}
+
+def test_cache_key_ignores_field_order():
+    first = {"version": "abc", "input": {"prompt": "brick", "width": 1024}}
+    second = {"input": {"width": 1024, "prompt": "brick"}, "version": "abc"}
+    assert addon.generation_cache_key('SDXL', URL, first) == addon.generation_cache_key('SDXL', URL, second)
+
+def test_cache_key_covers_model_url_and_inputs():
+    key = addon.generation_cache_key('SDXL', URL, request())
+    assert key != addon.generation_cache_key('FLUX', URL, request())
+    assert key != addon.generation_cache_key('SDXL', URL + "/other", request())
+    assert key != addon.generation_cache_key('SDXL', URL, request(width=512))
+    assert key != addon.generation_cache_key('SDXL', URL, dict(request(), version="def"))
+
+def test_put_then_get_returns_file_and_metadata(tmp_path):
+    cache = addon.GenerationCache(str(tmp_path), max_bytes=1024)
+    cache.put("a", addon.ImageBytes("out.png", b"x" * 10, None), {"prompt": "brick"})
+    path, metadata = cache.get("a")
+    assert path == os.path.join(str(tmp_path), "a.png")
+    assert open(path, 'rb').read() == b"x" * 10
+    assert metadata == {"prompt": "brick"}
+    assert cache.get("missing") is None
+
+def test_put_copies_image_files(tmp_path):
+    source = tmp_path / "download.png"
+    source.write_bytes(b"y" * 20)
+    cache = addon.GenerationCache(str(tmp_path / "cache"), max_bytes=1024)
+    cache.put("a", addon.ImageFile("download.png", str(source), None))
+    path, _ = cache.get("a")
+    assert open(path, 'rb').read() == b"y" * 20
+    assert source.exists()
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = addon.GenerationCache(str(tmp_path), max_bytes=25)
+    cache.put("a", addon.ImageBytes("a.png", b"a" * 10, None))
+    time.sleep(0.01)
+    cache.put("b", addon.ImageBytes("b.png", b"b" * 10, None))
+    time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+    cache.put("c", addon.ImageBytes("c.png", b"c" * 10, None))
+    assert cache.get("b") is None
+    assert not (tmp_path / "b.png").exists()
+    assert cache.get("a") and cache.get("c")
+
+def test_index_survives_a_new_instance(tmp_path):
+    addon.GenerationCache(str(tmp_path), max_bytes=1024).put("a", addon.ImageBytes("a.png", b"a", None))
+    assert addon.GenerationCache(str(tmp_path), max_bytes=1024).get("a")
+
+def test_entry_whose_file_is_gone_is_dropped(tmp_path):
+    cache = addon.GenerationCache(str(tmp_path), max_bytes=1024)
+    cache.put("a", addon.ImageBytes("a.png", b"a", None))
+    os.remove(tmp_path / "a.png")
+    assert cache.get("a") is None
+    assert "a" not in addon.GenerationCache(str(tmp_path), max_bytes=1024)._load_index()
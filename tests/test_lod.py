@@ -0,0 +1,69 @@
+"""LOD tests, run inside Blender in background mode:
+
+    blender -b --factory-startup --python tests/test_lod.py
+"""
+
+import os
+import sys
+import tempfile
+import types
+import unittest
+
+import addon_utils
+import bpy
+import numpy as np
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADDON_NAME = "ai_texture_generator"
+
+def enable_addon():
+    link_dir = tempfile.mkdtemp(prefix="ai_texture_test_")
+    os.symlink(ADDON_DIR, os.path.join(link_dir, ADDON_NAME))
+    sys.path.insert(0, link_dir)
+    addon_utils.enable(ADDON_NAME, default_set=True)
+    return sys.modules[ADDON_NAME]
+
+addon = enable_addon()
+
+def png_bytes(size, value):
+    pixels = np.full((size, size, 3), value, dtype=np.uint8)
+    data = addon.encode_png(pixels)
+    return addon.ImageBytes(f"upscaled_{size}.png", data, addon.hashlib.sha256(data).hexdigest())
+
+class UpscaleLodTest(unittest.TestCase):
+    def setUp(self):
+        bpy.ops.wm.read_homefile(use_empty=True)
+        self.scene = bpy.context.scene
+        base = bpy.data.images.new("base", 600, 600)
+        base.pack()
+        self.material = bpy.data.materials.new("AI_Material_test")
+        self.material.use_nodes = True
+        self.texture = addon.build_ai_material_nodes(self.material, base, "AI_Texture_Node_test")
+        self.material["ai_texture_node"] = self.texture.name
+        self.scene.ai_texture_props.viewport_resolution = '512'
+        addon.set_texture_lod(self.material, self.texture, '512')
+        self.assertEqual(self.texture.image, base["ai_lod_512"])
+
+    def upscale(self):
+        settings = addon.JobSettings(kind='UPSCALE', prompt="", model="", object_name=None,
+            save_location='BLENDER', save_dir=None, texture=None, material_name=self.material.name,
+            texture_node_name=self.texture.name, upscale_factor=2)
+        job = types.SimpleNamespace(settings=settings, result=(png_bytes(1200, 128), None),
+            report=lambda *args: None, output_material=None)
+        self.assertTrue(addon.apply_upscale_job(bpy.context, job))
+
+    def test_node_shows_lod_of_upscaled_image(self):
+        self.upscale()
+        full = self.material["ai_full_image"]
+        self.assertEqual(tuple(full.size), (1200, 1200))
+        self.assertEqual(self.texture.image, full["ai_lod_512"])
+
+    def test_node_shows_upscaled_image_at_full_resolution(self):
+        self.scene.ai_texture_props.viewport_resolution = 'FULL'
+        self.upscale()
+        self.assertEqual(tuple(self.texture.image.size), (1200, 1200))
+        self.assertEqual(self.texture.image, self.material["ai_full_image"])
+
+if __name__ == "__main__":
+    result = unittest.main(argv=[sys.argv[0]], exit=False).result
+    sys.exit(0 if result.wasSuccessful() else 1)
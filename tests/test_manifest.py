@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+import pytest
+
+import ai_texture_generator as addon
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+def test_parse_manifest_value():
+    assert addon.parse_manifest_value(" Yes ") is True
+    assert addon.parse_manifest_value("false") is False
+    assert addon.parse_manifest_value("1024") == 1024
+    assert addon.parse_manifest_value("2.5") == 2.5
+    assert addon.parse_manifest_value("brick") == "brick"
+
+def test_jsonl_rows_keep_their_line_numbers(tmp_path):
+    path = write(tmp_path, "textures.jsonl", '{"prompt": "oak"}\n\n# comment\n{"prompt": "slate", "upscale": 2}\n')
+    assert addon.read_manifest(path) == [(1, {"prompt": "oak"}), (4, {"prompt": "slate", "upscale": 2})]
+
+def test_malformed_jsonl_line_does_not_stop_the_read(tmp_path):
+    path = write(tmp_path, "textures.jsonl", '{"prompt": "oak"\n{"prompt": "slate"}\n')
+    (first_line, error), second = addon.read_manifest(path)
+    assert first_line == 1 and isinstance(error, ValueError)
+    assert second == (2, {"prompt": "slate"})
+
+def test_csv_extra_columns_become_settings(tmp_path):
+    path = write(tmp_path, "textures.csv", "prompt,material,upscale,width,refine\n"
+        "weathered oak , Oak,2,1024,expert_ensemble_refiner\nslate,,,,\n")
+    assert addon.read_manifest(path) == [
+        (2, {"prompt": "weathered oak", "material": "Oak", "upscale": 2,
+             "settings": {"width": 1024, "refine": "expert_ensemble_refiner"}}),
+        (3, {"prompt": "slate", "settings": {}}),
+    ]
+
+def test_valid_row_is_normalised():
+    row = addon.validate_manifest_row({"prompt": "oak", "upscale": "4"})
+    assert row == {"prompt": "oak", "upscale": 4, "settings": {}}
+    assert addon.validate_manifest_row({"prompt": "oak", "upscale": 2.0, "face_enhance": True})["upscale"] == 2
+
+@pytest.mark.parametrize("row", [
+    ValueError("Invalid JSON"),
+    ["oak"],
+    {"prompt": ""},
+    {"prompt": 42},
+    {"prompt": "oak", "material": ["Oak"]},
+    {"prompt": "oak", "colour": "red"},
+    {"prompt": "oak", "settings": "width=1024"},
+    {"prompt": "oak", "upscale": "lots"},
+    {"prompt": "oak", "upscale": 2.5},
+    {"prompt": "oak", "upscale": 11},
+    {"prompt": "oak", "upscale": True},
+    {"prompt": "oak", "face_enhance": "yes"},
+])
+def test_invalid_rows_raise_value_error(row):
+    with pytest.raises(ValueError):
+        addon.validate_manifest_row(row)
+
+def scene_settings(**values):
+    properties = [SimpleNamespace(identifier=name) for name in ("rna_type",) + tuple(values)]
+    return SimpleNamespace(bl_rna=SimpleNamespace(properties=properties), **values)
+
+def test_model_settings_overrides_apply_on_top_of_the_scene():
+    settings = addon.manifest_model_settings(scene_settings(width=1024, height=768), {"height": 512})
+    assert (settings.width, settings.height) == (1024, 512)
+
+def test_unknown_model_settings_are_rejected():
+    with pytest.raises(ValueError):
+        addon.manifest_model_settings(scene_settings(width=1024), {"depth": 3})
+
+def test_every_model_lists_the_settings_it_sends():
+    assert set(addon.MODEL_REQUEST_SETTINGS) == set(addon.AIModelType.__members__)
@@ -0,0 +1,46 @@
+import numpy as np
+
+import ai_texture_generator as addon
+
+def test_box_blur_averages_the_window():
+    values = np.zeros((5, 5), dtype=np.float32)
+    values[2, 2] = 9.0
+    blurred = addon.box_blur(values, 1)
+    assert np.allclose(blurred[1:4, 1:4], 1.0)
+    assert blurred.sum() == np.float32(9.0)
+
+def test_box_blur_wraps_around_the_edges():
+    values = np.zeros((6, 6), dtype=np.float32)
+    values[0, 0] = 9.0
+    blurred = addon.box_blur(values, 1)
+    assert blurred[5, 5] == np.float32(1.0)
+    assert blurred[2, 2] == 0.0
+
+def test_box_blur_keeps_flat_fields():
+    values = np.full((8, 4), 0.3, dtype=np.float32)
+    assert np.allclose(addon.box_blur(values, 2), 0.3)
+
+def test_flat_height_points_straight_up():
+    normal = addon.compute_normal_map(np.full((8, 8), 0.5, dtype=np.float32))
+    assert normal.shape == (8, 8, 3)
+    assert np.allclose(normal, (0.5, 0.5, 1.0))
+
+def test_normals_lean_away_from_rising_height():
+    ramp = np.tile(np.linspace(0.0, 1.0, 16, dtype=np.float32), (16, 1))
+    normal = addon.compute_normal_map(ramp)[4:12, 4:12]
+    assert (normal[..., 0] < 0.5).all()
+    assert np.allclose(normal[..., 1], 0.5)
+
+    normal = addon.compute_normal_map(ramp.T)[4:12, 4:12]
+    assert np.allclose(normal[..., 0], 0.5)
+    assert not np.allclose(normal[..., 1], 0.5)
+
+def test_normals_are_unit_length_and_strength_steepens_them():
+    height = np.random.default_rng(0).random((16, 16)).astype(np.float32)
+    gentle, steep = addon.compute_normal_map(height, 0.5), addon.compute_normal_map(height, 4.0)
+    assert np.allclose(np.linalg.norm(gentle * 2 - 1, axis=-1), 1.0, atol=1e-5)
+    assert (steep[..., 2] <= gentle[..., 2] + 1e-6).all()
+
+def test_height_map_is_normalised():
+    assert np.allclose(addon.compute_height_map(np.array([[0.2, 0.6], [0.4, 0.2]])), [[0.0, 1.0], [0.5, 0.0]])
+    assert np.allclose(addon.compute_height_map(np.full((2, 2), 0.7)), 0.5)
@@ -0,0 +1,57 @@
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+import ai_texture_generator as addon
+
+def decode_png(data):
+    """Minimal reader for the unfiltered 8-bit PNGs encode_png writes"""
+
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    chunks, offset = [], 8
+    while offset < len(data):
+        length, tag = struct.unpack(">I4s", data[offset:offset + 8])
+        body = data[offset + 8:offset + 8 + length]
+        crc, = struct.unpack(">I", data[offset + 8 + length:offset + 12 + length])
+        assert crc == zlib.crc32(tag + body) & 0xffffffff
+        chunks.append((tag, body))
+        offset += 12 + length
+    assert [tag for tag, _ in chunks] == [b"IHDR", b"IDAT", b"IEND"]
+    width, height, depth, color_type, _, _, _ = struct.unpack(">IIBBBBB", chunks[0][1])
+    assert depth == 8
+    channels = {0: 1, 4: 2, 2: 3, 6: 4}[color_type]
+    rows = np.frombuffer(zlib.decompress(chunks[1][1]), dtype=np.uint8).reshape(height, width * channels + 1)
+    assert (rows[:, 0] == 0).all()
+    return rows[:, 1:].reshape(height, width, channels)
+
+@pytest.mark.parametrize("channels", [1, 2, 3, 4])
+def test_encode_png_round_trips(channels):
+    pixels = np.random.default_rng(channels).integers(0, 256, (7, 5, channels), dtype=np.uint8)
+    assert np.array_equal(decode_png(addon.encode_png(pixels)), pixels)
+
+def test_compression_level_only_changes_the_size():
+    pixels = np.zeros((64, 64, 3), dtype=np.uint8)
+    fast, small = addon.encode_png(pixels, compression=1), addon.encode_png(pixels, compression=9)
+    assert len(small) <= len(fast)
+    assert np.array_equal(decode_png(fast), decode_png(small))
+
+def test_pixels_to_bytes_flips_rows_and_rounds():
+    pixels = np.array([[[0.0, 1.0, 0.5]], [[1.2, -0.1, 0.25]]], dtype=np.float32)
+    encoded = addon.pixels_to_bytes(pixels)
+    assert encoded.dtype == np.uint8
+    assert encoded.tolist() == [[[255, 0, 64]], [[0, 255, 128]]]
+
+def test_downsample_averages_each_cell():
+    pixels = np.arange(16, dtype=np.float32).reshape(4, 4, 1)
+    assert addon.downsample_pixels(pixels, 2, 2)[..., 0].tolist() == [[2.5, 4.5], [10.5, 12.5]]
+
+def test_downsample_leaves_smaller_images_alone():
+    pixels = np.ones((4, 4, 3), dtype=np.float32)
+    assert addon.downsample_pixels(pixels, 8, 8).shape == (4, 4, 3)
+
+def test_rgba_pixels_fills_colour_and_alpha():
+    grey = addon.rgba_pixels(np.full((2, 2, 1), 0.25, dtype=np.float32))
+    assert grey.shape == (2, 2, 4)
+    assert np.allclose(grey[..., :3], 0.25) and np.allclose(grey[..., 3], 1.0)
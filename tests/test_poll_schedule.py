@@ -0,0 +1,24 @@
+import pytest
+
+import ai_texture_generator as addon
+
+def test_delay_grows_with_elapsed_time_without_history():
+    delays = [addon.next_poll_delay(elapsed) for elapsed in (0, 2, 8, 40)]
+    assert delays == sorted(delays)
+    assert delays[0] == 0.25
+    assert delays[-1] == 5.0
+
+def test_most_of_the_expected_time_is_skipped():
+    assert addon.next_poll_delay(1, expected=5) == pytest.approx(3.2)
+
+def test_polling_tightens_near_the_expected_finish():
+    assert addon.next_poll_delay(9.9, expected=10) == 0.25
+
+def test_overrun_backs_off_from_the_expected_finish():
+    assert addon.next_poll_delay(10, expected=10) == 0.25
+    assert addon.next_poll_delay(14, expected=10) == pytest.approx(1.0)
+    assert addon.next_poll_delay(100, expected=10) == 5.0
+
+def test_bounds_are_configurable():
+    assert addon.next_poll_delay(0, min_interval=1.0) == 1.0
+    assert addon.next_poll_delay(100, expected=300, max_interval=2.0) == 2.0
@@ -0,0 +1,68 @@
+import queue
+import time
+
+import ai_texture_generator as addon
+
+class FakeClient:
+    """Answers polls from a per-prediction list of (prediction, retry_delay) results"""
+
+    max_retries = 3
+
+    def __init__(self, results):
+        self.results = results
+        self.polls = []
+
+    def poll_prediction(self, prediction_id, attempt=0):
+        self.polls.append((prediction_id, attempt))
+        answers = self.results[prediction_id]
+        return answers.pop(0) if len(answers) > 1 else answers[0]
+
+def wait_for(events, kind, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            event = events.get(timeout=deadline - time.monotonic())
+        except queue.Empty:
+            break
+        if event[1] == kind:
+            return event
+    raise AssertionError(f"No {kind} event")
+
+def test_rate_limited_prediction_does_not_hold_up_the_others():
+    poller = addon.PredictionPoller(min_interval=0.01, max_interval=0.01)
+    client = FakeClient({
+        "limited": [(None, 30.0)],
+        "done": [({"id": "done", "status": "failed", "error": "boom"}, None)],
+    })
+    limited_events, done_events = queue.Queue(), queue.Queue()
+    try:
+        poller.watch(client, "limited", limited_events, tag="limited")
+        poller.watch(client, "done", done_events, tag="done")
+        started = time.monotonic()
+        assert wait_for(done_events, 'failed')[2] == "boom"
+        assert time.monotonic() - started < 1.0
+        assert poller._watches["limited"]['next_poll'] > time.monotonic() + 20
+        assert poller._watches["limited"]['retries'] == 1
+    finally:
+        poller.stop()
+
+def test_retries_reset_after_a_successful_poll():
+    poller = addon.PredictionPoller(min_interval=0.01, max_interval=0.01)
+    client = FakeClient({"p": [(None, 0.01), ({"id": "p", "status": "processing"}, None),
+        ({"id": "p", "status": "canceled"}, None)]})
+    events = queue.Queue()
+    try:
+        poller.watch(client, "p", events, tag="p")
+        wait_for(events, 'failed')
+        assert [attempt for _, attempt in client.polls] == [0, 1, 0]
+    finally:
+        poller.stop()
+
+def test_submit_without_prediction_id_fails_the_job():
+    poller = addon.PredictionPoller()
+    events = queue.Queue()
+    try:
+        poller.submit(FakeClient({}), events, "job", lambda client: {"status": "starting"})
+        assert "no prediction ID" in wait_for(events, 'failed')[2]
+    finally:
+        poller.stop()
@@ -0,0 +1,45 @@
+import numpy as np
+
+import ai_texture_generator as addon
+
+def gradient(size=64):
+    """An RGBA ramp that jumps from bright back to dark at both wrap-around edges"""
+
+    ramp = np.linspace(0.0, 1.0, size, dtype=np.float32)
+    pixels = np.ones((size, size, 4), dtype=np.float32)
+    pixels[..., 0] = ramp[None, :]
+    pixels[..., 1] = ramp[:, None]
+    pixels[..., 2] = (ramp[None, :] + ramp[:, None]) / 2
+    return pixels
+
+def test_seam_error_flags_untileable_images():
+    assert addon.seam_error(gradient()) > 10
+
+def test_seam_error_of_a_tiling_pattern_is_ordinary():
+    x = np.arange(64, dtype=np.float32)
+    wave = (np.sin(2 * np.pi * x / 64) + 1) / 2
+    pixels = np.ones((64, 64, 4), dtype=np.float32)
+    pixels[..., :3] = (wave[None, :, None] + wave[:, None, None]) / 2
+    assert addon.seam_error(pixels) < 2
+
+def test_seam_error_of_a_flat_image_is_zero():
+    assert addon.seam_error(np.full((8, 8, 4), 0.5, dtype=np.float32)) == 0.0
+
+def test_make_seamless_hides_the_seams():
+    pixels = gradient()
+    seamless = addon.make_seamless(pixels)
+    assert seamless.shape == pixels.shape
+    assert addon.seam_error(seamless) < addon.seam_error(pixels) / 5
+
+def test_make_seamless_keeps_the_value_range_and_alpha():
+    seamless = addon.make_seamless(gradient())
+    assert seamless[..., :3].min() >= 0.0 and seamless[..., :3].max() <= 1.0
+    assert np.allclose(seamless[..., 3], 1.0)
+
+def test_make_seamless_keeps_the_centre_of_the_original():
+    pixels = gradient()
+    assert np.allclose(addon.make_seamless(pixels)[32, 32], pixels[32, 32])
+
+def test_make_seamless_handles_non_square_images():
+    pixels = gradient()[:16]
+    assert addon.make_seamless(pixels, blend_fraction=0.5).shape == (16, 64, 4)
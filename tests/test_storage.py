@@ -0,0 +1,73 @@
+"""Storage manager tests, run inside Blender in background mode:
+
+    blender -b --factory-startup --python tests/test_storage.py
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+import uuid
+
+import addon_utils
+import bpy
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADDON_NAME = "ai_texture_generator"
+
+def enable_addon():
+    link_dir = tempfile.mkdtemp(prefix="ai_texture_test_")
+    os.symlink(ADDON_DIR, os.path.join(link_dir, ADDON_NAME))
+    sys.path.insert(0, link_dir)
+    addon_utils.enable(ADDON_NAME, default_set=True)
+    return sys.modules[ADDON_NAME]
+
+addon = enable_addon()
+
+def write_file(directory, name, size=1024):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(b"\0" * size)
+    return path
+
+class StorageManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="ai_texture_project_")
+        bpy.ops.wm.read_homefile(use_empty=True)
+        bpy.ops.wm.save_as_mainfile(filepath=os.path.join(self.directory, "props.blend"))
+        self.storage = addon.get_storage_manager()
+
+    def test_sibling_blend_files_survive_cleanup(self):
+        sibling = write_file(self.directory, f"{uuid.uuid4()}_sibling.png")
+        with open(os.path.join(self.directory, "other.blend.ai_files.json"), 'w') as f:
+            f.write('{"files": {"%s": {"size": 1024, "created": 0}}}' % os.path.basename(sibling))
+        orphan = write_file(self.directory, f"{uuid.uuid4()}_orphan.png")
+        self.storage.track(orphan)
+
+        report = self.storage.reclaim(dry_run=False)
+
+        self.assertTrue(os.path.exists(sibling))
+        self.assertFalse(os.path.exists(orphan))
+        self.assertEqual([path for path, _ in report["files"]], [os.path.basename(orphan)])
+
+    def test_sibling_files_survive_budget(self):
+        sibling = write_file(self.directory, f"{uuid.uuid4()}_sibling.png", 4096)
+        self.storage.reclaim(dry_run=False, budget=0)
+        self.assertTrue(os.path.exists(sibling))
+
+    def test_referenced_files_are_adopted_and_kept(self):
+        path = write_file(self.directory, f"{uuid.uuid4()}_used.png")
+        image = bpy.data.images.new("used", 4, 4)
+        image.filepath_raw = path
+        image.use_fake_user = True
+        image["ai_managed"] = True
+
+        report = self.storage.reclaim(dry_run=False)
+
+        self.assertTrue(os.path.exists(path))
+        self.assertIn(os.path.basename(path), self.storage.files)
+        self.assertEqual(report["files"], [])
+
+if __name__ == "__main__":
+    result = unittest.main(argv=[sys.argv[0]], exit=False).result
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,94 @@
+import json
+import time
+from types import SimpleNamespace
+
+import ai_texture_generator as addon
+
+def test_fresh_entry_is_returned(tmp_path):
+    cache = addon.UploadCache(str(tmp_path / "uploads.json"))
+    cache.put("hash", "https://files/a")
+    assert cache.get("hash") == "https://files/a"
+    assert cache.get("other") is None
+
+def test_entry_inside_the_safety_margin_is_dropped(tmp_path):
+    cache = addon.UploadCache(str(tmp_path / "uploads.json"), margin=600)
+    cache.put("soon", "https://files/a", expires=time.time() + 300)
+    cache.put("later", "https://files/b", expires=time.time() + 3600)
+    assert cache.get("soon") is None
+    assert set(json.loads((tmp_path / "uploads.json").read_text())) == {"later"}
+    assert cache.get("later") == "https://files/b"
+
+def test_default_ttl_applies_without_an_expiry(tmp_path):
+    cache = addon.UploadCache(str(tmp_path / "uploads.json"), default_ttl=60, margin=600)
+    cache.put("hash", "https://files/a")
+    assert cache.get("hash") is None
+
+def test_entries_persist_across_instances(tmp_path):
+    path = str(tmp_path / "cache" / "uploads.json")
+    addon.UploadCache(path).put("hash", "https://files/a")
+    assert addon.UploadCache(path).get("hash") == "https://files/a"
+
+def test_unreadable_cache_file_starts_empty(tmp_path):
+    path = tmp_path / "uploads.json"
+    path.write_text("not json")
+    assert addon.UploadCache(str(path)).get("hash") is None
+
+def test_parse_timestamp_handles_replicate_precision():
+    assert addon.parse_timestamp("2024-01-01T00:00:00.123456789Z") == addon.parse_timestamp("2024-01-01T00:00:00.123456Z")
+    assert addon.parse_timestamp("2024-01-01T00:00:00Z") == 1704067200.0
+    assert addon.parse_timestamp("") is None
+
+class FakeResponse:
+    status_code = 201
+
+    def __init__(self, url):
+        self.url = url
+
+    def json(self):
+        return {"urls": {"get": self.url}, "expires_at": None}
+
+class FakeClient:
+    def __init__(self, api_key="key", base_url=addon.REPLICATE_API_URL):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.uploads = 0
+
+    def upload_file(self, filename, f, content_type):
+        self.uploads += 1
+        f.read()
+        return FakeResponse(f"https://files/{self.uploads}")
+
+def packed_image(data):
+    return SimpleNamespace(name="a.png", file_format='PNG', filepath="", is_dirty=False,
+        packed_file=SimpleNamespace(data=data))
+
+def test_upload_image_reuses_a_cached_upload(tmp_path):
+    client, cache = FakeClient(), addon.UploadCache(str(tmp_path / "uploads.json"))
+    first = addon.upload_image(client, addon.ImageUpload(packed_image(b"png")), cache, data_uri_limit=0)
+    second = addon.upload_image(client, addon.ImageUpload(packed_image(b"png")), cache, data_uri_limit=0)
+    assert first == second == "https://files/1"
+    assert client.uploads == 1
+
+def test_small_uploads_are_inlined(tmp_path):
+    client = FakeClient()
+    url = addon.upload_image(client, addon.ImageUpload(packed_image(b"png")), addon.UploadCache(None))
+    assert url.startswith("data:image/png;base64,")
+    assert client.uploads == 0
+
+def test_uploads_are_not_shared_between_accounts_or_servers(tmp_path):
+    cache = addon.UploadCache(str(tmp_path / "uploads.json"))
+    clients = [FakeClient(), FakeClient(api_key="other"), FakeClient(base_url="http://127.0.0.1:8788/v1")]
+    for client in clients:
+        addon.upload_image(client, addon.ImageUpload(packed_image(b"png")), cache, data_uri_limit=0)
+    assert all(client.uploads == 1 for client in clients)
+    assert len(json.loads((tmp_path / "uploads.json").read_text())) == 3
+    assert not any("other" in key for key in json.loads((tmp_path / "uploads.json").read_text()))
+
+def test_cache_key_depends_on_content_account_and_server():
+    client = FakeClient()
+    key = addon.upload_cache_key(client, "hash")
+    assert key.endswith(":hash")
+    assert key == addon.upload_cache_key(FakeClient(), "hash")
+    assert key != addon.upload_cache_key(client, "other hash")
+    assert key != addon.upload_cache_key(FakeClient(api_key="other"), "hash")
+    assert key != addon.upload_cache_key(FakeClient(base_url="http://127.0.0.1:8788/v1"), "hash")
@@ -0,0 +1,51 @@
+import base64
+import hashlib
+import hmac
+import time
+
+import ai_texture_generator as addon
+
+KEY = b"0123456789abcdef0123456789abcdef"
+SECRET = "whsec_" + base64.b64encode(KEY).decode()
+BODY = b'{"id": "abc", "status": "succeeded"}'
+
+def signed_headers(body=BODY, key=KEY, webhook_id="msg_1", timestamp=None):
+    timestamp = str(int(time.time()) if timestamp is None else timestamp)
+    digest = hmac.new(key, f"{webhook_id}.{timestamp}.".encode() + body, hashlib.sha256).digest()
+    return {"webhook-id": webhook_id, "webhook-timestamp": timestamp,
+            "webhook-signature": "v1," + base64.b64encode(digest).decode()}
+
+def test_valid_signature_is_accepted():
+    assert addon.verify_webhook_signature(SECRET, signed_headers(), BODY)
+
+def test_secret_without_prefix_is_accepted():
+    assert addon.verify_webhook_signature(base64.b64encode(KEY).decode(), signed_headers(), BODY)
+
+def test_any_of_several_signatures_may_match():
+    headers = signed_headers()
+    headers["webhook-signature"] = "v1,bm90LXRoaXMtb25l " + headers["webhook-signature"]
+    assert addon.verify_webhook_signature(SECRET, headers, BODY)
+
+def test_tampered_body_is_rejected():
+    assert not addon.verify_webhook_signature(SECRET, signed_headers(), BODY.replace(b"succeeded", b"failed"))
+
+def test_wrong_key_is_rejected():
+    assert not addon.verify_webhook_signature(SECRET, signed_headers(key=b"another key"), BODY)
+
+def test_changed_id_is_rejected():
+    headers = signed_headers()
+    headers["webhook-id"] = "msg_2"
+    assert not addon.verify_webhook_signature(SECRET, headers, BODY)
+
+def test_stale_timestamp_is_rejected():
+    headers = signed_headers(timestamp=int(time.time()) - 600)
+    assert not addon.verify_webhook_signature(SECRET, headers, BODY)
+    assert addon.verify_webhook_signature(SECRET, headers, BODY, tolerance=900)
+
+def test_missing_or_malformed_headers_are_rejected():
+    for name in ("webhook-id", "webhook-timestamp", "webhook-signature"):
+        headers = signed_headers()
+        del headers[name]
+        assert not addon.verify_webhook_signature(SECRET, headers, BODY)
+    assert not addon.verify_webhook_signature(SECRET, dict(signed_headers(), **{"webhook-timestamp": "soon"}), BODY)
+    assert not addon.verify_webhook_signature("whsec_not base64!", signed_headers(), BODY)
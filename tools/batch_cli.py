@@ -0,0 +1,82 @@
+"""Generate a library of textures from a manifest without the UI
+
+Runs inside Blender in background mode:
+
+    blender -b library.blend --python tools/batch_cli.py -- textures.jsonl --report report.json --save
+
+Each manifest row is a JSON object (or CSV row) with a prompt and optionally
+model, settings, object, material, upscale and face_enhance. Rows with an
+object get their material assigned to it; the others become materials with
+a fake user. The API key comes from --api-key, REPLICATE_API_TOKEN or the
+saved addon preferences. Exits with status 1 if any row failed.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+import addon_utils
+import bpy
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADDON_NAME = "ai_texture_generator"
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="batch_cli.py", description="Generate textures from a manifest")
+    parser.add_argument("manifest", help="JSONL or CSV manifest")
+    parser.add_argument("--concurrency", type=int, default=4, help="jobs in flight at once")
+    parser.add_argument("--report", help="write the result report as JSON to this path")
+    parser.add_argument("--timeout", type=float, help="cancel unfinished jobs after this many seconds")
+    parser.add_argument("--api-key", default=os.environ.get("REPLICATE_API_TOKEN"), help="Replicate API key")
+    parser.add_argument("--api-url", help="Replicate API base URL")
+    parser.add_argument("--save-location", choices=("BLENDER", "FOLDER"), help="where to keep the images")
+    parser.add_argument("--save", action="store_true", help="save the blend file when done")
+    parser.add_argument("--save-as", help="save the blend file to this path when done")
+    return parser.parse_args(argv)
+
+def enable_addon():
+    """Enable the installed addon, or import the working tree as the addon if it is not installed"""
+
+    addon_utils.enable(ADDON_NAME, default_set=True)
+    if ADDON_NAME not in sys.modules:
+        link_dir = tempfile.mkdtemp(prefix="ai_texture_batch_")
+        os.symlink(ADDON_DIR, os.path.join(link_dir, ADDON_NAME))
+        sys.path.insert(0, link_dir)
+        addon_utils.enable(ADDON_NAME, default_set=True)
+    return sys.modules[ADDON_NAME]
+
+def main():
+    args = parse_args()
+    addon = enable_addon()
+
+    prefs = bpy.context.preferences.addons[ADDON_NAME].preferences
+    if args.api_key:
+        prefs.api_key = args.api_key
+    if args.api_url:
+        prefs.api_base_url = args.api_url
+    if args.save_location:
+        prefs.save_location = args.save_location
+
+    report = addon.run_manifest(os.path.abspath(args.manifest), concurrency=args.concurrency,
+        report_path=args.report, timeout=args.timeout)
+
+    failed = 0
+    for row in report:
+        jobs = [job for job in (row["generate"], row["upscale"]) if job]
+        state = row["error"] or ", ".join(job["state"] for job in jobs if job["state"] != "SUCCEEDED") or "ok"
+        material = row["generate"]["material"] if row["generate"] else None
+        failed += state != "ok"
+        print(f"{row['line']:>5}  {state:24}  {material or '-':32}  {row['prompt'] or ''}")
+    print(f"\n{len(report) - failed} of {len(report)} rows succeeded")
+
+    if args.save_as:
+        bpy.ops.wm.save_as_mainfile(filepath=os.path.abspath(args.save_as))
+    elif args.save and bpy.data.filepath:
+        bpy.ops.wm.save_mainfile()
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""End-to-end benchmark of the addon against the mock Replicate server
+
+Runs inside Blender in background mode:
+
+    blender -b --factory-startup --python tools/benchmark.py -- --jobs 8 --upscales 2
+
+Generation and upscale jobs are started through the real operators and driven
+to completion by the job manager. For every job it reports submit-to-applied
+latency and the peak Python memory of the whole process over the polling
+intervals in which the job was active, plus the time the main thread spent
+blocked in operator and job manager calls. Jobs that run together share
+those intervals, so the memory peak is an upper bound for any one of them,
+not what that job allocated.
+"""
+
+import argparse
+import base64
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import addon_utils
+import bpy
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_DIR = os.path.dirname(TOOLS_DIR)
+ADDON_NAME = "ai_texture_generator"
+
+sys.path.insert(0, TOOLS_DIR)
+from mock_replicate import MockReplicate
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="benchmark.py", description="Benchmark the AI texture addon")
+    parser.add_argument("--jobs", type=int, default=4, help="generation jobs to run")
+    parser.add_argument("--upscales", type=int, default=1, help="upscale jobs to run on generated materials")
+    parser.add_argument("--size", type=int, default=1024, help="generated image width and height")
+    parser.add_argument("--latency", type=float, default=2.0, help="mock prediction duration in seconds")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of mock requests answered with 429")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of mock predictions that fail")
+    parser.add_argument("--webhook", action="store_true", help="receive completions through the webhook listener")
+    parser.add_argument("--timeout", type=float, default=300.0, help="give up after this many seconds")
+    parser.add_argument("--output", help="write the results as JSON to this path")
+    return parser.parse_args(argv)
+
+def enable_addon():
+    """Import the working tree as the addon, whatever its checkout directory is called"""
+
+    link_dir = tempfile.mkdtemp(prefix="ai_texture_bench_")
+    os.symlink(ADDON_DIR, os.path.join(link_dir, ADDON_NAME))
+    sys.path.insert(0, link_dir)
+    addon_utils.enable(ADDON_NAME, default_set=True)
+    return sys.modules[ADDON_NAME]
+
+class MainThreadTimer:
+    """Accumulates wall time spent in calls that run on Blender's main thread"""
+
+    def __init__(self):
+        self.total = 0.0
+        self.longest = 0.0
+
+    def call(self, function, *args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.total += elapsed
+            self.longest = max(self.longest, elapsed)
+
+def run_jobs(addon, blocked, start_jobs, timeout):
+    """Start jobs, then drive the job manager until all of them are finished
+
+    Timers do not fire while a background script runs, so the manager's timer
+    callback is called here in its place. tracemalloc's peak is reset every
+    interval and credited to each job active in it.
+    """
+
+    manager = addon.get_job_manager()
+    known = {job.id for job in manager.jobs()}
+    blocked.call(start_jobs)
+    jobs = [job for job in manager.jobs() if job.id not in known]
+    peaks = {job.id: 0 for job in jobs}
+    deadline = time.time() + timeout
+    while any(not job.done for job in jobs) and time.time() < deadline:
+        active = [job for job in jobs if not job.done]
+        time.sleep(manager.interval)
+        blocked.call(manager.process)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        for job in active:
+            peaks[job.id] = max(peaks[job.id], peak)
+    manager.cancel()
+    return [{
+        "job": job.id,
+        "kind": job.settings.kind,
+        "state": job.state.name,
+        "latency": round(job.finished - job.created, 3) if job.finished else None,
+        "process_peak_python_mb": round(peaks[job.id] / (1024 * 1024), 1),
+        "error": job.error,
+    } for job in jobs]
+
+def main():
+    args = parse_args()
+    webhook_secret = f"whsec_{base64.b64encode(os.urandom(24)).decode()}"
+    mock = MockReplicate(port=0, latency=args.latency, rate_limit=args.rate_limit,
+        failure_rate=args.failure_rate, image_size=args.size, webhook_secret=webhook_secret).start()
+    addon = enable_addon()
+
+    prefs = bpy.context.preferences.addons[ADDON_NAME].preferences
+    prefs.api_key = "benchmark"
+    prefs.api_base_url = mock.api_url
+    prefs.save_location = 'BLENDER'
+    prefs.use_generation_cache = False
+    prefs.use_webhook = args.webhook
+    if args.webhook:
+        # Webhooks are only registered with a public URL; the mock reaches the listener directly
+        prefs.webhook_host = "127.0.0.1"
+        prefs.webhook_public_url = f"http://127.0.0.1:{prefs.webhook_port}"
+        prefs.webhook_secret = webhook_secret
+
+    scene = bpy.context.scene
+    scene.ai_model_settings.width = args.size
+    scene.ai_model_settings.height = args.size
+    bpy.ops.mesh.primitive_cube_add()
+    obj = bpy.context.active_object
+
+    tracemalloc.start()
+    blocked = MainThreadTimer()
+    started = time.time()
+
+    def start_generations():
+        for index in range(args.jobs):
+            scene.ai_texture_generator_text_prompt = f"benchmark texture {index}"
+            bpy.ops.material.ai_texture_generator()
+
+    results = run_jobs(addon, blocked, start_generations, args.timeout)
+
+    materials = [slot.material for slot in obj.material_slots if slot.material][:args.upscales]
+
+    def start_upscales():
+        for material in materials:
+            obj.active_material_index = obj.material_slots.find(material.name)
+            bpy.ops.material.ai_texture_upscale()
+
+    if materials:
+        results += run_jobs(addon, blocked, start_upscales, args.timeout)
+
+    wall = time.time() - started
+    tracemalloc.stop()
+
+    latencies = sorted(r["latency"] for r in results if r["latency"] is not None and r["state"] == "SUCCEEDED")
+    summary = {
+        "jobs": len(results),
+        "succeeded": sum(r["state"] == "SUCCEEDED" for r in results),
+        "wall_seconds": round(wall, 3),
+        "median_latency": latencies[len(latencies) // 2] if latencies else None,
+        "max_latency": latencies[-1] if latencies else None,
+        "main_thread_blocked_seconds": round(blocked.total, 3),
+        "longest_main_thread_call": round(blocked.longest, 3),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "mock": dict(mock.stats),
+    }
+
+    print(f"\n{'job':10} {'kind':9} {'state':10} {'latency s':>10} {'process peak MB':>16}")
+    for r in results:
+        latency = f"{r['latency']:.2f}" if r["latency"] is not None else "-"
+        print(f"{r['job']:10} {r['kind']:9} {r['state']:10} {latency:>10} {r['process_peak_python_mb']:>16}")
+    print()
+    for key, value in summary.items():
+        print(f"{key}: {value}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"summary": summary, "jobs": results}, f, indent=2)
+
+    mock.stop()
+
+if __name__ == "__main__":
+    main()
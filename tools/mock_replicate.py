@@ -0,0 +1,348 @@
+"""Local stand-in for the parts of the Replicate API the addon uses
+
+Serves prediction creation (including "Prefer: wait"), prediction polling,
+file uploads and image downloads, with configurable latency, tqdm-style
+progress logs, failed predictions and 429 responses. Predictions that name a
+webhook get their start and completed events posted to it, signed the way
+Replicate signs them when a webhook_secret is given.
+
+Point the addon at it by setting the API Base URL preference to
+http://127.0.0.1:8788/v1, or run it from another script with MockReplicate.
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import random
+import re
+import struct
+import threading
+import time
+import urllib.request
+import uuid
+import zlib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def timestamp(value):
+    return datetime.fromtimestamp(value, timezone.utc).isoformat().replace("+00:00", "Z")
+
+def make_png(width, height, seed=0):
+    """Procedural RGB test image, so downloads exercise real decoding"""
+
+    rng = random.Random(seed)
+    tint = [rng.randrange(256) for _ in range(3)]
+    reds = [bytes((255 if (x // 32 + parity) % 2 else 64) + tint[0] & 255 for x in range(width))
+        for parity in (0, 1)]
+    greens = bytes((x * 255 // max(width - 1, 1) + tint[1]) % 256 for x in range(width))
+    rows = []
+    for y in range(height):
+        row = bytearray(width * 3)
+        row[0::3] = reds[(y // 32) % 2]
+        row[1::3] = greens
+        row[2::3] = bytes(((y * 255 // max(height - 1, 1) + tint[2]) % 256,)) * width
+        rows.append(b"\x00" + bytes(row))
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + \
+        chunk(b"IDAT", zlib.compress(b"".join(rows), 6)) + chunk(b"IEND", b"")
+
+class MockReplicate:
+    """Threaded mock server; start() returns once it is accepting connections"""
+
+    def __init__(self, host="127.0.0.1", port=8788, latency=3.0, jitter=0.25, request_latency=0.0,
+                 failure_rate=0.0, rate_limit=0.0, wait_limit=60.0, image_size=512, progress_steps=20,
+                 webhook_secret=None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.request_latency = request_latency
+        self.failure_rate = failure_rate
+        self.rate_limit = rate_limit
+        self.wait_limit = wait_limit
+        self.image_size = image_size
+        self.progress_steps = progress_steps
+        self.webhook_secret = webhook_secret
+        self.predictions = {}
+        self.files = {}
+        self.images = {}
+        self.stats = {"requests": 0, "polls": 0, "rate_limited": 0, "uploads": 0, "downloads": 0, "webhooks": 0}
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def api_url(self):
+        return f"{self.url}/v1"
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="mock-replicate", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def create(self, payload, model=None):
+        now = time.time()
+        prediction_id = uuid.uuid4().hex[:20]
+        prediction_input = payload.get("input") or {}
+        if "image" in prediction_input:
+            size = self.image_size * int(float(prediction_input.get("scale", 2)))
+            width = height = size
+        else:
+            width = int(prediction_input.get("width") or self.image_size)
+            height = int(prediction_input.get("height") or self.image_size)
+        duration = max(0.0, random.gauss(self.latency, self.latency * self.jitter))
+        prediction = {
+            "id": prediction_id,
+            "model": model or payload.get("version"),
+            "version": payload.get("version"),
+            "input": prediction_input,
+            "status": "starting",
+            "logs": "",
+            "output": None,
+            "error": None,
+            "created_at": timestamp(now),
+            "started_at": None,
+            "completed_at": None,
+            "urls": {"get": f"{self.api_url}/predictions/{prediction_id}",
+                     "cancel": f"{self.api_url}/predictions/{prediction_id}/cancel"},
+            "_created": now,
+            "_duration": duration,
+            "_fails": random.random() < self.failure_rate,
+            "_size": (width, height),
+            "_webhook": payload.get("webhook"),
+            "_events": set(payload.get("webhook_events_filter") or ["start", "output", "logs", "completed"]),
+            "_sent": set(),
+        }
+        with self._lock:
+            self.predictions[prediction_id] = prediction
+        if prediction["_webhook"]:
+            threading.Thread(target=self._push_events, args=(prediction_id,), daemon=True).start()
+        return prediction_id
+
+    def snapshot(self, prediction_id):
+        """Advance a prediction to its state at the current time and return a public copy"""
+
+        with self._lock:
+            prediction = self.predictions.get(prediction_id)
+            if prediction is None:
+                return None
+            elapsed = time.time() - prediction["_created"]
+            duration = prediction["_duration"]
+            if prediction["status"] in ("succeeded", "failed", "canceled"):
+                pass
+            elif elapsed >= duration:
+                prediction["completed_at"] = timestamp(prediction["_created"] + duration)
+                prediction["metrics"] = {"predict_time": round(duration * 0.9, 3)}
+                if prediction["_fails"]:
+                    prediction["status"] = "failed"
+                    prediction["error"] = "Simulated model failure"
+                else:
+                    name = f"{prediction_id}.png"
+                    self.images[name] = prediction["_size"]
+                    prediction["status"] = "succeeded"
+                    prediction["output"] = [f"{self.url}/files/{name}"]
+            elif elapsed >= duration * 0.1:
+                prediction["status"] = "processing"
+                prediction["started_at"] = prediction["started_at"] or timestamp(prediction["_created"] + duration * 0.1)
+                done = int(self.progress_steps * (elapsed - duration * 0.1) / max(duration * 0.9, 1e-6))
+                done = min(done, self.progress_steps)
+                prediction["logs"] = "\n".join(
+                    f"{step * 100 // self.progress_steps:3d}%|{'#' * step}{' ' * (self.progress_steps - step)}| "
+                    f"{step}/{self.progress_steps}" for step in range(done + 1))
+            return {k: v for k, v in prediction.items() if not k.startswith("_")}
+
+    def wait(self, prediction_id, limit):
+        deadline = time.time() + limit
+        while True:
+            prediction = self.snapshot(prediction_id)
+            if prediction["status"] in ("succeeded", "failed", "canceled") or time.time() >= deadline:
+                return prediction
+            time.sleep(0.05)
+
+    def _push_events(self, prediction_id):
+        while True:
+            prediction = self.snapshot(prediction_id)
+            with self._lock:
+                record = self.predictions[prediction_id]
+                due = []
+                if prediction["status"] != "starting" and "start" not in record["_sent"]:
+                    due.append("start")
+                if prediction["status"] in ("succeeded", "failed", "canceled"):
+                    due.append("completed")
+                record["_sent"].update(due)
+                url, wanted = record["_webhook"], record["_events"]
+            for event in due:
+                if event in wanted:
+                    self._post(url, prediction)
+            if "completed" in due:
+                return
+            time.sleep(0.05)
+
+    def _post(self, url, prediction):
+        body = json.dumps(prediction).encode()
+        headers = {"Content-Type": "application/json"}
+        if self.webhook_secret:
+            webhook_id = f"msg_{uuid.uuid4().hex}"
+            sent_at = str(int(time.time()))
+            key = base64.b64decode(self.webhook_secret.split("_", 1)[-1])
+            digest = hmac.new(key, f"{webhook_id}.{sent_at}.".encode() + body, hashlib.sha256).digest()
+            headers.update({"webhook-id": webhook_id, "webhook-timestamp": sent_at,
+                "webhook-signature": f"v1,{base64.b64encode(digest).decode()}"})
+        request = urllib.request.Request(url, data=body, headers=headers, method="POST")
+        try:
+            urllib.request.urlopen(request, timeout=10).close()
+            with self._lock:
+                self.stats["webhooks"] += 1
+        except OSError as e:
+            print(f"mock: webhook to {url} failed: {e}")
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self):
+                return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+            def _throttle(self):
+                with mock._lock:
+                    mock.stats["requests"] += 1
+                if mock.request_latency:
+                    time.sleep(mock.request_latency)
+                if self.path.startswith("/v1/") and random.random() < mock.rate_limit:
+                    with mock._lock:
+                        mock.stats["rate_limited"] += 1
+                    self._body()
+                    self._json(429, {"detail": "Request was throttled."}, {"Retry-After": "1"})
+                    return True
+                return False
+
+            def do_POST(self):
+                if self._throttle():
+                    return
+                path = self.path.split("?", 1)[0]
+                model = re.fullmatch(r"/v1/models/([^/]+/[^/]+)/predictions", path)
+                if path == "/v1/predictions" or model:
+                    try:
+                        payload = json.loads(self._body() or b"{}")
+                    except ValueError:
+                        self._json(400, {"detail": "Invalid JSON"})
+                        return
+                    prediction_id = mock.create(payload, model.group(1) if model else None)
+                    prefer = self.headers.get("Prefer", "")
+                    if prefer.startswith("wait"):
+                        limit = float(prefer.split("=", 1)[1]) if "=" in prefer else mock.wait_limit
+                        prediction = mock.wait(prediction_id, min(limit, mock.wait_limit))
+                    else:
+                        prediction = mock.snapshot(prediction_id)
+                    self._json(201, prediction)
+                elif path == "/v1/files":
+                    body = self._body()
+                    file_id = uuid.uuid4().hex[:16]
+                    with mock._lock:
+                        mock.files[file_id] = body
+                        mock.stats["uploads"] += 1
+                    self._json(201, {
+                        "id": file_id,
+                        "size": len(body),
+                        "created_at": timestamp(time.time()),
+                        "expires_at": timestamp(time.time() + 24 * 3600),
+                        "urls": {"get": f"{mock.api_url}/files/{file_id}"},
+                    })
+                else:
+                    self._body()
+                    self._json(404, {"detail": "Not found"})
+
+            def do_GET(self):
+                if self._throttle():
+                    return
+                path = self.path.split("?", 1)[0]
+                match = re.fullmatch(r"/v1/predictions/([^/]+)", path)
+                if match:
+                    with mock._lock:
+                        mock.stats["polls"] += 1
+                    prediction = mock.snapshot(match.group(1))
+                    if prediction is None:
+                        self._json(404, {"detail": "Not found"})
+                    else:
+                        self._json(200, prediction)
+                    return
+                match = re.fullmatch(r"/files/([^/]+)", path)
+                if match and match.group(1) in mock.images:
+                    width, height = mock.images[match.group(1)]
+                    self._send_bytes(make_png(width, height, hash(match.group(1))), "image/png")
+                    return
+                self._json(404, {"detail": "Not found"})
+
+            def _send_bytes(self, data, content_type):
+                with mock._lock:
+                    mock.stats["downloads"] += 1
+                start = 0
+                match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+                if match and int(match.group(1)) < len(data):
+                    start = int(match.group(1))
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data) - start))
+                self.end_headers()
+                self.wfile.write(data[start:])
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8788)
+    parser.add_argument("--latency", type=float, default=3.0, help="mean prediction duration in seconds")
+    parser.add_argument("--jitter", type=float, default=0.25, help="relative standard deviation of the duration")
+    parser.add_argument("--request-latency", type=float, default=0.0, help="delay added to every request")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of predictions that fail")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of API requests answered with 429")
+    parser.add_argument("--image-size", type=int, default=512, help="default output size in pixels")
+    args = parser.parse_args()
+
+    mock = MockReplicate(args.host, args.port, args.latency, args.jitter, args.request_latency,
+        args.failure_rate, args.rate_limit, image_size=args.image_size).start()
+    print(f"Mock Replicate API listening on {mock.api_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        mock.stop()
+
+if __name__ == "__main__":
+    main()